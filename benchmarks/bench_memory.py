@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+''' Measure lookup time of the translation memory with synthetic segments
+
+    $ python benchmarks/bench_memory.py [-n N_SEGMENTS] [--db PATH]
+'''
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from translation_memory import TranslationMemory  # noqa: E402
+
+WORDS = ['open', 'close', 'file', 'user', 'server', 'request', 'failed',
+         'config', 'timeout', 'retry', 'connection', 'invalid', 'token',
+         'cache', 'update', 'error', 'warning', 'ticket', 'button', 'save']
+
+
+def make_segment(rng):
+    ''' Log-line like segment with an ID and a number '''
+    words = rng.choices(WORDS, k=rng.randint(4, 10))
+    return (' '.join(words).capitalize() +
+            f' (id {rng.randrange(10 ** 6)}, line {rng.randrange(1000)}).')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--n_segments', type=int, default=100000)
+    parser.add_argument('--n_lookups', type=int, default=1000)
+    parser.add_argument('--db', help='SQLite file (temporary by default)')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    tmp_dir = tempfile.TemporaryDirectory()
+    db_path = args.db or os.path.join(tmp_dir.name, 'memory.sqlite3')
+    memory = TranslationMemory(db_path=db_path)
+    segments = [make_segment(rng) for _ in range(args.n_segments)]
+
+    # Bulk import as JSON Lines
+    start = time.perf_counter()
+    import_path = os.path.join(tmp_dir.name, 'import.jsonl')
+    with open(import_path, 'w', encoding='utf-8') as f:
+        for segment in segments:
+            f.write('{"backend_mode": "google", "src_lang": "en", '
+                    '"tgt_lang": "ja", "src_text": "%s", "tgt_text": '
+                    '"[ja] %s"}\n' % (segment, segment))
+    memory.import_file(import_path)
+    print(f'import: {time.perf_counter() - start:.1f}s '
+          f'({args.n_segments} segments)')
+
+    # Exact, substitutable (numbers changed) and missing segments
+    queries = {
+        'exact': rng.sample(segments, args.n_lookups),
+        'fuzzy': [s.replace('line ', 'line 1') for s in
+                  rng.sample(segments, args.n_lookups)],
+        'miss': [make_segment(rng).replace('(id', '(key')
+                 for _ in range(args.n_lookups)],
+    }
+    for name, texts in queries.items():
+        latencies = []
+        n_hits = 0
+        for text in texts:
+            start = time.perf_counter()
+            tgt_text = memory.get('google', 'en', 'ja', text)
+            latencies.append(time.perf_counter() - start)
+            n_hits += tgt_text is not None
+        latencies.sort()
+        print(f'{name:>6}: median {statistics.median(latencies) * 1e3:.3f}ms'
+              f', p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1e3:.3f}'
+              f'ms, hit {n_hits / len(texts):.0%}')
+    memory.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+''' Compare latency of navigation and in-place (single navigation) paths
+
+    $ python benchmarks/bench_navigation.py [-m {google,deepl}] [-n N]
+'''
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from gtransweb import GTransWeb  # noqa: E402
+
+SRC_TEXTS = ['This is a pen', 'This is an apple', 'I have a dream',
+             'The quick brown fox jumps over the lazy dog',
+             'Hello, world']
+
+
+def bench(backend_mode, in_place, n_repeats):
+    ''' Measure latencies of translations (sec) '''
+    gtrans = GTransWeb(backend_mode=backend_mode, in_place=in_place)
+    gtrans.translate('en', 'ja', 'Warm up')
+    latencies = []
+    for i in range(n_repeats):
+        for src_text in SRC_TEXTS:
+            start = time.perf_counter()
+            gtrans.translate('en', 'ja', f'{src_text} ({i})')
+            latencies.append(time.perf_counter() - start)
+    gtrans.exit()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--backend_mode', default='google',
+                        choices=GTransWeb.BACKEND_MODES)
+    parser.add_argument('-n', '--n_repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    medians = dict()
+    for in_place in [False, True]:
+        latencies = bench(args.backend_mode, in_place, args.n_repeats)
+        name = 'in_place' if in_place else 'navigate'
+        medians[name] = statistics.median(latencies)
+        print(f'{name:>8}: median {medians[name]:.3f}s, '
+              f'max {max(latencies):.3f}s ({len(latencies)} requests)')
+    print(f' speedup: {medians["navigate"] / medians["in_place"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
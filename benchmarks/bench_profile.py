@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+''' Compare full and lean browser profiles (page-load time and RSS)
+
+    $ python benchmarks/bench_profile.py [-m {google,deepl}] [-n N]
+          [--offline]
+'''
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from bench_suite import measure_browser_rss  # noqa: E402
+from fake_site import start_fake_site, make_local_backend  # noqa: E402
+from gtransweb import GTransWeb  # noqa: E402
+from metrics import METRICS  # noqa: E402
+
+SRC_TEXTS = ['This is a pen', 'This is an apple', 'I have a dream',
+             'The quick brown fox jumps over the lazy dog',
+             'Hello, world']
+
+
+def get_mean(backend_mode, stage):
+    ''' Mean time (sec) of the stage recorded in metrics '''
+    hist = METRICS.get_histogram('gtransweb_stage_seconds',
+                                 backend=backend_mode, stage=stage)
+    if hist is None or hist.count == 0:
+        return None
+    return hist.sum / hist.count
+
+
+def bench(backend, lean_profile, n_repeats):
+    ''' Measure startup, page-load and translation times, and RSS '''
+    METRICS.reset()
+    start = time.perf_counter()
+    gtrans = GTransWeb(backend, lean_profile=lean_profile)
+    startup = time.perf_counter() - start
+    latencies = []
+    for i in range(n_repeats):
+        for src_text in SRC_TEXTS:
+            start = time.perf_counter()
+            gtrans.translate('en', 'ja', f'{src_text} ({i})')
+            latencies.append(time.perf_counter() - start)
+    backend_mode = gtrans.get_backend_mode()
+    result = {'startup': startup,
+              'load_top': get_mean(backend_mode, 'load_top'),
+              'navigate': get_mean(backend_mode, 'navigate'),
+              'reload_top': get_mean(backend_mode, 'reload_top'),
+              'translate_median': statistics.median(latencies),
+              'browser_rss_mb': measure_browser_rss(gtrans)}
+    gtrans.exit()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--backend_mode', default='google',
+                        choices=GTransWeb.BACKEND_MODES)
+    parser.add_argument('-n', '--n_repeats', type=int, default=3)
+    parser.add_argument('--offline', action='store_true',
+                        help='Use local fake site instead of the website')
+    args = parser.parse_args()
+
+    backend = args.backend_mode
+    if args.offline:
+        server, base_url = start_fake_site()
+        backend = make_local_backend(args.backend_mode, base_url)
+
+    results = dict()
+    for name, lean_profile in [('full', False), ('lean', True)]:
+        results[name] = bench(backend, lean_profile, args.n_repeats)
+
+    def fmt(value, unit):
+        return '-' if value is None else f'{value:.3f}{unit}'
+
+    for key, unit in [('startup', 's'), ('load_top', 's'),
+                      ('reload_top', 's'), ('navigate', 's'),
+                      ('translate_median', 's'), ('browser_rss_mb', 'MB')]:
+        full, lean = results['full'][key], results['lean'][key]
+        ratio = (f'{full / lean:.2f}x' if full is not None and lean
+                 else '-')
+        print(f'{key:>16}: full {fmt(full, unit)}, lean {fmt(lean, unit)}'
+              f' ({ratio})')
+
+
+if __name__ == '__main__':
+    main()
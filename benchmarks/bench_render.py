@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+''' Measure render time of text boxes against text size
+
+    $ python benchmarks/bench_render.py [--sizes 10000 100000 1000000]
+
+    `total` is the time until the text is fully rendered, and `stall` is the
+    longest time the event loop is blocked (GUI freezes).
+'''
+import argparse
+import os
+import sys
+import time
+
+from PyQt5 import QtWidgets
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from window import TextBoxRenderer  # noqa: E402
+
+
+def make_log_text(size):
+    ''' Log-like text of the size (characters) '''
+    lines = []
+    n_chars = 0
+    i = 0
+    while n_chars < size:
+        line = (f'2024-01-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO '
+                f'[worker-{i % 8}] <request id={i}> done in {i % 97} ms\n')
+        lines.append(line)
+        n_chars += len(line)
+        i += 1
+    return ''.join(lines)[:size]
+
+
+def measure(app, box, set_text, is_pending=lambda: False):
+    ''' Measure total time and the longest stall (sec) of setting text to
+        a new text box
+    '''
+    box.resize(600, 400)
+    box.show()
+    app.processEvents()
+
+    start = time.perf_counter()
+    set_text()
+    stall = time.perf_counter() - start
+    while True:
+        step_start = time.perf_counter()
+        app.processEvents()  # Insert chunks, lay out and paint
+        stall = max(stall, time.perf_counter() - step_start)
+        if not is_pending():
+            break
+    total = time.perf_counter() - start
+
+    box.close()
+    box.deleteLater()
+    app.processEvents()
+    return total, stall
+
+
+def measure_renderer(app, text):
+    box = QtWidgets.QPlainTextEdit()
+    renderer = TextBoxRenderer(box)
+    return measure(app, box, lambda: renderer.set_text(text),
+                   renderer.is_pending)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([sys.argv[0]])
+    for size in args.sizes:
+        text = make_log_text(size)
+        rich_box, plain_box = QtWidgets.QTextEdit(), QtWidgets.QTextEdit()
+        results = {
+            'QTextEdit.setHtml': measure(app, rich_box,
+                                         lambda: rich_box.setHtml(text)),
+            'QTextEdit.setPlainText': measure(
+                    app, plain_box, lambda: plain_box.setPlainText(text)),
+            'TextBoxRenderer': measure_renderer(app, text),
+        }
+        for name, (total, stall) in results.items():
+            print(f'{size:>9} chars {name:>23}: total {total * 1e3:8.1f}ms,'
+                  f' stall {stall * 1e3:8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+''' Offline latency/throughput benchmark suite against the local fake site
+
+    $ python benchmarks/bench_suite.py [-m {google,deepl}] [-n N]
+          [--modes web,web_in_place,async,pool,cache,http]
+          [--render_delay MS] [--output PATH] [--baseline PATH]
+
+    Results are printed and stored as JSON. When `--baseline` is given,
+    results are compared with it and regressions make the exit code 1.
+'''
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from fake_site import start_fake_site, make_local_backend  # noqa: E402
+from gtranshttp import GTransHttp  # noqa: E402
+from gtransweb import GTransWeb, GTransWebAsync, GTransWebPool  # noqa: E402
+from translation_cache import TranslationCache  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MODES = ['web', 'web_in_place', 'async', 'pool', 'cache', 'http']
+
+
+def make_workload(n_requests, n_unique):
+    ''' Source texts. Each text is repeated when `n_unique < n_requests` '''
+    return [f'This is sentence number {i % n_unique}.'
+            for i in range(n_requests)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    idx = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return values[idx]
+
+
+def iter_browsers(engine):
+    ''' Iterate browsers (Selenium WebDriver) in the engine '''
+    if isinstance(engine, GTransWeb):
+        yield engine._browser
+    elif isinstance(engine, GTransWebPool):
+        for gtrans in engine._instances:
+            yield gtrans._browser
+    elif isinstance(engine, GTransWebAsync):
+        yield engine._gtransweb._browser
+
+
+def count_commands(engine):
+    ''' Count WebDriver commands by wrapping `execute()` of the browsers '''
+    counter = {'n': 0}
+    lock = Lock()
+    for browser in iter_browsers(engine):
+        if browser is None:
+            continue
+
+        def execute(*args, _execute=browser.execute, **kwargs):
+            with lock:
+                counter['n'] += 1
+            return _execute(*args, **kwargs)
+        browser.execute = execute
+    return counter
+
+
+def measure_browser_rss(engine):
+    ''' Sum of RSS (MB) of browser process trees. `None` without psutil. '''
+    if psutil is None:
+        return None
+    rss = 0
+    for browser in iter_browsers(engine):
+        try:
+            proc = psutil.Process(browser.service.process.pid)
+            for p in [proc] + proc.children(recursive=True):
+                rss += p.memory_info().rss
+        except (AttributeError, psutil.Error):
+            continue
+    return rss / 1024 / 1024
+
+
+def run_sync(translate, src_texts, concurrency):
+    ''' Run translations and return latencies (sec) '''
+    def run(src_text):
+        start = time.perf_counter()
+        translate('en', 'ja', src_text)
+        return time.perf_counter() - start
+
+    if concurrency <= 1:
+        return list(map(run, src_texts))
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(run, src_texts))
+
+
+def run_async(gtrans_async, src_texts):
+    ''' Run translations via callback and return latencies (sec) '''
+    start_times = dict()
+    latencies = []
+    finished = Event()
+
+    def callback(tgt_text, request_id):
+        latencies.append(time.perf_counter() - start_times[request_id])
+        if len(latencies) == len(start_times):
+            finished.set()
+
+    gtrans_async.set_callback(callback)
+    for src_text in src_texts:
+        start = time.perf_counter()
+        start_times[gtrans_async.translate('en', 'ja', src_text)] = start
+    finished.wait()
+    return latencies
+
+
+def bench_mode(mode, backend, src_texts, pool_size, lean_profile=True):
+    ''' Run one mode and return its result dictionary '''
+    cache = None
+    if mode == 'web':
+        engine = GTransWeb(backend, lean_profile=lean_profile)
+    elif mode == 'web_in_place':
+        engine = GTransWeb(backend, in_place=True, lean_profile=lean_profile)
+    elif mode == 'async':
+        engine = GTransWebAsync(backend, queue_size=0,
+                                lean_profile=lean_profile)
+    elif mode == 'pool':
+        engine = GTransWebPool(pool_size, backend, lean_profile=lean_profile)
+    elif mode == 'cache':
+        engine = GTransWeb(backend, lean_profile=lean_profile)
+        cache = TranslationCache()
+    elif mode == 'http':
+        engine = GTransHttp(backend)
+    counter = count_commands(engine)
+
+    start = time.perf_counter()
+    if mode == 'async':
+        latencies = run_async(engine, src_texts)
+    elif mode == 'cache':
+        latencies = run_sync(lambda *q: cache.translate(engine, *q),
+                             src_texts, 1)
+    elif mode in ['pool', 'http']:
+        latencies = run_sync(engine.translate, src_texts, pool_size)
+    else:
+        latencies = run_sync(engine.translate, src_texts, 1)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'n_requests': len(latencies),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'throughput': len(latencies) / elapsed,
+        'browser_rss_mb': (measure_browser_rss(engine) if mode != 'http'
+                           else None),
+        'webdriver_commands': counter['n'] if mode != 'http' else None,
+    }
+    engine.exit()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    ''' Print comparison with baseline and return whether regressed '''
+    regressed = False
+    for mode, result in results['modes'].items():
+        base = baseline['modes'].get(mode)
+        if base is None:
+            continue
+        for key, worse_if_larger in [('p50', True), ('p95', True),
+                                     ('throughput', False)]:
+            ratio = result[key] / max(base[key], 1e-9)
+            bad = (ratio > 1 + tolerance if worse_if_larger else
+                   ratio < 1 - tolerance)
+            regressed |= bad
+            mark = 'REGRESSION' if bad else 'ok'
+            print(f'{mode:>12} {key:>10}: {base[key]:.4f} -> '
+                  f'{result[key]:.4f} ({ratio:.2f}x) {mark}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--backend_mode', default='google',
+                        choices=GTransWeb.BACKEND_MODES)
+    parser.add_argument('-n', '--n_requests', type=int, default=50)
+    parser.add_argument('--n_unique', type=int, default=10,
+                        help='Number of unique texts in the workload')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--pool_size', type=int, default=4)
+    parser.add_argument('--render_delay', type=int, default=100,
+                        help='Delay to render the result (msec)')
+    parser.add_argument('--full_profile', action='store_true',
+                        help='Use full browser profile instead of lean one')
+    parser.add_argument('--output', default=None,
+                        help='Path to store results as JSON')
+    parser.add_argument('--baseline', default=None,
+                        help='Path of baseline JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed ratio of degradation')
+    args = parser.parse_args()
+
+    server, base_url = start_fake_site(render_delay=args.render_delay)
+    backend = make_local_backend(args.backend_mode, base_url)
+    src_texts = make_workload(args.n_requests, args.n_unique)
+
+    results = {'config': {'backend_mode': args.backend_mode,
+                          'n_requests': args.n_requests,
+                          'n_unique': args.n_unique,
+                          'pool_size': args.pool_size,
+                          'render_delay': args.render_delay,
+                          'lean_profile': not args.full_profile,
+                          'python': platform.python_version(),
+                          'machine': platform.machine()},
+               'modes': dict()}
+    for mode in args.modes.split(','):
+        if mode == 'http' and not backend.supports_http():
+            continue
+        result = bench_mode(mode, backend, src_texts, args.pool_size,
+                            not args.full_profile)
+        results['modes'][mode] = result
+        print(f'{mode:>12}: p50 {result["p50"]:.4f}s, '
+              f'p95 {result["p95"]:.4f}s, p99 {result["p99"]:.4f}s, '
+              f'{result["throughput"]:.2f} req/s, '
+              f'RSS {result["browser_rss_mb"]} MB, '
+              f'commands {result["webdriver_commands"]}')
+    server.shutdown()
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
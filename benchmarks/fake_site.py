@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+''' Local fake translator site reproducing routes and DOM of the backends
+
+    Translation pages are served under `/google/` and `/deepl/`, and the
+    result is rendered at the XPath of each backend plugin after a
+    configurable delay. The "translation" is just upper-casing.
+
+    $ python benchmarks/fake_site.py [--port PORT] [--render_delay MS]
+'''
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+import urllib.parse as urllib_parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..',
+                             'gtransweb_gui'))
+from backends import BACKENDS  # noqa: E402
+
+ORIGINS = {'google': 'https://translate.google.com/',
+           'deepl': 'https://www.deepl.com/'}
+HTTP_ORIGINS = {'google': 'https://translate.googleapis.com/'}
+
+# Parse query from URL fragment and render the result after the delay
+PAGE_SCRIPT = '''
+<script>
+var renderDelay = %(render_delay)d;
+var timer = null;
+function parseHash() {
+  var hash = decodeURIComponent(location.hash.slice(1).replace(/\\+/g, ' '));
+  if ('%(backend)s' == 'google') {
+    var m = hash.match(/[#&]?text=([\\s\\S]*)$/);
+    return m ? m[1] : '';
+  } else {
+    var parts = hash.split('/');
+    return parts.length >= 3 ? parts.slice(2).join('/') : '';
+  }
+}
+function render(text) {
+  var old = document.getElementById('result');
+  if (old) old.remove();
+  clearTimeout(timer);
+  if (!text) return;
+  timer = setTimeout(function() {
+    var result = document.createElement('%(result_tag)s');
+    result.id = 'result';
+    result.textContent = text.toUpperCase();
+    document.getElementById('result-parent').appendChild(result);
+  }, renderDelay);
+}
+window.addEventListener('hashchange', function() { render(parseHash()); });
+document.getElementsByTagName('textarea')[0].addEventListener(
+    'input', function(e) { render(e.target.value); });
+render(parseHash());
+</script>
+'''
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True
+    render_delay = 100  # msec
+
+    def do_GET(self):
+        path = urllib_parse.urlsplit(self.path).path
+        backend = path.strip('/').split('/')[0]
+        if backend not in BACKENDS:
+            self.send_error(404)
+            return
+        body, result_tag = build_result_dom(BACKENDS[backend].res_xpath)
+        body += ('<textarea id="source" class="lmt__source_textarea">'
+                 '</textarea>')
+        script = PAGE_SCRIPT % {'render_delay': self.render_delay,
+                                'backend': backend, 'result_tag': result_tag}
+        html = f'<html><head></head><body>{body}{script}</body></html>'
+        self._send(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def do_POST(self):
+        # Stand-in of HTTP translation API
+        length = int(self.headers['Content-Length'])
+        form = urllib_parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+        src_text = form['q'][0]
+        body = json.dumps([[[src_text.upper(), src_text, None, None, 1]]])
+        self._send(body.encode('utf-8'), 'application/json')
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def build_result_dom(xpath):
+    ''' Build nested elements in `body` reproducing the result XPath
+        The result element itself is created by the script when rendered,
+        so its parent has `id="result-parent"`.
+        :return: HTML and tag name of the result element
+    '''
+    steps = [re.match(r'(\w+)(?:\[(\d+)\])?', step).groups()
+             for step in xpath.split('/')[3:]]  # Skip '', 'html' and 'body'
+    result_tag, result_idx = steps[-1]
+    inner = f'<{result_tag}></{result_tag}>' * (int(result_idx or 1) - 1)
+    for depth, (tag, idx) in enumerate(reversed(steps[:-1])):
+        attr = ' id="result-parent"' if depth == 0 else ''
+        inner = (f'<{tag}></{tag}>' * (int(idx or 1) - 1) +
+                 f'<{tag}{attr}>{inner}</{tag}>')
+    return inner, result_tag
+
+
+def create_fake_site(port=0, render_delay=100):
+    ''' Create the fake site server and return (server, base URL) '''
+    handler = type('Handler', (FakeSiteHandler,),
+                   {'render_delay': render_delay})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def start_fake_site(port=0, render_delay=100):
+    ''' Start the fake site in background and return (server, base URL) '''
+    server, base_url = create_fake_site(port, render_delay)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+
+def make_local_backend(backend_mode, base_url):
+    ''' Copy backend plugin whose URLs point to the fake site '''
+    backend = copy.copy(BACKENDS[backend_mode])
+    local = f'{base_url}/{backend_mode}/'
+    backend.top_url = backend.top_url.replace(ORIGINS[backend_mode], local)
+    backend.tra_url = backend.tra_url.replace(ORIGINS[backend_mode], local)
+    if backend.supports_http():
+        backend.http_url = backend.http_url.replace(
+                HTTP_ORIGINS[backend_mode], local)
+    return backend
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--render_delay', type=int, default=100,
+                        help='Delay to render the result (msec)')
+    args = parser.parse_args()
+
+    server, base_url = create_fake_site(args.port, args.render_delay)
+    for backend_mode in BACKENDS:
+        backend = make_local_backend(backend_mode, base_url)
+        print(f'{backend_mode}: {backend.top_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+''' Modules in this package import each other by flat names (they also run
+    as scripts, e.g. `python3 gtransweb_gui/gtransweb_gui.py`), so the
+    package directory is put on `sys.path` on import.
+'''
+import os
+import sys
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, _PACKAGE_DIR)
+
+
+def run_gui(args):
+    ''' Run GUI (see `gtransweb_gui.py`). `from gtransweb_gui import run_gui`
+        in the modules resolves to this package, not to the module, when run
+        by `python -m gtransweb_gui`. Qt is imported on call.
+    '''
+    from gtransweb_gui.gtransweb_gui import run_gui
+    run_gui(args)
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+''' Entry point of `python -m gtransweb_gui` '''
+# Modules in this package are put on `sys.path` by `__init__.py`
+from cli import main
+
+main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import html
+import json
+import urllib.parse as urllib_parse
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class TranslationCancelled(Exception):
+    ''' Raised when a translation is cancelled by `cancel_event` '''
+    pass
+
+
+def is_result_cacheable(gtrans):
+    ''' Whether the last result of the engine (in the calling thread) may be
+        memoized under its backend mode. It is not when another backend
+        answered (e.g. a hedged request won by the secondary engine).
+    '''
+    is_cacheable = getattr(gtrans, 'is_last_result_cacheable', None)
+    return is_cacheable() if callable(is_cacheable) else True
+
+
+class Backend:
+    ''' Translation website plugin
+        Browser engine (GTransWeb) uses URLs and XPaths, and HTTP engine
+        (GTransHttp) uses `build_http_request()` and `parse_http_response()`.
+    '''
+    name = ''
+    # Browser
+    top_url = ''  # Top page
+    tra_url = ''  # Translation page with `src_lang`, `tgt_lang`, `src_text`
+    src_xpath = ''  # Source text box
+    res_xpath = ''  # Translated text
+    reload_before_translate = False  # Reload top page to remove old result
+    # Maximum source text length accepted at once
+    max_text_length = 5000
+    # HTTP
+    http_url = None  # `None` means HTTP is not supported (JavaScript needed)
+
+    def supports_http(self):
+        return self.http_url is not None
+
+    def get_tra_url(self, src_lang, tgt_lang, src_text):
+        ''' Get translation page URL '''
+        return self.tra_url.format(src_lang=src_lang, tgt_lang=tgt_lang,
+                                   src_text=src_text)
+
+    def get_result_text(self, result_elem):
+        ''' Extract translated text from the result element '''
+        return result_elem.text
+
+    def build_http_request(self, src_lang, tgt_lang, src_text):
+        ''' Build HTTP request
+            :return: Tuple of (method, url, body, headers)
+        '''
+        raise NotImplementedError
+
+    def parse_http_response(self, body):
+        ''' Extract translated text from HTTP response body (bytes) '''
+        raise NotImplementedError
+
+
+class GoogleBackend(Backend):
+    name = 'google'
+    top_url = 'https://translate.google.com/#view=home&op=translate'
+    tra_url = ('https://translate.google.com/#view=home&op=translate' +
+               '&sl={src_lang}&tl={tgt_lang}&text={src_text}')
+    src_xpath = '//textarea[@id="source"]'
+    res_xpath = ('/html/body/div[2]/div[2]/div[1]/div[2]/div[1]' +
+                 '/div[1]/div[2]/div[3]/div[1]/div[2]/div/span[1]/span')
+    reload_before_translate = True
+    max_text_length = 5000
+    http_url = 'https://translate.googleapis.com/translate_a/single'
+
+    def __init__(self, http_url=None):
+        if http_url is not None:
+            self.http_url = http_url  # e.g. Local stand-in server
+
+    def get_tra_url(self, src_lang, tgt_lang, src_text):
+        # Encode for URL
+        src_text = urllib_parse.quote_plus(src_text.encode('utf-8'))
+        return super().get_tra_url(src_lang, tgt_lang, src_text)
+
+    def build_http_request(self, src_lang, tgt_lang, src_text):
+        query = urllib_parse.urlencode({'client': 'gtx', 'sl': src_lang,
+                                        'tl': tgt_lang, 'dt': 't'})
+        body = urllib_parse.urlencode({'q': src_text}).encode('utf-8')
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        return 'POST', f'{self.http_url}?{query}', body, headers
+
+    def parse_http_response(self, body):
+        # [[["translated", "source", ...], ...], ...]
+        data = json.loads(body.decode('utf-8'))
+        return ''.join(seg[0] for seg in data[0] or [] if seg[0])
+
+
+class DeepLBackend(Backend):
+    name = 'deepl'
+    top_url = 'https://www.deepl.com/translator'
+    tra_url = ('https://www.deepl.com/translator' +
+               '#{src_lang}/{tgt_lang}/{src_text}')
+    src_xpath = '//textarea[contains(@class, "lmt__source_textarea")]'
+    res_xpath = ('/html/body/div[2]/div[1]/div[1]/div[4]/div[3]/div[2]' +
+                 '/p[1]/button[1][text()!=""]')
+    max_text_length = 1500
+
+    def get_result_text(self, result_elem):
+        return html.unescape(result_elem.get_attribute("innerHTML"))
+
+
+BACKENDS = {backend.name: backend
+            for backend in [GoogleBackend(), DeepLBackend()]}
+
+
+def get_backend(backend):
+    ''' Get backend plugin by name (or pass through plugin instance) '''
+    if isinstance(backend, Backend):
+        return backend
+    return BACKENDS[backend]
@@ -1,22 +1,70 @@
 # -*- coding: utf-8 -*-
 from collections import deque
-from threading import Timer
+from threading import Event
 import time
 
 from PyQt5 import QtCore
 
+from metrics import METRICS
+
 # logging
 from logging import getLogger, NullHandler
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
-class CallableBuffer:
+class CancelEvent(Event):
+    ''' `threading.Event` to cancel a call, which keeps the reason of the
+        first cancellation (e.g. 'debounce', 'superseded' or 'user')
+    '''
+
     def __init__(self):
+        super().__init__()
+        self._reason = None
+
+    def get_reason(self):
+        ''' Reason of the cancellation (`None` before it) '''
+        return self._reason
+
+    def cancel(self, reason):
+        ''' Set the event. Only the first reason is kept. '''
+        if not self.is_set():
+            self._reason = reason
+            self.set()
+
+
+class CallableBuffer:
+    ''' Adaptive debouncer of frequent calls (e.g. selection changes)
+        Intervals between calls in a burst are learned, and the newest call
+        is fired when no call comes for a while longer than them. It is
+        fired at most `buftime` after the first call of the burst.
+    '''
+
+    def __init__(self, cancellable=False, min_buftime=0.05, margin=1.5,
+                 min_samples=5):
+        '''
+            :param cancellable: When True, `cancel_event` keyword argument
+                                (CancelEvent) is passed to the callback,
+                                and it is cancelled for 'debounce' when the
+                                next call comes.
+            :param min_buftime: Minimum buffering time (sec).
+            :param margin: Ratio of settle time to the learned interval.
+            :param min_samples: Number of intervals needed to adapt.
+        '''
         self._query = None  # Only newest one
-        self._timer = False
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._postcall)
 
         self._buftime = 0.5
+        self._min_buftime = min_buftime
+        self._margin = margin
+        self._min_samples = min_samples
+        self._cancellable = cancellable
+        self._intervals = deque(maxlen=50)  # Intervals in bursts (sec)
+        self._first_time = None  # Time of the first call in the burst
+        self._last_time = None
+        self._cancel_event = None  # For the last fired call
 
     def get_buftime(self):
         ''' Get buffering time (sec) '''
@@ -26,20 +74,42 @@ class CallableBuffer:
         ''' Set buffering time (sec) '''
         self._buftime = buftime
 
+    def get_settle_time(self):
+        ''' Time (sec) without calls to regard the burst as settled '''
+        if len(self._intervals) < self._min_samples:
+            return self._buftime
+        intervals = sorted(self._intervals)
+        interval = intervals[int(0.9 * (len(intervals) - 1))]
+        return min(max(interval * self._margin, self._min_buftime),
+                   self._buftime)
+
     def __call__(self, callback, *args, **kwargs):
         # Overwrite by new query
         self._query = (callback, args, kwargs)
 
-        # Start new timer
-        if not self._timer:
-            self._timer = True
-            QtCore.QTimer.singleShot(self._buftime * 1000, self._postcall)
-            # self._timer = Timer(self._buftime, self._postcall)
-            # self._timer.start()
+        # Cancel speculative call in progress
+        if self._cancel_event is not None:
+            self._cancel_event.cancel('debounce')
+            self._cancel_event = None
+
+        now = time.perf_counter()
+        if self._timer.isActive():
+            # In a burst
+            self._intervals.append(now - self._last_time)
+        else:
+            self._first_time = now
+        self._last_time = now
+
+        # (Re)start timer
+        deadline = self._first_time + self._buftime
+        delay = max(min(self.get_settle_time(), deadline - now), 0)
+        self._timer.start(int(delay * 1000))
 
     def _postcall(self):
-        # Timer is finished
-        self._timer = False
+        # Latency saved compared to fixed buffering time
+        saved = max(self._first_time + self._buftime - time.perf_counter(),
+                    0)
+        METRICS.observe('gtransweb_debounce_saved_seconds', saved)
 
         # Decompose query
         callback, args, kwargs = self._query
@@ -50,4 +120,7 @@ class CallableBuffer:
             return
 
         # Call
+        if self._cancellable:
+            self._cancel_event = CancelEvent()
+            kwargs = dict(kwargs, cancel_event=self._cancel_event)
         callback(*args, **kwargs)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+''' Command line interface. PyQt5 is not imported in the streaming mode.
+
+    $ python -m gtransweb_gui [-s SRC_LANG] [-t TGT_LANG] [-m MIDDLE_LANG]
+                              [-d] [-p] [-b BUF_TIME] < input.txt
+'''
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+from threading import Thread
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+def build_parser():
+    ''' Argument parser shared by the GUI and the streaming mode '''
+    parser = argparse.ArgumentParser(
+            prog='gtransweb_gui',
+            description='Translate stdin to stdout line by line (or '
+                        'paragraph by paragraph). Use `--gui` for GUI.')
+    parser.add_argument('-s', '--src_lang', default=None,
+                        help='Source language. [default: auto]')
+    parser.add_argument('-t', '--tgt_lang', default=None,
+                        help='Target language. [default: ja]')
+    parser.add_argument('-m', '--middle_lang', default='en',
+                        help='Intermediate language (for secondhand '
+                             'translation) [default: en]')
+    parser.add_argument('-d', '--double', action='store_true',
+                        help='Secondhand translation.')
+    parser.add_argument('-c', '--clip_mode', default=None,
+                        choices=['copy', 'select', 'findbuf'],
+                        help='Clipboard mode for translation trigger (GUI).')
+    parser.add_argument('-b', '--buf_time', type=int, default=None,
+                        help='Buffering time (msec). GUI: for clipboard. '
+                             'Streaming: idle time to flush a paragraph.')
+    parser.add_argument('-o', '--overwrite', action='store_true',
+                        default=None,
+                        help='Overwrite clipboard with translated text (GUI).')
+    parser.add_argument('--gui', action='store_true',
+                        help='Launch GUI instead of streaming translation.')
+    parser.add_argument('--keep_standby', action='store_true',
+                        help='Keep a browser of the other backend warm to '
+                             'switch instantly (GUI).')
+    parser.add_argument('--max_standby', type=int, default=1,
+                        help='Maximum number of standby browsers (GUI).')
+    parser.add_argument('--max_standby_rss', type=float, default=None,
+                        help='Maximum total RSS (MB) of standby browsers. '
+                             'psutil is needed (GUI).')
+    parser.add_argument('--metrics_port', type=int, default=None,
+                        help='Port to export metrics on (GUI).')
+    parser.add_argument('--profile_startup', '--profile-startup',
+                        action='store_true',
+                        help='Print import and initialization time of GUI '
+                             'until the window is shown, then quit.')
+    parser.add_argument('--backend_mode', default='google',
+                        choices=['google', 'deepl'],
+                        help='Translation website. [default: google]')
+    parser.add_argument('--http', action='store_true',
+                        help='Use plain HTTP engine instead of browser.')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Send slow requests also to another backend and '
+                             'use the first result.')
+    parser.add_argument('--no_daemon', action='store_true',
+                        help='Do not use the running translation daemon.')
+    parser.add_argument('--no_stream', action='store_true',
+                        help='Do not show partial results of long text '
+                             '(GUI).')
+    parser.add_argument('--lean_profile', action='store_true',
+                        help='Launch browsers without images, fonts and '
+                             'third-party scripts.')
+    parser.add_argument('--no_memory', action='store_true',
+                        help='Do not use the fuzzy translation memory.')
+    parser.add_argument('-j', '--pool_size', type=int, default=1,
+                        help='Number of concurrent translations.')
+    parser.add_argument('--read_ahead', type=int, default=8,
+                        help='Maximum number of segments read ahead of the '
+                             'output.')
+    parser.add_argument('-p', '--paragraph', action='store_true',
+                        help='Translate each paragraph (separated by blank '
+                             'lines) instead of each line.')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Print logs to stderr.')
+    return parser
+
+
+def read_lines(stream, queue):
+    ''' Put lines of the stream into the queue. `None` means EOF. '''
+    for line in iter(stream.readline, ''):
+        queue.put(line)
+    queue.put(None)
+
+
+def iter_segments(line_queue, paragraph=False, buf_time=None):
+    ''' Iterate (text, separator) of input lines or paragraphs
+        Joining them restores the input. In paragraph mode, the pending
+        paragraph is flushed after `buf_time` (sec) without input.
+    '''
+    lines = []  # Lines of the pending paragraph
+    while True:
+        try:
+            line = line_queue.get(timeout=buf_time if lines else None)
+        except Empty:
+            line = ''  # Idle. Flush the pending paragraph.
+        if line is None:
+            break
+        body = line.rstrip('\r\n')
+        sep = line[len(body):]
+        if not paragraph:
+            yield body, sep
+        elif body.strip():
+            lines.append(line)
+        else:
+            # Blank line (or idle) ends the paragraph
+            if lines:
+                text = ''.join(lines)
+                body = text.rstrip('\r\n')
+                yield body, text[len(body):]
+                lines = []
+            if line:
+                yield '', line
+    if lines:
+        text = ''.join(lines)
+        body = text.rstrip('\r\n')
+        yield body, text[len(body):]
+
+
+def translate_stream(translate_func, segments, read_ahead=8, n_workers=1):
+    ''' Translate (text, separator) segments with bounded read-ahead
+        Results are yielded in input order as soon as they are available.
+        :param translate_func: Function of `src_text` -> `tgt_text`.
+    '''
+    def translate(text):
+        return translate_func(text) if text.strip() else text
+
+    futures = Queue(maxsize=max(read_ahead, 1))  # Back pressure
+
+    def submit(executor):
+        try:
+            for text, sep in segments:
+                futures.put((executor.submit(translate, text), sep))
+        finally:
+            futures.put(None)
+
+    with ThreadPoolExecutor(n_workers) as executor:
+        Thread(target=submit, args=(executor,), daemon=True).start()
+        while True:
+            item = futures.get()
+            if item is None:
+                break
+            future, sep = item
+            yield future.result(), sep
+
+
+def create_gtrans(args):
+    ''' Create translation engine for the arguments
+        The running translation daemon is used if available, and segments
+        similar to translated ones are served by the translation memory.
+    '''
+    gtrans = _create_engine(args)
+    if args.no_memory:
+        return gtrans
+    from translation_memory import (GTransWebMemory, TranslationMemory,
+                                    MEMORY_PATH)
+    return GTransWebMemory(gtrans, TranslationMemory(db_path=MEMORY_PATH))
+
+
+def _create_engine(args):
+    if not args.no_daemon:
+        from translation_daemon import connect_daemon
+        gtrans = connect_daemon(backend_mode=args.backend_mode)
+        if gtrans is not None:
+            return gtrans
+    if args.http:
+        from gtranshttp import GTransHttp
+        return GTransHttp(args.backend_mode,
+                          max_connections=max(args.pool_size, 1))
+    from gtransweb import GTransWeb, GTransWebPool
+
+    def create_engine(backend_mode):
+        if args.pool_size > 1:
+            return GTransWebPool(args.pool_size, backend_mode,
+                                 lean_profile=args.lean_profile)
+        return GTransWeb(backend_mode, lean_profile=args.lean_profile)
+
+    if args.hedge:
+        from gtransweb_hedged import create_hedged
+        return create_hedged(create_engine, args.backend_mode,
+                             GTransWeb.BACKEND_MODES)
+    return create_engine(args.backend_mode)
+
+
+def run_stream(args, stdin=None, stdout=None, gtrans=None):
+    ''' Translate stdin to stdout '''
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    src_lang = args.src_lang or 'auto'
+    tgt_lang = args.tgt_lang or 'ja'
+    buf_time = None if args.buf_time is None else args.buf_time / 1000
+
+    # Start reading before the browser is ready
+    line_queue = Queue(maxsize=max(args.read_ahead, 1) * 64)
+    Thread(target=read_lines, args=(stdin, line_queue), daemon=True).start()
+
+    own_gtrans = gtrans is None
+    if own_gtrans:
+        gtrans = create_gtrans(args)
+
+    def translate(src_text):
+        if args.double:
+            src_text = gtrans.translate(src_lang, args.middle_lang, src_text)
+            return gtrans.translate(args.middle_lang, tgt_lang, src_text)
+        return gtrans.translate(src_lang, tgt_lang, src_text)
+
+    try:
+        segments = iter_segments(line_queue, args.paragraph, buf_time)
+        for tgt_text, sep in translate_stream(translate, segments,
+                                              args.read_ahead,
+                                              args.pool_size):
+            stdout.write(tgt_text + sep)
+            stdout.flush()
+    finally:
+        if own_gtrans:
+            gtrans.exit()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.gui or args.profile_startup:
+        if args.profile_startup:
+            from startup_profile import IMPORT_PROFILER
+            IMPORT_PROFILER.start()
+        # Import Qt only for GUI
+        from gtransweb_gui import run_gui
+        run_gui(args)
+        return
+
+    if args.verbose:
+        import logging
+        logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
+    try:
+        run_stream(args)
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        sys.stderr.close()  # Output is closed (e.g. `| head`)
+
+
+if __name__ == '__main__':
+    main()
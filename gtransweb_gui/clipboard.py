@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
-from collections import OrderedDict
+from collections import OrderedDict, Counter
+import hashlib
+import re
+import time
 
-from PyQt5 import QtGui
+from PyQt5 import QtCore, QtGui
+
+from metrics import METRICS
 
 # logging
 from logging import getLogger, NullHandler
@@ -9,13 +14,59 @@ logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
 
+# Maximum length of clipboard text (same as `LARGE_TEXT_SIZE` of window)
+MAX_CLIP_CHARS = 100000
+
+# Hyphenated and hard line breaks (e.g. texts copied from PDF)
+_HYPHEN_BREAK_RE = re.compile(r'(?<=[a-z])-\n(?=[a-z])')
+_SPACES_RE = re.compile(r'\s+')
+# Spaces between non-ASCII (e.g. CJK) characters
+_WIDE_SPACES_RE = re.compile(r'(?<=[^\x00-\x7f]) (?=[^\x00-\x7f])')
+
+
 class ClipboardHandler:
-    def __init__(self, clipboard):
+    ''' Handler of clipboard changes
+        Changes are gated before the callback: duplicates of the last
+        triggered text within `dedup_window`, empty, too short or too long
+        texts, and texts with few letters are skipped. Triggers are capped at
+        `max_rate`, and the newest text over the cap is deferred (not
+        dropped) to the next allowed time. In `select` mode, the rate is not
+        capped because the selection buffer of GUI coalesces changes.
+    '''
+
+    def __init__(self, clipboard, dedup_window=10.0, min_chars=1,
+                 max_chars=MAX_CLIP_CHARS, min_letter_ratio=0.3, max_rate=5.0):
+        '''
+            :param dedup_window: Time (sec) to skip the same text.
+            :param min_chars: Minimum length of normalized text.
+            :param max_chars: Maximum length of text. Longer texts are
+                              skipped with a warning.
+            :param min_letter_ratio: Minimum ratio of letters and digits to
+                                     non-space characters. Texts without
+                                     letters are also skipped.
+            :param max_rate: Maximum number of triggers per second.
+        '''
         self._clipboard = clipboard
 
         self._callback = None
         self._skip_str = None  # Flag and string for escaping recursing
 
+        # Gates
+        self._dedup_window = dedup_window
+        self._min_chars = min_chars
+        self._max_chars = max_chars
+        self._min_letter_ratio = min_letter_ratio
+        self._min_interval = 1.0 / max_rate if max_rate else 0.0
+        self._last_hash = None  # Hash of the last triggered text
+        self._last_time = None  # Time of the last trigger
+        self._n_skipped = Counter()  # Reason -> count
+
+        # Timer for the deferred text over the rate cap
+        self._deferred_text = None
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_deferred)
+
         # Connect event handling
         self._clipboard.connect(self)
 
@@ -32,6 +83,10 @@ class ClipboardHandler:
         # Overwrite
         self._clipboard.set_text(text)
 
+    def get_stats(self):
+        ''' Number of avoided translations for each reason '''
+        return dict(self._n_skipped)
+
     def __call__(self, mode):
         ''' Entry point of changing event handling '''
         # Eliminate the clipboard mode
@@ -48,10 +103,76 @@ class ClipboardHandler:
             if skip:
                 return
 
+        # Gate by payload
+        reason = self._check_text(src_text)
+        if reason is not None:
+            self._skip(reason)
+            return
+
+        # Cap the rate (only newest one is deferred)
+        now = time.monotonic()
+        if self._clipboard.get_mode_str() != 'select' and \
+                self._last_time is not None and \
+                now - self._last_time < self._min_interval:
+            if self._deferred_text is not None:
+                self._skip('rate')  # Superseded by newer one
+            self._deferred_text = src_text
+            if not self._timer.isActive():
+                wait = self._min_interval - (now - self._last_time)
+                self._timer.start(int(wait * 1000) + 1)
+            return
+
+        self._trigger(src_text)
+
+    def _check_text(self, src_text):
+        ''' Return the reason to skip, or `None` to trigger '''
+        if len(src_text) > self._max_chars:
+            # Before normalization not to stall. Not silent for users.
+            logger.warning(f'Clipboard text is too long to translate '
+                           f'({len(src_text)} > {self._max_chars} chars)')
+            return 'too_long'
+        text = normalize_clip_text(src_text)
+        if len(text) < max(self._min_chars, 1):
+            return 'too_short' if text else 'empty'
+        # Digits are content (e.g. timestamped log lines and IDs), but text
+        # needs letters to be translated
+        n_chars = len(text) - text.count(' ')
+        n_alnums = sum(c.isalnum() for c in text)
+        if n_alnums < self._min_letter_ratio * n_chars or \
+                not any(c.isalpha() for c in text):
+            return 'charclass'
+        text_hash = hashlib.sha1(text.encode('utf-8')).digest()
+        if text_hash == self._last_hash and \
+                time.monotonic() - self._last_time < self._dedup_window:
+            return 'duplicate'
+        return None
+
+    def _skip(self, reason):
+        logger.debug(f'Skip clipboard change ({reason})')
+        self._n_skipped[reason] += 1
+        METRICS.inc('gtransweb_clipboard_skipped_total', reason=reason)
+
+    def _trigger(self, src_text):
+        text = normalize_clip_text(src_text)
+        self._last_hash = hashlib.sha1(text.encode('utf-8')).digest()
+        self._last_time = time.monotonic()
+        METRICS.inc('gtransweb_clipboard_triggers_total')
+
         # Run callback
         if callable(self._callback):
             self._callback(src_text)
 
+    def _on_deferred(self):
+        src_text, self._deferred_text = self._deferred_text, None
+        if src_text is None:
+            return
+        # The last trigger may be the same text
+        reason = self._check_text(src_text)
+        if reason is not None:
+            self._skip(reason)
+            return
+        self._trigger(src_text)
+
 
 class Clipboard:
 
@@ -103,6 +224,14 @@ class Clipboard:
         self._clip.changed.connect(handler)
 
 
+def normalize_clip_text(text):
+    ''' Normalize whitespaces and hard line breaks to compare texts '''
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = _HYPHEN_BREAK_RE.sub('', text)
+    text = _SPACES_RE.sub(' ', text).strip()
+    return _WIDE_SPACES_RE.sub('', text)
+
+
 def _enum_clip_modes(clip):
     ''' Enumerate available clipboard modes '''
     modes = OrderedDict()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from queue import LifoQueue, Empty
+from threading import BoundedSemaphore
+import http.client
+import urllib.parse as urllib_parse
+
+from backends import BACKENDS, TranslationCancelled, get_backend
+from metrics import METRICS
+from text_segments import split_chunks, translate_chunks, translate_many
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class GTransHttp:
+    ''' Lightweight translation engine with plain HTTP requests
+        It has the same interface as GTransWeb, but does not need a browser.
+        Only backends which do not need JavaScript are supported.
+    '''
+    BACKEND_MODES = [name for name, backend in BACKENDS.items()
+                     if backend.supports_http()]
+
+    def __init__(self, backend_mode='google', timeout=5, max_connections=4):
+        '''
+            :param backend_mode: Backend name or `backends.Backend` instance.
+            :param max_connections: Maximum number of keep-alive connections
+                                    (and concurrent requests).
+        '''
+        self._backend = get_backend(backend_mode)
+        if not self._backend.supports_http():
+            raise ValueError(f'Backend does not support HTTP '
+                             f'({self._backend.name})')
+        self._backend_mode = self._backend.name
+        self._max_connections = max_connections
+        self._conn_pool = HttpConnectionPool(max_connections, timeout)
+        self._chunk_latencies = []  # sec
+
+    def get_backend_mode(self):
+        return self._backend_mode
+
+    def is_headless(self):
+        return True
+
+    def get_pool_size(self):
+        return self._max_connections
+
+    def exit(self):
+        # Close connections
+        self._conn_pool.close()
+
+    def get_chunk_latencies(self):
+        ''' Get latencies of chunks in the last long text translation '''
+        return self._chunk_latencies
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        ''' Translate via HTTP. Chunks of long text run in parallel. '''
+        def translate_one(src_lang, tgt_lang, src_text):
+            if cancel_event is not None and cancel_event.is_set():
+                raise TranslationCancelled()
+            return self._translate(src_lang, tgt_lang, src_text)
+
+        with METRICS.timer('gtransweb_stage_seconds',
+                           backend=self._backend_mode, stage='total'):
+            chunks = split_chunks(src_text, self._backend.max_text_length)
+            if len(chunks) <= 1:
+                tgt_text = translate_one(src_lang, tgt_lang, src_text)
+            else:
+                with ThreadPoolExecutor(self._max_connections) as executor:
+                    tgt_text, self._chunk_latencies = translate_chunks(
+                            translate_one, src_lang, tgt_lang, chunks,
+                            executor.map)
+        METRICS.inc('gtransweb_translations_total',
+                    backend=self._backend_mode)
+        if src_text and not tgt_text:
+            METRICS.inc('gtransweb_empty_results_total',
+                        backend=self._backend_mode)
+        return tgt_text
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        ''' Translate multiple texts. Packed batches run in parallel. '''
+        with ThreadPoolExecutor(self._max_connections) as executor:
+            return translate_many(self, src_lang, tgt_lang, src_texts,
+                                  self._backend.max_text_length, executor.map)
+
+    def _translate(self, src_lang, tgt_lang, src_text):
+        if not src_text:
+            return ''
+        method, url, body, headers = self._backend.build_http_request(
+                src_lang, tgt_lang, src_text)
+        try:
+            with METRICS.timer('gtransweb_stage_seconds',
+                               backend=self._backend_mode, stage='request'):
+                res_body = self._conn_pool.request(method, url, body,
+                                                   headers)
+            return self._backend.parse_http_response(res_body)
+        except Exception as e:
+            logger.warn(f'Failed to translate ({e})')
+            return ''
+
+
+class HttpConnectionPool:
+    ''' Pool of keep-alive HTTP(S) connections '''
+
+    def __init__(self, max_connections=4, timeout=5):
+        self._timeout = timeout
+        self._semaphore = BoundedSemaphore(max_connections)
+        self._idle = dict()  # (scheme, host, port) -> LifoQueue of conns
+
+        # Statistics
+        self._n_requests = 0
+        self._n_connects = 0
+
+    def request(self, method, url, body=None, headers=None):
+        ''' Send request and return response body (bytes)
+            A stale keep-alive connection is replaced and retried once.
+        '''
+        parsed = urllib_parse.urlsplit(url)
+        key = (parsed.scheme, parsed.hostname, parsed.port)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        headers = dict(headers or {})
+        headers.setdefault('Connection', 'keep-alive')
+
+        with self._semaphore:
+            self._n_requests += 1
+            for retry in range(2):
+                conn, reused = self._get_conn(key)
+                try:
+                    conn.request(method, path, body, headers)
+                    res = conn.getresponse()
+                    res_body = res.read()
+                except (http.client.HTTPException, ConnectionError):
+                    conn.close()
+                    if reused and retry == 0:
+                        continue  # Stale connection
+                    raise
+                if res.will_close:
+                    conn.close()
+                else:
+                    self._idle[key].put(conn)
+                if res.status != 200:
+                    raise http.client.HTTPException(f'HTTP {res.status}')
+                return res_body
+
+    def close(self):
+        ''' Close all idle connections '''
+        for conns in self._idle.values():
+            while True:
+                try:
+                    conns.get_nowait().close()
+                except Empty:
+                    break
+
+    def get_stats(self):
+        return {'n_requests': self._n_requests,
+                'n_connects': self._n_connects}
+
+    def _get_conn(self, key):
+        ''' Get idle connection or create new one
+            :return: Connection and whether it is reused
+        '''
+        conns = self._idle.setdefault(key, LifoQueue())
+        try:
+            return conns.get_nowait(), True
+        except Empty:
+            pass
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port,
+                                               timeout=self._timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port,
+                                              timeout=self._timeout)
+        self._n_connects += 1
+        logger.debug(f'New HTTP connection ({scheme}://{host}:{port})')
+        return conn, False
@@ -1,13 +1,26 @@
 # -*- coding: utf-8 -*-
-import urllib.parse as urllib_parse
-from threading import Thread
-from queue import Queue, Full, Empty
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Thread, Lock
+from queue import Queue, Empty
+import json
 import time
+import urllib.parse as urllib_parse
+
+# `selenium.webdriver` is imported when a browser is used (slow to import)
+from selenium.common.exceptions import (TimeoutException, WebDriverException,
+                                        NoSuchElementException,
+                                        StaleElementReferenceException)
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from backends import BACKENDS, TranslationCancelled, get_backend
+from metrics import METRICS
+from request_scheduler import RequestScheduler
+from text_segments import split_chunks, translate_chunks, translate_many
 
 # logging
 from logging import getLogger, NullHandler
@@ -17,28 +30,76 @@ logger.addHandler(NullHandler())
 
 DEFAULT_BROWSER_MODES = ['chrome', 'firefox']
 
-TOP_URLS = {'google': 'https://translate.google.com/#view=home&op=translate',
-            'deepl':  'https://www.deepl.com/translator'}
-TRA_URLS = {'google': 'https://translate.google.com/#view=home&op=translate' +
-                      '&sl={src_lang}&tl={tgt_lang}&text={src_text}',
-            'deepl':  'https://www.deepl.com/translator' +
-                      '#{src_lang}/{tgt_lang}/{src_text}'}
-RES_XPATHS = {'google': '/html/body/div[2]/div[2]/div[1]/div[2]/div[1]' +
-                        '/div[1]/div[2]/div[3]/div[1]/div[2]/div/span[1]/span',
-              'deepl': '/html/body/div[2]/div[1]/div[1]/div[4]/div[3]/div[2]' +
-                       '/p[1]/button[1][text()!=""]'}
+# Third-party hosts blocked in lean profile (analytics, ads and web fonts)
+BLOCKED_HOSTS = ['www.google-analytics.com', 'ssl.google-analytics.com',
+                 'www.googletagmanager.com', 'stats.g.doubleclick.net',
+                 'googleads.g.doubleclick.net', 'www.googleadservices.com',
+                 'fonts.googleapis.com', 'fonts.gstatic.com',
+                 'connect.facebook.net', 'bat.bing.com',
+                 'static.hotjar.com', 'script.hotjar.com']
+# Cache size in lean profile (bytes)
+LEAN_CACHE_SIZE = 8 * 1024 * 1024
+# Interval of measuring browser RSS (number of translations)
+RSS_CHECK_INTERVAL = 10
+# Streaming: interval (sec) to poll the growing result, and time (sec) for
+# which the result must be unchanged to be final
+STREAM_POLL_INTERVAL = 0.1
+STREAM_STABLE_TIME = 0.3
+# Maximum waiting time (sec) for an idle instance of the pool
+CHECKOUT_TIMEOUT = 60
 
 
 class GTransWeb:
-    BACKEND_MODES = ['google', 'deepl']
+    BACKEND_MODES = list(BACKENDS.keys())
 
     def __init__(self, backend_mode='google',
                  browser_modes=DEFAULT_BROWSER_MODES, headless=True,
-                 timeout=5):
-        self._backend_mode = backend_mode
+                 timeout=5, in_place=False, lean_profile=False,
+                 max_requests=1000, max_age=3600, max_rss=None,
+                 max_retries=2):
+        '''
+            :param backend_mode: Backend name or `backends.Backend` instance.
+            :param in_place: When True, the loaded translator page is reused
+                             by setting the input text instead of navigating
+                             to a new URL for each translation.
+            :param lean_profile: When True, the browser does not load images,
+                                 fonts and third-party scripts, and does not
+                                 wait for sub-resources of pages.
+            :param max_requests: Recycle the browser after this number of
+                                 translations (`None` disables).
+            :param max_age: Recycle the browser after this time (sec).
+            :param max_rss: Recycle the browser when RSS of its process tree
+                            exceeds this size (MB). `psutil` is needed.
+            :param max_retries: Maximum number of browser restarts in a
+                                translation on `WebDriverException`.
+        '''
+        self._backend = get_backend(backend_mode)
+        self._backend_mode = self._backend.name
         self._browser_modes = browser_modes
         self._headless = headless
         self._timeout = timeout  # sec
+        self._in_place = in_place
+        self._lean_profile = lean_profile
+        self._page_langs = None  # Languages of the loaded translation page
+        self._cancel_event = None  # Event to abort the current translation
+        self._partial_callback = None  # Receiver of partial results
+        self._partial_prefix = ''  # Translated chunks before the current one
+        self._chunk_latencies = []  # sec
+
+        # Recycling policy
+        self._max_requests = max_requests
+        self._max_age = max_age
+        self._max_rss = max_rss
+        self._max_retries = max_retries
+        if max_rss is not None and psutil is None:
+            logger.warn('psutil is not installed. `max_rss` is ignored.')
+        self._browser = None
+        self._n_requests = 0  # Translations by the current browser
+        self._browser_time = 0.0  # Creation time of the current browser
+        self._next_browser = None  # Replacement prepared in background
+        self._recycle_lock = Lock()
+        self._preparing = False
+        self._exited = False
 
         # Create browser first
         self._create_browser()
@@ -51,83 +112,490 @@ class GTransWeb:
 
     def _create_browser(self):
         # Close previous browser
-        self.exit()
-        # Create
-        self._browser = _create_any_browser(self._browser_modes,
-                                            self._headless)
-        # Open top page
-        self._browser.get(TOP_URLS[self._backend_mode])
+        _quit_browser(self._browser)
+        self._browser = None
+        if self._exited:
+            raise WebDriverException('Already exited')
+        # Create and open top page
+        browser = self._launch_browser()
+        with self._recycle_lock:
+            exited = self._exited
+            if not exited:
+                self._set_browser(browser)
+        if exited:
+            # Exited during the launch
+            _quit_browser(browser)
+            raise WebDriverException('Already exited')
+
+    def _launch_browser(self):
+        ''' Create a browser and open top page '''
+        with self._stage('create_browser'):
+            browser = _create_any_browser(self._browser_modes,
+                                          self._headless, self._lean_profile)
+        if browser is None:
+            raise WebDriverException('No browser is valid')
+        with self._stage('load_top'):
+            try:
+                browser.get(self._backend.top_url)
+            except Exception:
+                _quit_browser(browser)
+                raise
+        return browser
+
+    def _set_browser(self, browser):
+        self._browser = browser
+        self._page_langs = None
+        self._n_requests = 0
+        self._browser_time = time.monotonic()
 
     def exit(self):
-        # Try to close browser
-        try:
-            if self._browser:
-                self._browser.quit()
-        except Exception:
-            pass
+        # Try to close browsers
+        with self._recycle_lock:
+            self._exited = True
+            next_browser, self._next_browser = self._next_browser, None
+        _quit_browser(self._browser)
+        _quit_browser(next_browser)
+
+    def get_recycle_reason(self):
+        ''' Get the reason to recycle the current browser or `None` '''
+        if self._max_requests is not None and \
+                self._n_requests >= self._max_requests:
+            return 'requests'
+        if self._max_age is not None and \
+                time.monotonic() - self._browser_time >= self._max_age:
+            return 'age'
+        if self._max_rss is not None and psutil is not None and \
+                self._n_requests % RSS_CHECK_INTERVAL == 0 and \
+                _get_browser_rss(self._browser) >= self._max_rss:
+            return 'rss'
+        return None
 
-    def translate(self, src_lang, tgt_lang, src_text):
-        ''' Translate via Google website '''
-        while True:
+    def get_chunk_latencies(self):
+        ''' Get latencies of chunks in the last long text translation '''
+        return self._chunk_latencies
+
+    def get_rss(self):
+        ''' Get RSS (MB) of the browser process tree. 0 when unknown
+            (`psutil` is needed).
+        '''
+        if psutil is None or self._browser is None:
+            return 0
+        return _get_browser_rss(self._browser)
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None,
+                  partial_callback=None):
+        ''' Translate via Google website
+            Long text is split into chunks which the backend can accept.
+            :param cancel_event: `threading.Event`. When it is set during
+                                 translation, waiting for the browser is
+                                 aborted and `TranslationCancelled` is raised.
+            :param partial_callback: Streaming mode. The growing result is
+                                     polled and `partial_callback(text)` is
+                                     called with the partial text whenever
+                                     it changes, until it is stable.
+        '''
+        self._cancel_event = cancel_event
+        self._partial_callback = partial_callback
+        self._partial_prefix = ''
+        self._swap_browser()
+        with self._stage('total'):
+            chunks = split_chunks(src_text, self._backend.max_text_length)
+            if len(chunks) <= 1:
+                tgt_text = self._translate_retry(src_lang, tgt_lang,
+                                                 src_text)
+            else:
+                seps = iter([sep for _, sep in chunks])
+
+                def translate_chunk(src_lang, tgt_lang, chunk):
+                    # Chunks are translated in order. Keep translated ones
+                    # to pass the whole partial text.
+                    tgt_chunk = self._translate_retry(src_lang, tgt_lang,
+                                                      chunk)
+                    self._partial_prefix += tgt_chunk + next(seps)
+                    return tgt_chunk
+
+                tgt_text, self._chunk_latencies = translate_chunks(
+                        translate_chunk, src_lang, tgt_lang, chunks, map)
+        METRICS.inc('gtransweb_translations_total',
+                    backend=self._backend_mode)
+        if src_text and not tgt_text:
+            METRICS.inc('gtransweb_empty_results_total',
+                        backend=self._backend_mode)
+        self._n_requests += 1
+        self._check_recycle()
+        return tgt_text
+
+    def _translate_retry(self, src_lang, tgt_lang, src_text):
+        for retry in range(self._max_retries + 1):
+            if self._exited:
+                # Do not relaunch browsers which nobody closes
+                logger.error('Failed to translate (already exited)')
+                return ''
             # Try to translate
             try:
+                if self._browser is None:
+                    self._create_browser()
                 return self._translate(src_lang, tgt_lang, src_text)
-            except WebDriverException:
-                # Restart browser
-                self._create_browser()
+            except WebDriverException as e:
+                if retry == self._max_retries:
+                    logger.error(f'Failed to translate ({e.msg})')
+                    return ''
+                # Restart browser (prepared one is used if available)
+                logger.warn('Restart browser')
+                METRICS.inc('gtransweb_restarts_total',
+                            backend=self._backend_mode)
+                if not self._swap_browser(force=True):
+                    try:
+                        self._create_browser()
+                    except WebDriverException:
+                        pass  # Try again
                 # Try again
 
+    def _check_recycle(self):
+        ''' Prepare a new browser in background if the policy says '''
+        reason = self.get_recycle_reason()
+        if reason is None:
+            return
+        with self._recycle_lock:
+            if self._preparing or self._next_browser is not None or \
+                    self._exited:
+                return
+            self._preparing = True
+        logger.info(f'Prepare new browser to recycle (reason: {reason})')
+        METRICS.inc('gtransweb_recycles_total', backend=self._backend_mode,
+                    reason=reason)
+
+        def prepare():
+            try:
+                browser = self._launch_browser()
+            except WebDriverException:
+                logger.error('Failed to prepare new browser')
+                browser = None
+            with self._recycle_lock:
+                self._preparing = False
+                if self._exited:
+                    _quit_browser(browser)
+                else:
+                    self._next_browser = browser
+
+        Thread(target=prepare, daemon=True).start()
+
+    def _swap_browser(self, force=False):
+        ''' Replace the browser by the prepared one and retire the old one
+            :param force: Wait for the preparation in progress.
+            :return: Whether swapped
+        '''
+        if force:
+            while self._preparing:
+                time.sleep(0.05)
+        with self._recycle_lock:
+            browser, self._next_browser = self._next_browser, None
+        if browser is None:
+            return False
+        old_browser = self._browser
+        self._set_browser(browser)
+        # Quit old one in background
+        Thread(target=_quit_browser, args=(old_browser,), daemon=True).start()
+        return True
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        ''' Translate multiple texts by packing them into few page loads '''
+        return translate_many(self, src_lang, tgt_lang, src_texts,
+                              self._backend.max_text_length, map)
+
     def _translate(self, src_lang, tgt_lang, src_text):
         if not src_text:
             return ''
+        self._check_cancelled()
+
+        # Try to reuse the loaded page
+        if self._in_place and self._page_langs == (src_lang, tgt_lang):
+            tgt_text = self._translate_in_place(src_text)
+            if tgt_text is not None:
+                return tgt_text
+            logger.debug('Page is drifted, fall back to navigation')
+
+        tgt_text = self._translate_navigate(src_lang, tgt_lang, src_text)
+        self._page_langs = (src_lang, tgt_lang) if tgt_text else None
+        return tgt_text
+
+    def _translate_in_place(self, src_text):
+        ''' Translate by setting text into the loaded page
+            :return: Translated text or `None` when the page is not usable.
+        '''
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        res_locator = (By.XPATH, self._backend.res_xpath)
+        try:
+            with self._stage('set_input'):
+                src_elem = self._browser.find_element(By.XPATH,
+                                                      self._backend.src_xpath)
+                # Remove previous text
+                _set_input_text(self._browser, src_elem, '')
+            # Wait for removing previous result
+            with self._stage('wait_invisible'):
+                self._wait_until(
+                        EC.invisibility_of_element_located(res_locator))
+            # Input new text and wait for the result
+            with self._stage('set_input'):
+                _set_input_text(self._browser, src_elem, src_text)
+            with self._stage('wait_result'):
+                result_elem = self._wait_until(
+                        EC.presence_of_element_located(res_locator))
+            with self._stage('extract'):
+                tgt_text = self._backend.get_result_text(result_elem)
+            return self._wait_stable(result_elem, tgt_text)
+
+        except (NoSuchElementException, StaleElementReferenceException,
+                TimeoutException):
+            METRICS.inc('gtransweb_in_place_fallbacks_total',
+                        backend=self._backend_mode)
+            return None
 
-        backend_mode = self._backend_mode
+    def _translate_navigate(self, src_lang, tgt_lang, src_text):
+        ''' Translate by navigating to the translation URL '''
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        res_locator = (By.XPATH, self._backend.res_xpath)
 
-        if backend_mode == 'google':
+        if self._backend.reload_before_translate:
             # Remove previous text
-            self._browser.get(TOP_URLS[backend_mode])
+            with self._stage('reload_top'):
+                self._browser.get(self._backend.top_url)
 
             # Wait for removing previous result
             try:
-                xpath = RES_XPATHS[backend_mode]
-                WebDriverWait(self._browser, self._timeout).until(
-                        EC.invisibility_of_element_located((By.XPATH, xpath)))
+                with self._stage('wait_invisible'):
+                    self._wait_until(
+                            EC.invisibility_of_element_located(res_locator))
             except TimeoutException:
                 pass
 
-        if backend_mode == 'google':
-            # Encode for URL
-            src_text = urllib_parse.quote_plus(src_text.encode('utf-8'))
-
         # Open translation URL
-        tra_url = TRA_URLS[backend_mode]
-        self._browser.get(tra_url.format(src_lang=src_lang, tgt_lang=tgt_lang,
-                                         src_text=src_text))
+        with self._stage('navigate'):
+            self._browser.get(self._backend.get_tra_url(src_lang, tgt_lang,
+                                                        src_text))
 
         # Extract result by XPath
         try:
-            xpath = RES_XPATHS[backend_mode]
-            result_elem = WebDriverWait(self._browser, self._timeout).until(
-                    EC.presence_of_element_located((By.XPATH, xpath)))
-            if backend_mode == 'google':
-                tgt_text = result_elem.text
-            else:
-                tgt_text = result_elem.get_attribute("innerHTML")
-            return tgt_text
+            with self._stage('wait_result'):
+                result_elem = self._wait_until(
+                        EC.presence_of_element_located(res_locator))
+            with self._stage('extract'):
+                tgt_text = self._backend.get_result_text(result_elem)
+            return self._wait_stable(result_elem, tgt_text)
 
         except TimeoutException:
             logger.warn('Timeout to translate')
+            METRICS.inc('gtransweb_timeouts_total',
+                        backend=self._backend_mode)
             return ''
 
+    def _wait_stable(self, result_elem, tgt_text):
+        ''' In streaming mode, poll the result element and pass partial texts
+            until it is unchanged for `STREAM_STABLE_TIME`
+            :return: Final text
+        '''
+        if self._partial_callback is None:
+            return tgt_text
+        with self._stage('stream'):
+            self._emit_partial(tgt_text)
+            now = time.monotonic()
+            stable_start, deadline = now, now + self._timeout
+            while now - stable_start < STREAM_STABLE_TIME and now < deadline:
+                time.sleep(STREAM_POLL_INTERVAL)
+                self._check_cancelled()
+                try:
+                    text = self._backend.get_result_text(result_elem)
+                except (NoSuchElementException,
+                        StaleElementReferenceException):
+                    break  # Result node is replaced. Use the last one.
+                now = time.monotonic()
+                if text != tgt_text:
+                    tgt_text, stable_start = text, now
+                    self._emit_partial(tgt_text)
+            return tgt_text
+
+    def _emit_partial(self, tgt_text):
+        if tgt_text:
+            self._partial_callback(self._partial_prefix + tgt_text)
+
+    def _stage(self, stage):
+        ''' Timer of a translation stage '''
+        return METRICS.timer('gtransweb_stage_seconds',
+                             backend=self._backend_mode, stage=stage)
+
+    def _check_cancelled(self):
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise TranslationCancelled()
+
+    def _wait_until(self, condition):
+        ''' Wait for the condition with checking cancellation '''
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        def cancellable_condition(browser):
+            self._check_cancelled()
+            return condition(browser)
+        return WebDriverWait(self._browser, self._timeout,
+                             poll_frequency=0.1).until(cancellable_condition)
+
+
+class GTransWebPool:
+    ''' Pool of pre-launched GTransWeb instances for concurrent translation
+        Each instance owns its own browser, so `translate()` calls from
+        different threads run in parallel up to `pool_size`.
+    '''
+
+    def __init__(self, pool_size=2, backend_mode='google',
+                 browser_modes=DEFAULT_BROWSER_MODES, headless=True,
+                 timeout=5, in_place=False, lean_profile=False,
+                 max_requests=1000, max_age=3600, max_rss=None):
+        ''' See GTransWeb for arguments '''
+        self._backend = get_backend(backend_mode)
+        self._backend_mode = self._backend.name
+        self._headless = headless
+        self._pool_size = pool_size
+
+        self._idle = Queue()
+        self._instances = []
+        self._lock = Lock()
+
+        # Statistics
+        self._start_time = time.perf_counter()
+        self._n_busy = 0
+        self._n_checkouts = 0
+        self._busy_time = 0.0
+        self._wait_time = 0.0
+        self._wait_time_max = 0.0
+        self._chunk_latencies = []
+
+        # Launch and pre-navigate all browsers in parallel
+        errors = []
+
+        def launch():
+            try:
+                gtrans = GTransWeb(self._backend, browser_modes, headless,
+                                   timeout, in_place, lean_profile,
+                                   max_requests, max_age, max_rss)
+            except Exception as e:
+                errors.append(e)
+                return
+            with self._lock:
+                self._instances.append(gtrans)
+            self._idle.put(gtrans)
+
+        threads = [Thread(target=launch, daemon=True)
+                   for _ in range(pool_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not self._instances:
+            raise errors[0]
+        if errors:
+            logger.error(f'Failed to launch {len(errors)} of {pool_size} '
+                         f'browsers ({errors[0]})')
+            self._pool_size = len(self._instances)
+
+    def get_backend_mode(self):
+        return self._backend_mode
+
+    def is_headless(self):
+        return self._headless
+
+    def get_pool_size(self):
+        return self._pool_size
+
+    def exit(self):
+        # Close all browsers
+        with self._lock:
+            for gtrans in self._instances:
+                gtrans.exit()
+
+    @contextmanager
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        ''' Check out an idle instance and return it after use
+            :param timeout: Maximum waiting time (sec). When it is expired,
+                            `queue.Empty` is raised. `None` waits forever.
+        '''
+        wait_start = time.perf_counter()
+        gtrans = self._idle.get(timeout=timeout)
+        busy_start = time.perf_counter()
+        wait = busy_start - wait_start
+        with self._lock:
+            self._n_busy += 1
+            self._n_checkouts += 1
+            self._wait_time += wait
+            self._wait_time_max = max(self._wait_time_max, wait)
+        try:
+            yield gtrans
+        finally:
+            with self._lock:
+                self._n_busy -= 1
+                self._busy_time += time.perf_counter() - busy_start
+            self._idle.put(gtrans)
+
+    def get_chunk_latencies(self):
+        ''' Get latencies of chunks in the last long text translation '''
+        return self._chunk_latencies
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None,
+                  partial_callback=None):
+        ''' Translate with an idle instance (blocks while all are busy)
+            Chunks of long text are translated in parallel, in which case
+            partial results are not streamed.
+        '''
+        def translate_one(src_lang, tgt_lang, src_text, partial_callback=None):
+            try:
+                with self.checkout() as gtrans:
+                    return gtrans.translate(src_lang, tgt_lang, src_text,
+                                            cancel_event, partial_callback)
+            except Empty:
+                logger.error('Failed to translate (no idle browser)')
+                return ''
+
+        chunks = split_chunks(src_text, self._backend.max_text_length)
+        if len(chunks) <= 1:
+            return translate_one(src_lang, tgt_lang, src_text,
+                                 partial_callback)
+        with ThreadPoolExecutor(self._pool_size) as executor:
+            tgt_text, self._chunk_latencies = translate_chunks(
+                    translate_one, src_lang, tgt_lang, chunks, executor.map)
+        return tgt_text
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        ''' Translate multiple texts. Packed batches run in parallel. '''
+        with ThreadPoolExecutor(self._pool_size) as executor:
+            return translate_many(self, src_lang, tgt_lang, src_texts,
+                                  self._backend.max_text_length, executor.map)
+
+    def get_stats(self):
+        ''' Get utilization and queue waiting statistics
+            `utilization` is the busy ratio of all instances since creation.
+        '''
+        with self._lock:
+            elapsed = time.perf_counter() - self._start_time
+            n_checkouts = self._n_checkouts
+            return {
+                'pool_size': self._pool_size,
+                'n_busy': self._n_busy,
+                'n_checkouts': n_checkouts,
+                'utilization': (self._busy_time /
+                                max(elapsed * self._pool_size, 1e-9)),
+                'wait_time_avg': self._wait_time / max(n_checkouts, 1),
+                'wait_time_max': self._wait_time_max,
+            }
+
 
 class GTransWebAsync:
     def __init__(self, backend_mode='google',
                  browser_modes=DEFAULT_BROWSER_MODES, headless=True,
-                 timeout=5, queue_size=1, query_interval=0.05):
-        self._gtransweb = GTransWeb(browser_modes, headless, timeout)
+                 timeout=5, queue_size=1, lean_profile=False):
+        self._gtransweb = GTransWeb(backend_mode, browser_modes, headless,
+                                    timeout, lean_profile=lean_profile)
 
-        self._query_queue = Queue(maxsize=queue_size)
-        self._query_interval = query_interval
+        self._scheduler = RequestScheduler(queue_size)
         self._thread = Thread(target=self._trans_loop, daemon=True)
         self._callback = None
 
@@ -140,45 +608,53 @@ class GTransWebAsync:
     def set_callback(self, callback):
         ''' Set callback which is call when translation is finished
             :param callback: Callback function. It must perform
-                             `callback(tgt_text)` and it called in another
-                             thread asynchronously.
+                             `callback(tgt_text, request_id)` and it called in
+                             another thread asynchronously.
         '''
         self._callback = callback
 
     def translate(self, src_lang, tgt_lang, src_text):
-        query = (src_lang, tgt_lang, src_text)
-        while True:
-            try:
-                # Push new item
-                self._query_queue.put_nowait(query)
-                # Success
-                return
-            except Full:
-                # Pop oldest item
-                try:
-                    time.sleep(self._query_interval)
-                    self._query_queue.get_nowait()
-                except Empty:
-                    pass
+        ''' Request translation and return its request ID
+            Queued requests superseded by newer ones are dropped and identical
+            pending requests are coalesced.
+        '''
+        return self._scheduler.put((src_lang, tgt_lang, src_text))
+
+    def is_latest(self, request_id):
+        ''' Whether the result of the request ID is not out-of-date '''
+        return self._scheduler.is_latest(request_id)
+
+    def get_stats(self):
+        return self._scheduler.get_stats()
 
     def _trans_loop(self):
         while True:
             # Wait for query
-            query = self._query_queue.get()
+            request = self._scheduler.get()
 
             # Translate
-            tgt_text = self._gtransweb.translate(*query)
+            tgt_text = self._gtransweb.translate(*request.query)
+            request_id = self._scheduler.task_done(request)
 
             # Pass the result
             if callable(self._callback):
-                self._callback(tgt_text)
+                self._callback(tgt_text, request_id)
             else:
                 logger.error('Callback is not set')
 
 
-def _create_browser(mode, headless=True):
+def _set_input_text(browser, elem, text):
+    ''' Set text into the input element as if it was typed '''
+    browser.execute_script('arguments[0].value = arguments[1];'
+                           'arguments[0].dispatchEvent('
+                           '    new Event("input", {bubbles: true}));',
+                           elem, text)
+
+
+def _create_browser(mode, headless=True, lean_profile=False):
     ''' Create a browser instance '''
-    logger.debug(f'Create browser (mode: {mode}, headless: {headless}')
+    logger.debug(f'Create browser (mode: {mode}, headless: {headless}, '
+                 f'lean_profile: {lean_profile})')
     try:
         if mode == 'chrome':
             # Chrome
@@ -186,6 +662,8 @@ def _create_browser(mode, headless=True):
             options = ChromeOptions()
             if headless:
                 options.add_argument('--headless')
+            if lean_profile:
+                _set_lean_chrome_options(options)
             return Chrome(options=options)
 
         elif mode == 'firefox':
@@ -194,6 +672,8 @@ def _create_browser(mode, headless=True):
             options = FirefoxOptions()
             if headless:
                 options.add_argument('-headless')
+            if lean_profile:
+                _set_lean_firefox_options(options)
             return Firefox(options=options, service_log_path=None)
 
         else:
@@ -205,13 +685,87 @@ def _create_browser(mode, headless=True):
         return None
 
 
-def _create_any_browser(modes, headless):
+def _set_lean_chrome_options(options):
+    ''' Disable images and third-party hosts, and cap processes and cache '''
+    # Do not wait for images and stylesheets
+    options.set_capability('pageLoadStrategy', 'eager')
+    options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.default_content_setting_values.notifications': 2,
+    })
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    rules = ', '.join(f'MAP {host} ~NOTFOUND' for host in BLOCKED_HOSTS)
+    options.add_argument(f'--host-resolver-rules={rules}')
+    options.add_argument('--renderer-process-limit=1')
+    options.add_argument(f'--disk-cache-size={LEAN_CACHE_SIZE}')
+    options.add_argument(f'--media-cache-size={LEAN_CACHE_SIZE}')
+    for arg in ['--disable-extensions', '--disable-background-networking',
+                '--disable-sync', '--disable-default-apps',
+                '--disable-component-update', '--no-first-run',
+                '--mute-audio']:
+        options.add_argument(arg)
+
+
+def _set_lean_firefox_options(options):
+    ''' Disable images, fonts and third-party hosts, and cap processes and
+        cache
+    '''
+    # Do not wait for images and stylesheets
+    options.set_capability('pageLoadStrategy', 'eager')
+    # Send blocked hosts to a closed port by proxy auto-config
+    pac = ('function FindProxyForURL(url, host) {'
+           f' if ({json.dumps(BLOCKED_HOSTS)}.indexOf(host) >= 0)'
+           ' return "PROXY 127.0.0.1:9"; return "DIRECT"; }')
+    prefs = {
+        'permissions.default.image': 2,
+        'gfx.downloadable_fonts.enabled': False,
+        'browser.display.use_document_fonts': 0,
+        'network.proxy.type': 2,
+        'network.proxy.autoconfig_url':
+            'data:text/javascript,' + urllib_parse.quote(pac),
+        'dom.ipc.processCount': 1,
+        'fission.autostart': False,
+        'browser.cache.disk.enable': False,
+        'browser.cache.memory.capacity': LEAN_CACHE_SIZE // 1024,  # KB
+        'network.prefetch-next': False,
+        'network.dns.disablePrefetch': True,
+        'media.autoplay.default': 5,
+        'toolkit.telemetry.enabled': False,
+        'datareporting.healthreport.uploadEnabled': False,
+        'app.update.enabled': False,
+    }
+    for key, value in prefs.items():
+        options.set_preference(key, value)
+
+
+def _quit_browser(browser):
+    ''' Try to close browser '''
+    try:
+        if browser:
+            browser.quit()
+    except Exception:
+        pass
+
+
+def _get_browser_rss(browser):
+    ''' Get RSS (MB) of the browser process tree. 0 when unknown. '''
+    rss = 0
+    try:
+        proc = psutil.Process(browser.service.process.pid)
+        for p in [proc] + proc.children(recursive=True):
+            rss += p.memory_info().rss
+    except (AttributeError, psutil.Error):
+        pass
+    return rss / 1024 / 1024
+
+
+def _create_any_browser(modes, headless, lean_profile=False):
     ''' Create an available browser instance by trying to create '''
     logger.debug('Create any browser')
 
     for mode in modes:
         # Try to create browser
-        browser = _create_browser(mode, headless)
+        browser = _create_browser(mode, headless, lean_profile)
         if browser is None:
             continue  # Failed
         else:
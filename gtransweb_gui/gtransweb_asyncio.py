@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class GTransWebAsyncio:
+    ''' asyncio client of GTransWeb (or GTransWebPool)
+        Browser works run on an executor whose size is the number of
+        browsers, so many requests can be awaited without a thread for each.
+
+        >>> client = GTransWebAsyncio(GTransWebPool(pool_size=4))
+        >>> tgt_text = await client.translate('en', 'ja', 'This is a pen')
+    '''
+
+    def __init__(self, gtrans, max_workers=None):
+        '''
+            :param gtrans: GTransWeb like object whose `translate()` accepts
+                           `cancel_event`.
+            :param max_workers: Number of worker threads. [default: pool size
+                                of `gtrans` or 1]
+        '''
+        self._gtrans = gtrans
+        if max_workers is None:
+            get_pool_size = getattr(gtrans, 'get_pool_size', None)
+            max_workers = get_pool_size() if callable(get_pool_size) else 1
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def get_backend_mode(self):
+        return self._gtrans.get_backend_mode()
+
+    def exit(self):
+        # Abandon waiting requests and close browser
+        self._executor.shutdown(wait=False)
+        self._gtrans.exit()
+
+    async def translate(self, src_lang, tgt_lang, src_text):
+        ''' Translate on the executor. Cancelling the awaiting task aborts
+            waiting for the browser.
+        '''
+        loop = asyncio.get_running_loop()
+        cancel_event = Event()
+        func = partial(self._gtrans.translate, src_lang, tgt_lang, src_text,
+                       cancel_event=cancel_event)
+        try:
+            return await loop.run_in_executor(self._executor, func)
+        except asyncio.CancelledError:
+            logger.debug('Translation is cancelled')
+            cancel_event.set()
+            raise
+
+
+def create_qt_event_loop(app):
+    ''' Create asyncio event loop running on Qt event loop
+        `qasync` package is required.
+        :param app: QApplication
+    '''
+    try:
+        import qasync
+    except ImportError:
+        logger.error('`qasync` is required for Qt event loop')
+        raise
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    return loop
@@ -1,40 +1,157 @@
 # -*- coding: utf-8 -*-
 import sys
+if __name__ == '__main__' and \
+        {'--profile_startup', '--profile-startup'} & set(sys.argv):
+    # Time the imports below too (`run_gui.sh --profile_startup`)
+    from startup_profile import IMPORT_PROFILER
+    IMPORT_PROFILER.start()
+import os
 import atexit
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+import time
 
-from PyQt5 import QtWidgets
+from PyQt5 import QtCore, QtWidgets
 
-from gtransweb import GTransWeb
+from backends import BACKENDS, TranslationCancelled
+from incremental_translator import (IncrementalTranslator,
+                                    find_changed_range, join_text)
+from metrics import METRICS, start_metrics_server
+from translation_cache import TranslationCache
+from translation_memory import GTransWebMemory, TranslationMemory, MEMORY_PATH
 from clipboard import Clipboard, ClipboardHandler
-from callable_buffer import CallableBuffer
+from callable_buffer import CallableBuffer, CancelEvent
 from window import Window
+# Browser engines (Selenium) and the daemon client are imported when the
+# browser is launched, after the window is shown
 
 # logging
 from logging import getLogger, NullHandler
 logger = getLogger(__name__)
 logger.addHandler(NullHandler())
 
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'gtransweb-gui',
+                          'translation_cache.sqlite3')
+BACKEND_MODES = list(BACKENDS.keys())
+
+
+class GTransWebSignals(QtCore.QObject):
+    ''' Signals to pass results from background threads to Qt main thread '''
+    gtrans_ready = QtCore.pyqtSignal(object)
+    gtrans_failed = QtCore.pyqtSignal(object)
+    translated = QtCore.pyqtSignal(object)
+    partial = QtCore.pyqtSignal(object)
+
 
 class GTransWebGui(object):
-    def __init__(self):
+    def __init__(self, keep_standby=False, max_standby=1,
+                 max_standby_rss=None, metrics_port=None,
+                 src_lang=None, tgt_lang=None, middle_lang=None,
+                 clip_mode=None, buf_time=None, overwrite=None,
+                 use_daemon=True, hedge=False, stream=True,
+                 lean_profile=False, profile_startup=False):
+        '''
+            :param keep_standby: Keep browsers of other backend modes warm to
+                                 switch instantly.
+            :param max_standby: Maximum number of standby browsers (to cap
+                                memory usage).
+            :param max_standby_rss: Maximum total RSS (MB) of standby
+                                    browsers (`None` disables). `psutil` is
+                                    needed.
+            :param metrics_port: Port to export metrics on (`None` disables).
+            :param middle_lang: Intermediate language for secondhand
+                                translation (`None` disables).
+            Other arguments override saved settings when they are not `None`.
+            `buf_time` is buffering time (msec) for selection mode.
+            :param use_daemon: Use the running translation daemon instead of
+                               launching browsers.
+            :param hedge: Send slow requests also to another backend and use
+                          the first result.
+            :param stream: Show partial results of long text with browser
+                           engines.
+            :param lean_profile: Launch browsers with the lean profile (see
+                                 `GTransWeb`).
+            :param profile_startup: Print startup profile to stderr when the
+                                    window is shown, and quit without
+                                    launching browsers.
+        '''
+        self._start_time = time.perf_counter()
+        self._startup_times = dict()  # Event name -> elapsed time (sec)
+        self._profile_startup = profile_startup
+
         # Qt application
         self._app = QtWidgets.QApplication([sys.argv[0]])
+        self._record_startup_time('qt_app')
+        self._signals = GTransWebSignals()
+        self._signals.gtrans_ready.connect(self._on_gtrans_ready)
+        self._signals.gtrans_failed.connect(self._on_gtrans_failed)
+        self._signals.translated.connect(self._on_translated)
+        self._signals.partial.connect(self._on_partial)
 
-        # Translation engine (will be set by events)
-        self._gtrans = GTransWeb()
+        # Translation engine (will be set after warm-up in background)
+        self._gtrans = None
+        self._standby = dict()  # (backend_mode, headless) -> GTransWeb
+        self._keep_standby = keep_standby
+        self._max_standby = max_standby
+        self._max_standby_rss = max_standby_rss
+        self._warming_up = set()  # (backend_mode, headless)
+        self._pending_query = None  # Translation requested during warm-up
+        # Worker thread of translation (requests are processed in order, and
+        # the one in progress is cancelled by newer one)
+        self._executor = ThreadPoolExecutor(1)
+        self._request_id = 0  # ID of the newest request
+        self._cancel_event = None  # Event of the request in progress
+        self._partial_text = None  # Partial result shown in GUI
+        self._middle_lang = middle_lang
+        self._use_daemon = use_daemon
+        self._hedge = hedge
+        self._stream = stream
+        self._lean_profile = lean_profile
+        # Translation cache
+        self._cache = TranslationCache(db_path=CACHE_PATH)
+        # Translation of changed sentences only
+        self._incremental = IncrementalTranslator(self._cache)
+        self._tgt_segments = None  # Translated segments shown in GUI
+        self._record_startup_time('cache')
+        # Fuzzy translation memory
+        self._memory = TranslationMemory(db_path=MEMORY_PATH)
+        self._record_startup_time('memory')
+        # Metrics export
+        self._metrics_server = None
+        if metrics_port is not None:
+            self._metrics_server = start_metrics_server(metrics_port)
 
         # Clipboard and its handler
         self._clipboard = Clipboard(self._app)
         self._clip_handler = ClipboardHandler(self._clipboard)
         self._clip_handler.set_callback(self._on_clip_changed)
+        self._record_startup_time('clipboard')
+        # Buffer for live mode (translation while typing)
+        self._live_buf = CallableBuffer(cancellable=True)
         # Main window
+        self._window = None  # Settings are not loaded yet
         self._window = Window(self._translate, self._on_clipmode_changed,
                               self._on_backendmode_changed,
                               self._on_headless_changed,
-                              self._clipboard.get_mode_strs(),
-                              GTransWeb.BACKEND_MODES)
+                              self._clipboard.get_mode_strs(), BACKEND_MODES,
+                              self._on_src_changed, self._cancel)
         # Buffer for selection mode
-        self._select_buf = CallableBuffer()
+        self._select_buf = CallableBuffer(cancellable=True)
+        # Override saved settings by arguments
+        if src_lang is not None or tgt_lang is not None:
+            cur_src_lang, cur_tgt_lang = self._window.get_langs()
+            self._window.set_langs(src_lang or cur_src_lang,
+                                   tgt_lang or cur_tgt_lang)
+        if clip_mode is not None:
+            self._window.set_clip_mode(clip_mode)
+        if buf_time is not None:
+            self._select_buf.set_buftime(buf_time / 1000)
+        if overwrite is not None:
+            self._window.set_overwrite(overwrite)
+        self._record_startup_time('window')
+
+        # Launch browser in background after the window is shown
+        QtCore.QTimer.singleShot(0, self._on_shown)
 
         # Exit function should be call at exit
         atexit.register(self.exit)
@@ -45,10 +162,35 @@ class GTransWebGui(object):
 
     def exit(self):
         ''' Exit application '''
-        self._gtrans.exit()
+        self._cancel()
+        self._executor.shutdown(wait=False)
+        if self._gtrans is not None:
+            self._gtrans.exit()
+        for gtrans in self._standby.values():
+            gtrans.exit()
+        self._cache.close()
+        self._memory.close()
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+
+    def get_startup_report(self):
+        ''' Get elapsed times (sec) from start to each initialization step
+            (`qt_app`, `cache`, `memory`, `clipboard` and `window` created),
+            `shown` (event loop started), `browser` ready and
+            `first_translation` finished.
+        '''
+        return dict(self._startup_times)
 
-    def _translate(self, src_text=None):
-        ''' Translate passed text. If not passed, it will be get from GUI. '''
+    def clear_cache(self):
+        ''' Invalidate all cached translations '''
+        self._cache.clear()
+
+    def _translate(self, src_text=None, use_cache=True, cancel_event=None):
+        ''' Translate passed text in background. If not passed, it will be
+            get from GUI. The request in progress is superseded.
+            When `use_cache` is False, the cached result is not used.
+            When `cancel_event` is set, the translation is discarded.
+        '''
         # Get languages from GUI
         src_lang, tgt_lang = self._window.get_langs()
         # Source text
@@ -58,14 +200,319 @@ class GTransWebGui(object):
         else:
             # Set text to GUI
             self._window.set_src_text(src_text)
-        # Start translation
-        tgt_text = self._gtrans.translate(src_lang, tgt_lang, src_text)
+
+        # Postpone until the browser is ready (only newest one)
+        if self._gtrans is None:
+            self._pending_query = (src_text, use_cache)
+            # Retry if the launch failed
+            self._start_warmup(self._get_gtrans_mode())
+            return
+
+        # Supersede the request in progress
+        if self._cancel_event is not None:
+            self._cancel_event.cancel('superseded')
+        self._request_id += 1
+        self._partial_text = None
+        self._cancel_event = cancel_event if cancel_event is not None \
+            else CancelEvent()
+        self._window.set_busy(True)
+        self._window.set_status('Translating...')
+        self._executor.submit(self._run_translation, self._request_id,
+                              self._gtrans, src_lang, tgt_lang, src_text,
+                              use_cache, self._cancel_event)
+
+    def _cancel(self):
+        ''' Cancel the translation in progress '''
+        self._pending_query = None
+        if self._cancel_event is None:
+            return
+        self._cancel_event.cancel('user')
+        self._cancel_event = None
+        self._request_id += 1  # Discard the result even if finished
+        self._window.set_busy(False)
+        self._window.set_status('Cancelled')
+
+    def _run_translation(self, request_id, gtrans, src_lang, tgt_lang,
+                         src_text, use_cache, cancel_event):
+        ''' Translate in worker thread, then pass the result to Qt main
+            thread by signal. Only changed sentences are sent, and ones
+            similar to translated ones are served by the translation memory.
+            Browser engines stream partial results.
+        '''
+        start = time.perf_counter()
+        tgt_segments, error = None, None
+        first_partial = []
+
+        def on_partial(text):
+            if not first_partial:
+                first_partial.append(text)
+                METRICS.observe('gtransweb_gui_first_partial_seconds',
+                                time.perf_counter() - start)
+            self._signals.partial.emit((request_id, text))
+
+        from gtransweb import GTransWeb
+        partial_callback = on_partial if self._stream and \
+            isinstance(gtrans, GTransWeb) else None
+        gtrans = GTransWebMemory(gtrans, self._memory, use_cache)
+        try:
+            if cancel_event.is_set():
+                raise TranslationCancelled()  # Superseded while queued
+            if self._middle_lang is not None:
+                # Secondhand translation
+                src_text = join_text(self._incremental.translate(
+                        gtrans, src_lang, self._middle_lang, src_text,
+                        use_cache, cancel_event))
+                src_lang = self._middle_lang
+            tgt_segments = self._incremental.translate(
+                    gtrans, src_lang, tgt_lang, src_text, use_cache,
+                    cancel_event, partial_callback)
+        except TranslationCancelled:
+            if cancel_event.get_reason() == 'debounce':
+                # Newer text came to the buffer during translation
+                METRICS.inc('gtransweb_debounce_discarded_total')
+            error = 'Cancelled'
+        except Exception as e:
+            logger.error(f'Failed to translate ({e})')
+            error = f'Failed to translate ({e})'
+        latency = time.perf_counter() - start
+        if tgt_segments is not None:
+            METRICS.observe('gtransweb_gui_translate_seconds', latency)
+        self._signals.translated.emit((request_id, tgt_segments, latency,
+                                       error))
+
+    def _on_translated(self, result):
+        ''' When translation finished, set it to GUI (in Qt main thread) '''
+        request_id, tgt_segments, latency, error = result
+        if request_id != self._request_id:
+            return  # Superseded or cancelled
+        self._cancel_event = None
+        self._partial_text = None
+        self._window.set_busy(False)
+        if tgt_segments is None:
+            self._window.set_status(error)
+            return
+        tgt_text = join_text(tgt_segments)
+        self._window.set_status(self._get_metrics_summary(latency))
 
         # Set to GUI
-        self._window.set_tgt_text(tgt_text)
+        self._set_tgt_segments(tgt_segments)
         # Set to clipboard
         if self._window.get_overwrite():
             self._clip_handler.overwrite_clip(tgt_text)
+        self._record_startup_time('first_translation')
+
+    def _on_partial(self, result):
+        ''' When partial result came, show it (in Qt main thread) '''
+        request_id, text = result
+        if request_id != self._request_id:
+            return  # Superseded or cancelled
+        shown = self._partial_text
+        if shown is not None and text.startswith(shown) and \
+                self._window.get_tgt_text() == shown:
+            self._window.append_tgt_text(text[len(shown):])  # Grown
+        else:
+            self._window.set_tgt_text(text)
+        self._partial_text = text
+
+    def _set_tgt_segments(self, segments):
+        ''' Set translated segments to GUI by replacing changed ones only '''
+        old_segments = self._tgt_segments
+        self._tgt_segments = segments
+        if self._window.get_tgt_text() == join_text(segments):
+            return  # Already shown (e.g. the last partial result)
+        if old_segments is None or \
+                self._window.get_tgt_text() != join_text(old_segments):
+            self._window.set_tgt_text(join_text(segments))
+            return
+        start, old_end, new_end = find_changed_range(old_segments, segments)
+        pos = len(join_text(old_segments[:start]))
+        end = pos + len(join_text(old_segments[start:old_end]))
+        self._window.splice_tgt_text(pos, end,
+                                     join_text(segments[start:new_end]))
+
+    def _get_metrics_summary(self, latency):
+        ''' Summary of translation metrics for status bar '''
+        backend_mode = self._gtrans.get_backend_mode()
+        hist = METRICS.get_histogram('gtransweb_gui_translate_seconds')
+        n_timeouts = METRICS.get_counter('gtransweb_timeouts_total',
+                                         backend=backend_mode)
+        n_restarts = METRICS.get_counter('gtransweb_restarts_total',
+                                         backend=backend_mode)
+        n_skipped = sum(self._clip_handler.get_stats().values())
+        return (f'{backend_mode}: {latency * 1000:.0f} ms '
+                f'(p50 <= {hist.quantile(0.5) * 1000:.0f} ms, '
+                f'timeouts {n_timeouts}, restarts {n_restarts}, '
+                f'clipboard skipped {n_skipped})')
+
+    def _get_gtrans_mode(self):
+        ''' Get (backend_mode, headless) set in GUI '''
+        return self._window.get_backend_mode(), self._window.get_headless()
+
+    def _start_warmup(self, gtrans_mode):
+        ''' Launch and pre-navigate browser in background '''
+        if gtrans_mode in self._warming_up:
+            return
+        self._warming_up.add(gtrans_mode)
+        backend_mode, headless = gtrans_mode
+
+        def warmup():
+            from gtransweb import GTransWeb
+            from gtransweb_hedged import create_hedged
+            from translation_daemon import connect_daemon
+
+            def create_engine(mode):
+                return GTransWeb(mode, headless=headless,
+                                 lean_profile=self._lean_profile)
+
+            gtrans = None
+            try:
+                if headless and self._use_daemon:
+                    # Be a thin client of the running daemon
+                    gtrans = connect_daemon(backend_mode=backend_mode)
+                if gtrans is None and self._hedge:
+                    gtrans = create_hedged(create_engine, backend_mode,
+                                           BACKEND_MODES)
+                if gtrans is None:
+                    gtrans = create_engine(backend_mode)
+            except Exception as e:
+                # e.g. No browser is installed, or network is down
+                logger.error(f'Failed to start browser ({e})')
+                self._signals.gtrans_failed.emit((gtrans_mode, e))
+                return
+            self._signals.gtrans_ready.emit(gtrans)
+
+        Thread(target=warmup, daemon=True).start()
+
+    def _on_gtrans_ready(self, gtrans):
+        ''' When warm-up finished, use it or keep it (in Qt main thread) '''
+        gtrans_mode = (gtrans.get_backend_mode(), gtrans.is_headless())
+        self._warming_up.discard(gtrans_mode)
+        if gtrans_mode == self._get_gtrans_mode():
+            self._swap_gtrans(gtrans)
+            self._record_startup_time('browser')
+        else:
+            # Settings are changed during warm-up
+            self._add_standby(gtrans)
+
+    def _on_gtrans_failed(self, result):
+        ''' When warm-up failed, show it and allow retry (in Qt main
+            thread). The launch is retried by a switch to the mode or by a
+            translation request.
+        '''
+        gtrans_mode, error = result
+        self._warming_up.discard(gtrans_mode)
+        if gtrans_mode == self._get_gtrans_mode():
+            message = str(error).strip()
+            self._window.set_status(f'Failed to start browser '
+                                    f'({gtrans_mode[0]}): {message}')
+
+    def _swap_gtrans(self, gtrans):
+        ''' Replace translation engine atomically (in Qt main thread) '''
+        from translation_daemon import TranslationClient
+        if self._gtrans is not None:
+            self._add_standby(self._gtrans)
+        self._gtrans = gtrans
+        if isinstance(gtrans, TranslationClient):
+            self._window.set_status(f'Ready ({gtrans.get_backend_mode()}, '
+                                    f'daemon)')
+        else:
+            self._window.set_status(f'Ready ({gtrans.get_backend_mode()})')
+        self._warmup_standby()
+
+        # Translate postponed one
+        if self._pending_query is not None:
+            src_text, use_cache = self._pending_query
+            self._pending_query = None
+            self._translate(src_text, use_cache)
+
+    def _add_standby(self, gtrans):
+        ''' Keep the browser as standby, or close it '''
+        gtrans_mode = (gtrans.get_backend_mode(), gtrans.is_headless())
+        if (self._keep_standby and gtrans_mode not in self._standby and
+                gtrans_mode[1] == self._window.get_headless() and
+                len(self._standby) < self._max_standby and
+                not self._is_standby_rss_over(_get_rss(gtrans))):
+            self._standby[gtrans_mode] = gtrans
+        else:
+            self._retire(gtrans)
+
+    def _retire(self, gtrans):
+        ''' Close the engine after the requests already submitted to the
+            worker, which may be using it. Closing runs in background not
+            to block GUI and the next requests.
+        '''
+        self._executor.submit(Thread(target=gtrans.exit, daemon=True).start)
+
+    def _warmup_standby(self):
+        ''' Launch standby browsers of other backend modes '''
+        if not self._keep_standby:
+            return
+        headless = self._window.get_headless()
+        for backend_mode in BACKEND_MODES:
+            gtrans_mode = (backend_mode, headless)
+            n_standby = len(self._standby) + len(self._warming_up)
+            if n_standby >= self._max_standby or \
+                    self._is_standby_rss_over():
+                break
+            if (gtrans_mode in self._standby or self._gtrans is None or
+                    gtrans_mode == (self._gtrans.get_backend_mode(),
+                                    self._gtrans.is_headless())):
+                continue
+            self._start_warmup(gtrans_mode)
+
+    def _is_standby_rss_over(self, additional_rss=0):
+        ''' Whether total RSS (MB) of standby browsers with additional one
+            exceeds the maximum
+        '''
+        if self._max_standby_rss is None:
+            return False
+        rss = sum(_get_rss(gtrans) for gtrans in self._standby.values())
+        return rss + additional_rss > self._max_standby_rss
+
+    def _on_gtrans_mode_changed(self):
+        ''' Switch to the translation engine of GUI settings without
+            blocking. The current one keeps serving until the new one is
+            ready.
+        '''
+        if self._window is None:
+            return  # Called while loading settings
+        gtrans_mode = self._get_gtrans_mode()
+        if self._gtrans is not None and gtrans_mode == (
+                self._gtrans.get_backend_mode(), self._gtrans.is_headless()):
+            return
+        # Drop standby browsers of other headless mode
+        for mode in list(self._standby.keys()):
+            if mode[1] != gtrans_mode[1]:
+                self._retire(self._standby.pop(mode))
+
+        if gtrans_mode in self._standby:
+            # Switch instantly
+            self._swap_gtrans(self._standby.pop(gtrans_mode))
+        else:
+            self._window.set_status(f'Starting browser ({gtrans_mode[0]})...')
+            self._start_warmup(gtrans_mode)
+
+    def _on_shown(self):
+        ''' When the event loop started with the window shown '''
+        self._record_startup_time('shown')
+        if self._profile_startup:
+            from startup_profile import IMPORT_PROFILER, format_report
+            IMPORT_PROFILER.stop()
+            start_time = IMPORT_PROFILER.get_start_time() or self._start_time
+            print(format_report(IMPORT_PROFILER.get_times(),
+                                self.get_startup_report(),
+                                time.perf_counter() - start_time),
+                  file=sys.stderr)
+            self._app.quit()
+            return
+        self._on_gtrans_mode_changed()
+
+    def _record_startup_time(self, name):
+        if name in self._startup_times:
+            return
+        elapsed = time.perf_counter() - self._start_time
+        self._startup_times[name] = elapsed
+        logger.info(f'Startup time ({name}): {elapsed:.3f}s')
 
     def _on_clip_changed(self, src_text):
         ''' When clipboard changed, start to translate. '''
@@ -76,25 +523,47 @@ class GTransWebGui(object):
             # Translate right now
             self._translate(src_text)
 
+    def _on_src_changed(self):
+        ''' When source text is edited, translate it in live mode '''
+        if self._window is None or not self._window.get_live():
+            return
+        self._live_buf(self._translate)
+
     def _on_clipmode_changed(self, mode_str):
         ''' When GUI changed, connect to clipboard'''
         self._clipboard.set_mode(mode_str)
 
     def _on_backendmode_changed(self, mode_str):
         ''' When GUI changed, connect to gtrans '''
-        # Restart browser
-        self._gtrans.exit()
-        headless = self._gtrans.is_headless()
-        self._gtrans = GTransWeb(backend_mode=mode_str, headless=headless)
+        self._on_gtrans_mode_changed()
 
     def _on_headless_changed(self, checked):
         ''' When GUI changed, connect to gtrans '''
-        checked = bool(checked)
-        # Restart browser
-        self._gtrans.exit()
-        backend = self._gtrans.get_backend_mode()
-        self._gtrans = GTransWeb(backend_mode=backend, headless=checked)
+        self._on_gtrans_mode_changed()
+
+
+def _get_rss(gtrans):
+    ''' Get RSS (MB) of the browsers of the engine. 0 when unknown. '''
+    get_rss = getattr(gtrans, 'get_rss', None)
+    return get_rss() if callable(get_rss) else 0
+
+
+def run_gui(args):
+    ''' Run GUI with parsed command line arguments (see `cli.py`) '''
+    GTransWebGui(keep_standby=args.keep_standby,
+                 max_standby=args.max_standby,
+                 max_standby_rss=args.max_standby_rss,
+                 metrics_port=args.metrics_port,
+                 src_lang=args.src_lang, tgt_lang=args.tgt_lang,
+                 middle_lang=args.middle_lang if args.double else None,
+                 clip_mode=args.clip_mode, buf_time=args.buf_time,
+                 overwrite=args.overwrite,
+                 use_daemon=not args.no_daemon, hedge=args.hedge,
+                 stream=not args.no_stream,
+                 lean_profile=args.lean_profile,
+                 profile_startup=args.profile_startup).run()
 
 
 if __name__ == '__main__':
-    GTransWebGui().run()
+    from cli import build_parser
+    run_gui(build_parser().parse_args())
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from threading import BoundedSemaphore, Event, local
+import time
+
+from backends import TranslationCancelled, get_backend
+from metrics import METRICS
+from text_segments import translate_many
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class GTransWebHedged:
+    ''' Hedged requests across two translation engines
+        A request goes to the secondary engine only when the primary one has
+        not answered within a percentile of its observed latency. The first
+        non-empty result wins and the other is cancelled, so tail latency is
+        cut with a few percent of extra load. Results of the secondary are
+        not memoized under the primary's backend mode (see
+        `is_last_result_cacheable()`).
+
+        >>> gtrans = GTransWebHedged(GTransWeb('google'), GTransWeb('deepl'))
+    '''
+
+    def __init__(self, primary, secondary, percentile=95, min_samples=20,
+                 default_delay=1.0, window=200):
+        '''
+            :param primary: GTransWeb like object whose `translate()` accepts
+                            `cancel_event`.
+            :param secondary: Engine of another backend.
+            :param percentile: Percentile of primary latency to hedge after.
+            :param min_samples: Number of latency samples needed to use the
+                                percentile. `default_delay` (sec) is used
+                                until then.
+            :param window: Number of recent latency samples kept.
+        '''
+        self._engines = [primary, secondary]
+        # Limit concurrent requests to each engine by its pool size
+        self._pool_sizes = [getattr(e, 'get_pool_size', lambda: 1)()
+                            for e in self._engines]
+        self._semaphores = [BoundedSemaphore(n) for n in self._pool_sizes]
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._default_delay = default_delay
+        self._latencies = deque(maxlen=window)  # Primary latencies (sec)
+        self._local = local()  # Whether the secondary won the last request
+        self._executor = ThreadPoolExecutor(2 * sum(self._pool_sizes))
+        self._max_text_length = min(
+                get_backend(e.get_backend_mode()).max_text_length
+                for e in self._engines)
+
+        # Statistics
+        self._n_requests = 0
+        self._n_hedged = 0
+        self._n_secondary_wins = 0
+
+    def get_backend_mode(self):
+        return self._engines[0].get_backend_mode()
+
+    def is_headless(self):
+        return self._engines[0].is_headless()
+
+    def get_pool_size(self):
+        return self._pool_sizes[0]
+
+    def exit(self):
+        self._executor.shutdown(wait=False)
+        for engine in self._engines:
+            engine.exit()
+
+    def is_last_result_cacheable(self):
+        ''' Whether the last result in the calling thread is of the primary
+            (for all texts of `translate_many()`)
+        '''
+        return not getattr(self._local, 'secondary_won', False)
+
+    def get_hedge_delay(self):
+        ''' Time (sec) to wait for the primary before hedging '''
+        if len(self._latencies) < self._min_samples:
+            return self._default_delay
+        latencies = sorted(self._latencies)
+        idx = int(round(self._percentile / 100 * (len(latencies) - 1)))
+        return latencies[idx]
+
+    def get_stats(self):
+        return {'n_requests': self._n_requests, 'n_hedged': self._n_hedged,
+                'n_secondary_wins': self._n_secondary_wins,
+                'hedge_delay': self.get_hedge_delay()}
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        ''' Translate by the primary, and also by the secondary if slow '''
+        if not getattr(self._local, 'in_many', False):
+            self._local.secondary_won = False
+        if not src_text:
+            return ''
+        self._n_requests += 1
+        query = (src_lang, tgt_lang, src_text)
+        events = [Event(), Event()]
+        futures = [self._executor.submit(self._run, 0, query, events[0])]
+        pending = set(futures)
+        hedge_time = time.monotonic() + self.get_hedge_delay()
+        try:
+            while pending:
+                # Wait for results, the hedge time or cancellation
+                timeout = 0.1
+                if len(futures) == 1:
+                    timeout = min(max(hedge_time - time.monotonic(), 0), 0.1)
+                done, pending = wait(pending, timeout, FIRST_COMPLETED)
+                for future in done:
+                    idx = futures.index(future)
+                    tgt_text = future.result()
+                    if tgt_text:
+                        if idx == 1:
+                            self._local.secondary_won = True
+                            self._n_secondary_wins += 1
+                            METRICS.inc('gtransweb_hedge_wins_total',
+                                        backend=self._backend_mode(1))
+                        return tgt_text
+                if cancel_event is not None and cancel_event.is_set():
+                    raise TranslationCancelled()
+                # Hedge when the primary is slow or failed
+                if len(futures) == 1 and (not pending or
+                                          time.monotonic() >= hedge_time):
+                    self._n_hedged += 1
+                    METRICS.inc('gtransweb_hedged_total',
+                                backend=self._backend_mode(0))
+                    logger.debug('Hedge request to secondary backend')
+                    futures.append(self._executor.submit(self._run, 1, query,
+                                                         events[1]))
+                    pending.add(futures[1])
+            return ''
+        finally:
+            # Cancel the loser
+            for event in events:
+                event.set()
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        ''' Translate multiple texts by packing them into few requests '''
+        self._local.secondary_won = False
+        self._local.in_many = True
+        try:
+            return translate_many(self, src_lang, tgt_lang, src_texts,
+                                  self._max_text_length, map)
+        finally:
+            self._local.in_many = False
+
+    def _backend_mode(self, idx):
+        return self._engines[idx].get_backend_mode()
+
+    def _run(self, idx, query, cancel_event):
+        ''' Translate by an engine. Empty string when failed or cancelled. '''
+        with self._semaphores[idx]:
+            if cancel_event.is_set():
+                return ''
+            start = time.perf_counter()
+            try:
+                tgt_text = self._engines[idx].translate(
+                        *query, cancel_event=cancel_event)
+            except TranslationCancelled:
+                return ''
+            except Exception as e:
+                logger.error(f'Failed to translate ({e})')
+                return ''
+            if idx == 0:
+                # Only completed requests (cancelled ones are cut short)
+                self._latencies.append(time.perf_counter() - start)
+            return tgt_text
+
+
+def create_hedged(create_engine, backend_mode, backend_modes, **kwargs):
+    ''' Create engines of the backend and another one in parallel
+        :param create_engine: Function of `backend_mode` -> engine.
+        :param backend_modes: Candidates of the secondary backend (e.g.
+                              `GTransWeb.BACKEND_MODES`).
+        :param kwargs: Arguments of `GTransWebHedged`.
+    '''
+    secondary_mode = next(mode for mode in backend_modes
+                          if mode != backend_mode)
+    with ThreadPoolExecutor(2) as executor:
+        primary, secondary = executor.map(create_engine,
+                                          [backend_mode, secondary_mode])
+    return GTransWebHedged(primary, secondary, **kwargs)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+from backends import TranslationCancelled, is_result_cacheable
+from text_segments import join_segments, split_segments, split_text
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Streaming: minimum length (characters) of changed text to stream. Shorter
+# text is translated without waiting for the result to be stable.
+STREAM_MIN_LENGTH = 200
+
+
+class IncrementalTranslator:
+    ''' Translate text segment by segment through the translation cache
+        Translations of segments are memoized, so only changed segments are
+        sent when an edited text is translated again.
+    '''
+
+    def __init__(self, cache, granularity='sentence',
+                 stream_min_length=STREAM_MIN_LENGTH):
+        '''
+            :param cache: TranslationCache to memoize segments.
+            :param granularity: 'sentence' or 'paragraph'
+            :param stream_min_length: Minimum length of changed text to
+                                      stream.
+        '''
+        self._cache = cache
+        self._granularity = granularity
+        self._stream_min_length = stream_min_length
+        self._n_sent = 0  # Number of segments sent in the last translation
+
+    def get_n_sent(self):
+        ''' Number of segments sent in the last translation '''
+        return self._n_sent
+
+    def translate(self, gtrans, src_lang, tgt_lang, src_text, use_cache=True,
+                  cancel_event=None, partial_callback=None):
+        ''' Translate changed segments
+            :param use_cache: When `False`, all segments are sent again.
+            :param partial_callback: Streaming mode for long changed text.
+                                     Runs of consecutive changed segments
+                                     are sent in order, and
+                                     `partial_callback(text)` is called
+                                     with the whole partial text.
+            :return: List of (translated segment, separator) pairs
+        '''
+        segments = split_text(src_text, self._granularity)
+        backend_mode = gtrans.get_backend_mode()
+
+        # Look up memoized segments
+        results = dict()
+        for seg, _ in segments:
+            if seg.strip() and use_cache and seg not in results:
+                tgt_seg = self._cache.get(backend_mode, src_lang, tgt_lang,
+                                          seg)
+                if tgt_seg is not None:
+                    results[seg] = tgt_seg
+        missing = list(dict.fromkeys(seg for seg, _ in segments
+                                     if seg.strip() and seg not in results))
+        self._n_sent = len(missing)
+
+        if partial_callback is not None and missing and \
+                sum(map(len, missing)) >= self._stream_min_length:
+            return self._translate_runs(gtrans, src_lang, tgt_lang, segments,
+                                        results, cancel_event,
+                                        partial_callback)
+
+        # Translate changed segments together
+        if len(missing) == 1:
+            tgt_segs = [self._cache.translate(gtrans, src_lang, tgt_lang,
+                                              missing[0], False,
+                                              cancel_event)]
+        elif missing:
+            logger.debug(f'Translate {len(missing)}/{len(segments)} '
+                         'segments')
+            tgt_segs = gtrans.translate_many(src_lang, tgt_lang, missing)
+            if cancel_event is not None and cancel_event.is_set():
+                raise TranslationCancelled()
+            cacheable = is_result_cacheable(gtrans)
+            for seg, tgt_seg in zip(missing, tgt_segs):
+                # Empty result means failure
+                if tgt_seg and cacheable:
+                    self._cache.put(backend_mode, src_lang, tgt_lang, seg,
+                                    tgt_seg)
+        else:
+            tgt_segs = []
+        results.update(zip(missing, tgt_segs))
+
+        return [(results[seg] if seg.strip() else seg, sep)
+                for seg, sep in segments]
+
+    def _translate_runs(self, gtrans, src_lang, tgt_lang, segments, results,
+                        cancel_event, partial_callback):
+        ''' Translate runs of consecutive missing segments in order '''
+        tgt_segments = []
+        run = []  # Missing segments
+
+        def translate_run():
+            prefix = join_text(tgt_segments)
+            tgt_segments.extend(self._translate_run(
+                    gtrans, src_lang, tgt_lang, run, cancel_event,
+                    lambda text: partial_callback(prefix + text)))
+            run.clear()
+
+        for seg, sep in segments:
+            if seg.strip() and seg not in results:
+                run.append((seg, sep))
+                continue
+            if run:
+                translate_run()
+            tgt_segments.append((results.get(seg, seg), sep))
+        if run:
+            translate_run()
+        return tgt_segments
+
+    def _translate_run(self, gtrans, src_lang, tgt_lang, run, cancel_event,
+                       partial_callback):
+        ''' Stream a run of segments packed with markers (as
+            `translate_many`), so that each segment is memoized with its own
+            translation. Lost (e.g. merged) segments are sent one by one.
+            :return: List of (translated segment, separator) pairs
+        '''
+        if len(run) == 1:
+            seg, sep = run[0]
+            return [(self._cache.translate(gtrans, src_lang, tgt_lang, seg,
+                                           False, cancel_event,
+                                           partial_callback), sep)]
+
+        def on_partial(text):
+            # Segments received so far in order (the last one may be partial)
+            tgt_segs = split_segments(text, len(run))
+            partial = []
+            for i, (_, sep) in enumerate(run):
+                if i not in tgt_segs:
+                    break
+                partial.append((tgt_segs[i], sep))
+            if partial:
+                partial_callback(join_text(partial[:-1]) + partial[-1][0])
+
+        kwargs = dict(partial_callback=on_partial)
+        if cancel_event is not None:
+            kwargs['cancel_event'] = cancel_event
+        packed = gtrans.translate(src_lang, tgt_lang,
+                                  join_segments([seg for seg, _ in run]),
+                                  **kwargs)
+        if cancel_event is not None and cancel_event.is_set():
+            raise TranslationCancelled()
+        if not packed:  # Empty result means failure
+            return [('', sep) for _, sep in run]
+        tgt_segs = split_segments(packed, len(run))
+        if len(tgt_segs) < len(run):
+            logger.debug(f'Lost {len(run) - len(tgt_segs)} segments')
+        backend_mode = gtrans.get_backend_mode()
+        cacheable = is_result_cacheable(gtrans)
+        tgt_segments = []
+        for i, (seg, sep) in enumerate(run):
+            if i in tgt_segs:
+                tgt_seg = tgt_segs[i]
+                if cacheable:
+                    self._cache.put(backend_mode, src_lang, tgt_lang, seg,
+                                    tgt_seg)
+            else:
+                tgt_seg = self._cache.translate(gtrans, src_lang, tgt_lang,
+                                                seg, False, cancel_event)
+            tgt_segments.append((tgt_seg, sep))
+        return tgt_segments
+
+
+def find_changed_range(old_segments, new_segments):
+    ''' Find the range of segments to replace by skipping common prefix and
+        suffix
+        :return: Tuple of (start, old end, new end) indices
+    '''
+    n_min = min(len(old_segments), len(new_segments))
+    start = 0
+    while start < n_min and old_segments[start] == new_segments[start]:
+        start += 1
+    n_suffix = 0
+    while n_suffix < n_min - start and \
+            old_segments[-1 - n_suffix] == new_segments[-1 - n_suffix]:
+        n_suffix += 1
+    return start, len(old_segments) - n_suffix, len(new_segments) - n_suffix
+
+
+def join_text(segments):
+    ''' Join (segment, separator) pairs '''
+    return ''.join(seg + sep for seg, sep in segments)
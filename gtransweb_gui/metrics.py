@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock, Thread
+import json
+import time
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Upper bounds of histogram buckets (sec)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, float('inf'))
+
+
+class Histogram:
+    ''' Bucketed histogram of observed values '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        ''' Estimate quantile by upper bound of the bucket '''
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        acc = 0
+        for bound, count in zip(self.buckets, self.counts):
+            acc += count
+            if acc >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    ''' Always-on, low-overhead histograms and counters with labels '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._histograms = dict()  # (name, labels) -> Histogram
+        self._counters = dict()  # (name, labels) -> value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        ''' Observe elapsed time (sec) of the block '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def get_counter(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def get_histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._histograms.get(key)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        ''' Get all metrics as a JSON serializable dictionary '''
+        with self._lock:
+            histograms = [{
+                'name': name, 'labels': dict(labels), 'count': hist.count,
+                'sum': hist.sum, 'p50': hist.quantile(0.5),
+                'p95': hist.quantile(0.95), 'p99': hist.quantile(0.99),
+                'buckets': {_fmt_bound(b): c for b, c
+                            in zip(hist.buckets, hist.counts)},
+            } for (name, labels), hist in self._histograms.items()]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in self._counters.items()]
+        for hist in histograms:
+            for key in ['p50', 'p95', 'p99']:
+                if hist[key] == float('inf'):
+                    hist[key] = None
+        return {'histograms': histograms, 'counters': counters}
+
+    def to_prometheus(self):
+        ''' Get all metrics in Prometheus text exposition format '''
+        lines = []
+        with self._lock:
+            for (name, labels), hist in sorted(self._histograms.items()):
+                acc = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    acc += count
+                    le = labels + (('le', _fmt_bound(bound)),)
+                    lines.append(f'{name}_bucket{_fmt_labels(le)} {acc}')
+                lines.append(f'{name}_sum{_fmt_labels(labels)} {hist.sum}')
+                lines.append(f'{name}_count{_fmt_labels(labels)} '
+                             f'{hist.count}')
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append(f'{name}{_fmt_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Default registry shared in the process
+METRICS = MetricsRegistry()
+
+
+def start_metrics_server(port=9464, registry=METRICS, host='127.0.0.1'):
+    ''' Serve `/metrics` (Prometheus text) and `/metrics.json` in background
+        :return: HTTP server. Call `shutdown()` to stop.
+    '''
+    # Imported here not to slow down the startup without metrics export
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = registry.to_prometheus().encode('utf-8')
+                content_type = 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body = json.dumps(registry.snapshot()).encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f'Metrics server is started (http://{host}:{port}/metrics)')
+    return server
+
+
+def _fmt_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"'
+                          for k, v in labels) + '}'
+
+
+def _escape_label(value):
+    ''' Escape label value for Prometheus text format '''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+                     .replace('\n', '\\n')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+from threading import Condition
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class Request:
+    ''' Scheduled query with request IDs coalesced into it '''
+
+    def __init__(self, request_id, query):
+        self.request_ids = [request_id]
+        self.query = query
+
+    @property
+    def request_id(self):
+        ''' Newest request ID attached to this request '''
+        return self.request_ids[-1]
+
+
+class RequestScheduler:
+    ''' Latest-wins request scheduler with generation IDs
+        Each request gets a monotonically increasing ID (generation). When
+        the queue is full, the oldest queued requests are dropped. Identical
+        queries which are queued or running are coalesced into one.
+    '''
+
+    def __init__(self, queue_size=1):
+        '''
+            :param queue_size: Maximum number of queued requests.
+                               0 means infinite.
+        '''
+        self._queue_size = queue_size
+        self._queue = deque()
+        self._running = []
+        self._cond = Condition()
+        self._generation = 0
+
+        # Counters
+        self._n_requests = 0
+        self._n_dropped = 0
+        self._n_coalesced = 0
+
+    def put(self, query):
+        ''' Push new query and return its request ID '''
+        with self._cond:
+            self._generation += 1
+            request_id = self._generation
+            self._n_requests += 1
+
+            # Coalesce with identical query
+            for request in list(self._running) + list(self._queue):
+                if request.query == query:
+                    request.request_ids.append(request_id)
+                    self._n_coalesced += 1
+                    return request_id
+
+            # Push and drop superseded ones
+            self._queue.append(Request(request_id, query))
+            while 0 < self._queue_size < len(self._queue):
+                dropped = self._queue.popleft()
+                self._n_dropped += 1
+                logger.debug(f'Drop request {dropped.request_id}')
+            self._cond.notify()
+            return request_id
+
+    def get(self, timeout=None):
+        ''' Pop oldest request and mark it as running
+            :return: `Request` or `None` when timeout is expired.
+        '''
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue, timeout):
+                return None
+            request = self._queue.popleft()
+            self._running.append(request)
+            return request
+
+    def task_done(self, request):
+        ''' Mark the request as finished and return its newest request ID '''
+        with self._cond:
+            self._running.remove(request)
+            return request.request_id
+
+    def clear(self):
+        ''' Drop all queued requests '''
+        with self._cond:
+            self._n_dropped += len(self._queue)
+            self._queue.clear()
+
+    def get_latest_id(self):
+        return self._generation
+
+    def is_latest(self, request_id):
+        ''' Whether the request ID is not superseded by newer one '''
+        return request_id == self._generation
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'n_requests': self._n_requests,
+                'n_dropped': self._n_dropped,
+                'n_coalesced': self._n_coalesced,
+                'n_queued': len(self._queue),
+                'n_running': len(self._running),
+            }
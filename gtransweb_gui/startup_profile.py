@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+''' Startup profile: time of module imports and of initialization steps
+
+    $ python -m gtransweb_gui --profile_startup
+'''
+import builtins
+from collections import defaultdict
+from importlib.util import resolve_name
+import sys
+import threading
+import time
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Number of packages listed in the report (others are summed up)
+N_REPORT_PACKAGES = 12
+
+
+class ImportProfiler:
+    ''' Import timer hooking `builtins.__import__` (like `-X importtime`)
+        Only imports of new modules in the thread which started profiling
+        are timed. Self time excludes nested imports.
+    '''
+
+    def __init__(self):
+        self._orig_import = None
+        self._thread_id = None
+        self._start_time = None
+        self._stack = []  # Elapsed time of nested imports per level
+        self._times = dict()  # Module name -> [self time, total time] (sec)
+
+    def start(self):
+        ''' Start timing imports '''
+        if self._orig_import is not None:
+            return
+        self._thread_id = threading.get_ident()
+        self._start_time = time.perf_counter()
+        self._orig_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        ''' Stop timing imports '''
+        if self._orig_import is None:
+            return
+        builtins.__import__ = self._orig_import
+        self._orig_import = None
+
+    def get_start_time(self):
+        ''' `time.perf_counter()` at `start()` (`None` before start) '''
+        return self._start_time
+
+    def get_times(self):
+        ''' Get module name -> (self time, total time) (sec) '''
+        return {name: tuple(t) for name, t in self._times.items()}
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        orig_import = self._orig_import
+        if orig_import is None or \
+                threading.get_ident() != self._thread_id:
+            return (orig_import or builtins.__import__)(
+                    name, globals, locals, fromlist, level)
+        module_name = name
+        if level > 0:
+            try:
+                module_name = resolve_name('.' * level + name,
+                                           (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                pass
+        # New module, or new submodules by `from name import submodule`
+        if module_name in sys.modules:
+            labels = [f'{module_name}.{attr}' for attr in fromlist or ()
+                      if attr != '*' and
+                      f'{module_name}.{attr}' not in sys.modules]
+            if not labels:
+                return orig_import(name, globals, locals, fromlist, level)
+        else:
+            labels = [module_name]
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return orig_import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            nested = self._stack.pop()
+            # Names in `fromlist` may be attributes instead of modules
+            labels = [label for label in labels if label in sys.modules]
+            if labels:
+                if self._stack:
+                    self._stack[-1] += total
+                times = self._times.setdefault(labels[0], [0.0, 0.0])
+                times[0] += total - nested
+                times[1] += total
+            elif self._stack:
+                self._stack[-1] += nested
+
+
+IMPORT_PROFILER = ImportProfiler()
+
+
+def group_by_package(import_times):
+    ''' Sum up self times (sec) by top-level package name '''
+    package_times = defaultdict(float)
+    for name, (self_time, _) in import_times.items():
+        package_times[name.split('.')[0]] += self_time
+    return dict(package_times)
+
+
+def format_report(import_times, init_times, time_to_window=None):
+    '''
+        :param import_times: Module name -> (self time, total time) (sec).
+        :param init_times: Step name -> elapsed time (sec) from the start of
+                           initialization, in order.
+        :param time_to_window: Time (sec) from the start of imports to the
+                               window shown.
+        :return: Report text in msec
+    '''
+    lines = ['Startup profile (ms)']
+    package_times = sorted(group_by_package(import_times).items(),
+                           key=lambda item: -item[1])
+    lines.append(f'  {"imports":<24}'
+                 f'{sum(t for _, t in package_times) * 1e3:9.1f}')
+    for package, elapsed in package_times[:N_REPORT_PACKAGES]:
+        lines.append(f'    {package:<22}{elapsed * 1e3:9.1f}')
+    others = package_times[N_REPORT_PACKAGES:]
+    if others:
+        lines.append(f'    {f"({len(others)} others)":<22}'
+                     f'{sum(t for _, t in others) * 1e3:9.1f}')
+
+    lines.append(f'  {"init":<24}'
+                 f'{max(init_times.values(), default=0) * 1e3:9.1f}')
+    prev = 0.0
+    for step, elapsed in init_times.items():
+        lines.append(f'    {step:<22}{(elapsed - prev) * 1e3:9.1f}')
+        prev = elapsed
+    if time_to_window is not None:
+        lines.append(f'  {"time to window":<24}{time_to_window * 1e3:9.1f}')
+    return '\n'.join(lines)
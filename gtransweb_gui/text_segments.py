@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import re
+import time
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+# Segment marker put on its own line before each packed segment.
+# Translators often convert brackets into full-width ones, so they are also
+# accepted when splitting.
+MARKER_FMT = '[{}]'
+_MARKER_RE = re.compile(r'^[ \t]*[\[［【][ \t]*(\d+)[ \t]*[\]］】][ \t]*$',
+                        re.MULTILINE)
+
+# Paragraph separator (blank lines) and sentence (with trailing whitespace)
+_PARAGRAPH_RE = re.compile(r'(\n[ \t]*\n\s*)')
+_SENTENCE_RE = re.compile(r'[^\n]*?(?:[.!?]+(?=\s)|[。！？]+|\n|$)\s*')
+
+
+def pack_segments(texts, max_length):
+    ''' Pack texts into batches whose joined text fits in `max_length`
+        Texts which conflict with markers or are too long are packed alone.
+        :return: List of batches (lists of texts)
+    '''
+    batches = []
+    batch = []
+    for text in texts:
+        if _MARKER_RE.search(text) or len(join_segments([text])) > max_length:
+            batches.append([text])  # Alone
+            continue
+        if batch and len(join_segments(batch + [text])) > max_length:
+            batches.append(batch)
+            batch = []
+        batch.append(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def join_segments(texts):
+    ''' Join texts with numbered marker lines '''
+    return ''.join(MARKER_FMT.format(i) + '\n' + text.strip() + '\n\n'
+                   for i, text in enumerate(texts)).rstrip('\n')
+
+
+def split_segments(text, n_segments):
+    ''' Split text joined by `join_segments` (after translation)
+        Segments are identified by marker numbers, so reordering is allowed.
+        Merged or lost segments are just missing in the result.
+        :return: Dictionary from segment index to text
+    '''
+    segments = dict()
+    matches = list(_MARKER_RE.finditer(text))
+    for i, match in enumerate(matches):
+        idx = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        seg = text[match.end():end].strip()
+        if idx >= n_segments or idx in segments or not seg:
+            logger.debug(f'Invalid segment is found (index: {idx})')
+            continue
+        segments[idx] = seg
+    return segments
+
+
+def split_sentences(text):
+    ''' Split text into sentences
+        :return: List of (sentence, trailing whitespace) pairs
+    '''
+    sentences = []
+    for match in _SENTENCE_RE.finditer(text):
+        sentence = match.group()
+        if not sentence:
+            continue
+        body = sentence.rstrip()
+        sentences.append((body, sentence[len(body):]))
+    return sentences
+
+
+def split_text(text, granularity='sentence'):
+    ''' Split text into sentences or paragraphs
+        :param granularity: 'sentence' or 'paragraph'
+        :return: List of (segment, separator) pairs. Joining
+                 `segment + separator` of all pairs restores the text.
+    '''
+    segments = []
+    parts = _PARAGRAPH_RE.split(text)
+    for para, para_sep in zip(parts[0::2], parts[1::2] + ['']):
+        if granularity == 'paragraph' or not para:
+            body = para.rstrip()
+            segments.append((body, para[len(body):] + para_sep))
+            continue
+        sentences = split_sentences(para)
+        body, sep = sentences[-1]
+        sentences[-1] = (body, sep + para_sep)
+        segments.extend(sentences)
+    return segments
+
+
+def split_chunks(text, max_length):
+    ''' Split text into chunks at paragraph and sentence boundaries
+        Consecutive paragraphs and sentences are merged up to `max_length`.
+        :return: List of (chunk, separator) pairs. Joining `chunk + separator`
+                 of all pairs restores the text.
+    '''
+    # Split into pieces shorter than `max_length`
+    pieces = []
+    parts = _PARAGRAPH_RE.split(text)
+    for para, para_sep in zip(parts[0::2], parts[1::2] + ['']):
+        if len(para) <= max_length:
+            pieces.append((para, para_sep))
+            continue
+        sentences = split_sentences(para)
+        for i, (sentence, sep) in enumerate(sentences):
+            if i == len(sentences) - 1:
+                sep += para_sep
+            pieces.extend(_split_hard(sentence, sep, max_length))
+
+    # Merge pieces up to `max_length`
+    chunks = []
+    for piece, sep in pieces:
+        if chunks:
+            prev_chunk, prev_sep = chunks[-1]
+            merged = prev_chunk + prev_sep + piece
+            if len(merged) <= max_length:
+                chunks[-1] = (merged, sep)
+                continue
+        chunks.append((piece, sep))
+    return chunks
+
+
+def _split_hard(text, sep, max_length):
+    ''' Split a too long sentence at spaces (or anywhere if impossible) '''
+    pieces = []
+    while len(text) > max_length:
+        pos = text.rfind(' ', 1, max_length + 1)
+        if pos < 0:
+            pieces.append((text[:max_length], ''))
+            text = text[max_length:]
+        else:
+            pieces.append((text[:pos], ' '))
+            text = text[pos + 1:]
+    pieces.append((text, sep))
+    return pieces
+
+
+def translate_chunks(translate_func, src_lang, tgt_lang, chunks, map_func):
+    ''' Translate chunks made by `split_chunks` and reassemble them in order
+        :param map_func: `map` like function to run chunks.
+        :return: Translated text and latency of each chunk (sec)
+    '''
+    def translate_chunk(chunk):
+        start = time.perf_counter()
+        tgt_text = translate_func(src_lang, tgt_lang, chunk)
+        return tgt_text, time.perf_counter() - start
+
+    results = list(map_func(translate_chunk, [c for c, _ in chunks]))
+    latencies = [latency for _, latency in results]
+    logger.debug(f'Translated {len(chunks)} chunks (latency max: '
+                 f'{max(latencies):.3f}s, total: {sum(latencies):.3f}s)')
+    tgt_text = ''.join(tgt_chunk + sep for (tgt_chunk, _), (_, sep)
+                       in zip(results, chunks))
+    return tgt_text, latencies
+
+
+def translate_many(gtrans, src_lang, tgt_lang, src_texts, max_length,
+                   map_func):
+    ''' Translate deduplicated texts packed into batches
+        :param gtrans: GTransWeb like object to translate packed texts.
+        :param max_length: Maximum length of packed text.
+        :param map_func: `map` like function to run batches.
+    '''
+    uniq_texts = list(dict.fromkeys(t for t in src_texts if t))
+    batches = pack_segments(uniq_texts, max_length)
+
+    def translate_batch(batch):
+        if len(batch) == 1:
+            return [gtrans.translate(src_lang, tgt_lang, batch[0])]
+        packed = gtrans.translate(src_lang, tgt_lang, join_segments(batch))
+        segments = split_segments(packed, len(batch))
+        if len(segments) < len(batch):
+            logger.debug(f'Lost {len(batch) - len(segments)} segments')
+        # Translate lost (e.g. merged) segments one by one
+        return [segments[i] if i in segments else
+                gtrans.translate(src_lang, tgt_lang, text)
+                for i, text in enumerate(batch)]
+
+    results = dict()
+    for batch, tgt_texts in zip(batches, map_func(translate_batch, batches)):
+        results.update(zip(batch, tgt_texts))
+    return [results[t] if t else '' for t in src_texts]
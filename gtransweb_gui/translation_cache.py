@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+
+from backends import is_result_cacheable
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+
+class TranslationCache:
+    ''' Two-tier translation cache (in-memory LRU + on-disk SQLite)
+        Keys are (backend_mode, src_lang, tgt_lang, normalized text).
+    '''
+
+    def __init__(self, max_entries=1024, db_path=None, max_db_entries=100000,
+                 ttl=7 * 24 * 3600, db_evict_interval=100):
+        '''
+            :param max_entries: Maximum number of in-memory entries.
+            :param db_path: Path of SQLite file. `None` disables disk tier.
+            :param max_db_entries: Maximum number of on-disk entries. It may
+                                   be exceeded by `db_evict_interval`.
+            :param ttl: Time to live of each entry (sec). `None` is infinite.
+            :param db_evict_interval: Number of puts between evictions of
+                                      on-disk entries (counting entries
+                                      scans the table).
+        '''
+        self._max_entries = max_entries
+        self._max_db_entries = max_db_entries
+        self._ttl = ttl
+        self._db_evict_interval = max(db_evict_interval, 1)
+        self._n_db_puts = 0  # Since the last eviction
+
+        self._lock = Lock()
+        self._mem = OrderedDict()  # key -> (created time, tgt_text)
+        self._db = None
+        if db_path is not None:
+            self._db = _open_db(db_path)
+
+        # Counters
+        self._n_mem_hits = 0
+        self._n_db_hits = 0
+        self._n_misses = 0
+        self._n_evictions = 0
+
+    def close(self):
+        ''' Close on-disk tier '''
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, backend_mode, src_lang, tgt_lang, src_text):
+        ''' Get cached translation. Return `None` when not found. '''
+        key = _make_key(backend_mode, src_lang, tgt_lang, src_text)
+        now = time.time()
+        with self._lock:
+            # 1st tier
+            entry = self._mem.get(key)
+            if entry is not None:
+                if self._is_alive(entry[0], now):
+                    self._mem.move_to_end(key)
+                    self._n_mem_hits += 1
+                    return entry[1]
+                del self._mem[key]
+
+            # 2nd tier
+            if self._db is not None:
+                row = self._db.execute('SELECT created, tgt_text FROM cache '
+                                       'WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    if self._is_alive(row[0], now):
+                        self._put_mem(key, row[0], row[1])
+                        self._n_db_hits += 1
+                        return row[1]
+                    self._db.execute('DELETE FROM cache WHERE key = ?',
+                                     (key,))
+                    self._db.commit()
+
+            self._n_misses += 1
+            return None
+
+    def put(self, backend_mode, src_lang, tgt_lang, src_text, tgt_text):
+        ''' Store a translation into both tiers '''
+        key = _make_key(backend_mode, src_lang, tgt_lang, src_text)
+        now = time.time()
+        with self._lock:
+            self._put_mem(key, now, tgt_text)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO cache '
+                                 '(key, created, tgt_text) VALUES (?, ?, ?)',
+                                 (key, now, tgt_text))
+                self._n_db_puts += 1
+                if self._n_db_puts >= self._db_evict_interval:
+                    self._evict_db()
+                self._db.commit()
+
+    def invalidate(self, backend_mode, src_lang, tgt_lang, src_text):
+        ''' Remove one entry from both tiers '''
+        key = _make_key(backend_mode, src_lang, tgt_lang, src_text)
+        with self._lock:
+            self._mem.pop(key, None)
+            if self._db is not None:
+                self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self._db.commit()
+
+    def clear(self):
+        ''' Remove all entries from both tiers '''
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM cache')
+                self._db.commit()
+
+    def translate(self, gtrans, src_lang, tgt_lang, src_text, use_cache=True,
+                  cancel_event=None, partial_callback=None):
+        ''' Translate via `gtrans` (GTransWeb like object) through the cache
+            :param use_cache: When `False`, the cache is bypassed for lookup
+                              but refreshed with the new result.
+            :param cancel_event: Passed to `gtrans.translate()` if not `None`.
+            :param partial_callback: Passed to `gtrans.translate()` if not
+                                     `None` (streaming mode).
+        '''
+        if not src_text:
+            return ''
+        backend_mode = gtrans.get_backend_mode()
+        if use_cache:
+            tgt_text = self.get(backend_mode, src_lang, tgt_lang, src_text)
+            if tgt_text is not None:
+                return tgt_text
+        kwargs = dict()
+        if cancel_event is not None:
+            kwargs['cancel_event'] = cancel_event
+        if partial_callback is not None:
+            kwargs['partial_callback'] = partial_callback
+        tgt_text = gtrans.translate(src_lang, tgt_lang, src_text, **kwargs)
+        # Empty result means failure (e.g. timeout)
+        if tgt_text and is_result_cacheable(gtrans):
+            self.put(backend_mode, src_lang, tgt_lang, src_text, tgt_text)
+        return tgt_text
+
+    def get_stats(self):
+        ''' Get hit/miss counters and sizes '''
+        with self._lock:
+            n_db_entries = 0
+            if self._db is not None:
+                n_db_entries = self._db.execute(
+                        'SELECT COUNT(*) FROM cache').fetchone()[0]
+            n_hits = self._n_mem_hits + self._n_db_hits
+            n_lookups = n_hits + self._n_misses
+            return {
+                'n_mem_hits': self._n_mem_hits,
+                'n_db_hits': self._n_db_hits,
+                'n_misses': self._n_misses,
+                'n_evictions': self._n_evictions,
+                'hit_rate': n_hits / max(n_lookups, 1),
+                'n_mem_entries': len(self._mem),
+                'n_db_entries': n_db_entries,
+            }
+
+    def _is_alive(self, created, now):
+        return self._ttl is None or now - created < self._ttl
+
+    def _put_mem(self, key, created, tgt_text):
+        self._mem[key] = (created, tgt_text)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self._max_entries:
+            self._mem.popitem(last=False)
+            self._n_evictions += 1
+
+    def _evict_db(self):
+        self._n_db_puts = 0
+        # Expired entries
+        if self._ttl is not None:
+            self._db.execute('DELETE FROM cache WHERE created < ?',
+                             (time.time() - self._ttl,))
+        # Oldest entries over the size limit
+        n_entries = self._db.execute('SELECT COUNT(*) FROM cache')
+        n_over = n_entries.fetchone()[0] - self._max_db_entries
+        if n_over > 0:
+            self._db.execute('DELETE FROM cache WHERE key IN (SELECT key FROM '
+                             'cache ORDER BY created LIMIT ?)', (n_over,))
+            self._n_evictions += n_over
+
+
+def normalize_text(text):
+    ''' Normalize source text for cache keys '''
+    text = unicodedata.normalize('NFC', text)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.strip()
+
+
+def _make_key(backend_mode, src_lang, tgt_lang, src_text):
+    src_text = normalize_text(src_text)
+    raw = '\0'.join((backend_mode, src_lang, tgt_lang, src_text))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _open_db(db_path):
+    ''' Open (or create) SQLite file for the cache '''
+    logger.debug(f'Open translation cache ({db_path})')
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    db = sqlite3.connect(db_path, check_same_thread=False)
+    db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, '
+               'created REAL, tgt_text TEXT)')
+    db.execute('CREATE INDEX IF NOT EXISTS cache_created ON cache (created)')
+    db.commit()
+    return db
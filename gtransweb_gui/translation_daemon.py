@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+''' Local translation daemon sharing warm browsers across many clients
+
+    $ python gtransweb_gui/translation_daemon.py [--port PORT]
+          [--backend_mode {google,deepl}] [--pool_size N] [--http]
+
+    API (HTTP/JSON on localhost):
+        POST /translate  {"client": ID, "src_lang": .., "tgt_lang": ..,
+                          "texts": [..]} -> {"texts": [..]}
+        GET  /status     Backend mode, pool size and statistics
+        GET  /metrics    Prometheus text of `metrics.METRICS`
+'''
+from collections import OrderedDict, deque
+from concurrent.futures import (Future, TimeoutError as FutureTimeoutError,
+                                wait)
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Condition, Lock, Thread
+import argparse
+import http.client
+import json
+import os
+import socket
+import time
+
+from gtranshttp import HttpConnectionPool
+from metrics import METRICS
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+DEFAULT_PORT = 9465
+# Timeout (sec) to connect to the daemon and get its status. It is local, so
+# clients fail fast when it is not running (or not responding).
+CONNECT_TIMEOUT = 1.0
+
+
+class FairQueue:
+    ''' Per-client FIFO queues served in round-robin
+        A batch collects items with the same key (e.g. language pair) by
+        taking one item from each client in turn, so that a client sending
+        many texts cannot starve the others.
+    '''
+
+    def __init__(self):
+        self._cond = Condition()
+        self._queues = OrderedDict()  # client -> deque of (key, item)
+        self._closed = False
+
+    def put(self, client, key, item):
+        with self._cond:
+            queue = self._queues.get(client)
+            if queue is None:
+                queue = self._queues[client] = deque()
+            queue.append((key, item))
+            self._cond.notify()
+
+    def get_batch(self, max_items):
+        ''' Get items with the same key. Blocks until an item is available.
+            :return: Key and list of items. Empty list when closed.
+        '''
+        with self._cond:
+            while not self._queues and not self._closed:
+                self._cond.wait()
+            if not self._queues:
+                return None, []
+            # Key of the head item of the next client
+            key = next(iter(self._queues.values()))[0][0]
+            batch = []
+            served = []
+            progress = True
+            while progress and len(batch) < max_items:
+                progress = False
+                for client, queue in self._queues.items():
+                    if len(batch) >= max_items:
+                        break
+                    if queue and queue[0][0] == key:
+                        batch.append(queue.popleft()[1])
+                        served.append(client)
+                        progress = True
+            # Rotate served clients to the end and remove empty queues
+            for client in OrderedDict.fromkeys(served):
+                if self._queues[client]:
+                    self._queues.move_to_end(client)
+                else:
+                    del self._queues[client]
+            return key, batch
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def get_n_clients(self):
+        with self._cond:
+            return len(self._queues)
+
+
+class TranslationDaemon:
+    ''' HTTP/JSON server multiplexing requests of clients onto one engine
+        Queued texts with the same language pair are translated together
+        with `translate_many()`.
+    '''
+
+    def __init__(self, gtrans, port=DEFAULT_PORT, host='127.0.0.1',
+                 max_batch=16, timeout=60):
+        '''
+            :param gtrans: Translation engine (GTransWeb, GTransWebPool or
+                           GTransHttp). The number of workers is its pool
+                           size.
+            :param max_batch: Maximum number of texts in a batch.
+            :param timeout: Timeout to wait for each request (sec).
+        '''
+        self._gtrans = gtrans
+        self._max_batch = max_batch
+        self._timeout = timeout
+        self._queue = FairQueue()
+        self._server = ThreadingHTTPServer((host, port),
+                                           self._create_handler())
+        self._server.daemon_threads = True
+        get_pool_size = getattr(gtrans, 'get_pool_size', lambda: 1)
+        self._workers = [Thread(target=self._work_loop, daemon=True)
+                         for _ in range(get_pool_size())]
+
+        # Statistics (updated by handler and worker threads)
+        self._stats_lock = Lock()
+        self._n_requests = 0
+        self._n_texts = 0
+        self._n_batches = 0
+        self._n_timeouts = 0
+
+    def get_port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        ''' Start serving in background '''
+        for worker in self._workers:
+            worker.start()
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info(f'Translation daemon is started (port: {self.get_port()}'
+                    f', backend: {self._gtrans.get_backend_mode()})')
+
+    def shutdown(self):
+        ''' Stop serving. The engine is not exited. '''
+        self._server.shutdown()
+        self._server.server_close()
+        self._queue.close()
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = {'n_requests': self._n_requests, 'n_texts': self._n_texts,
+                     'n_batches': self._n_batches,
+                     'n_timeouts': self._n_timeouts}
+        stats.update(n_queued=len(self._queue),
+                     n_clients=self._queue.get_n_clients())
+        return stats
+
+    def get_status(self):
+        get_pool_size = getattr(self._gtrans, 'get_pool_size', lambda: 1)
+        return {'backend_mode': self._gtrans.get_backend_mode(),
+                'headless': self._gtrans.is_headless(),
+                'pool_size': get_pool_size(),
+                'stats': self.get_stats()}
+
+    def translate_many(self, client, src_lang, tgt_lang, src_texts):
+        ''' Queue texts of the client and wait for the results
+            :raise: `concurrent.futures.TimeoutError` when all of them are not
+                    translated within the timeout. Texts still in the queue
+                    are not translated.
+        '''
+        with self._stats_lock:
+            self._n_requests += 1
+            self._n_texts += len(src_texts)
+        futures = []
+        for src_text in src_texts:
+            future = Future()
+            self._queue.put(client, (src_lang, tgt_lang), (src_text, future))
+            futures.append(future)
+        _, not_done = wait(futures, self._timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()  # Skipped by workers if not started
+            with self._stats_lock:
+                self._n_timeouts += 1
+            raise FutureTimeoutError()
+        return [future.result() for future in futures]
+
+    def _work_loop(self):
+        while True:
+            langs, batch = self._queue.get_batch(self._max_batch)
+            if not batch:
+                break  # Closed
+            # Drop cancelled (timed out) items
+            batch = [(src_text, future) for src_text, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._stats_lock:
+                self._n_batches += 1
+            self._translate_batch(*langs, batch)
+
+    def _translate_batch(self, src_lang, tgt_lang, batch):
+        src_texts = [src_text for src_text, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            if len(src_texts) == 1:
+                tgt_texts = [self._gtrans.translate(src_lang, tgt_lang,
+                                                    src_texts[0])]
+            else:
+                tgt_texts = self._gtrans.translate_many(src_lang, tgt_lang,
+                                                        src_texts)
+        except Exception as e:
+            logger.error(f'Failed to translate ({e})')
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, tgt_text in zip(futures, tgt_texts):
+            future.set_result(tgt_text)
+
+    def _create_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path == '/status':
+                    self._send(200, json.dumps(daemon.get_status()),
+                               'application/json')
+                elif self.path == '/metrics':
+                    self._send(200, METRICS.to_prometheus(),
+                               'text/plain; version=0.0.4')
+                else:
+                    self._send(404, json.dumps({'error': 'Not found'}))
+
+            def do_POST(self):
+                if self.path != '/translate':
+                    self._send(404, json.dumps({'error': 'Not found'}))
+                    return
+                try:
+                    length = int(self.headers['Content-Length'])
+                    query = json.loads(self.rfile.read(length))
+                    src_texts = query['texts']
+                    args = (str(query.get('client', self.client_address[0])),
+                            query['src_lang'], query['tgt_lang'], src_texts)
+                except (KeyError, TypeError, ValueError) as e:
+                    self._send(400, json.dumps({'error': f'Bad request {e}'}))
+                    return
+                try:
+                    tgt_texts = daemon.translate_many(*args)
+                except FutureTimeoutError:
+                    self._send(504, json.dumps({'error': 'Timeout'}))
+                    return
+                except Exception as e:
+                    self._send(500, json.dumps({'error': str(e)}))
+                    return
+                self._send(200, json.dumps({'texts': tgt_texts}))
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type='application/json'):
+                body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class TranslationClient:
+    ''' Thin client of the translation daemon
+        It has the same interface as GTransWeb.
+    '''
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1', client_id=None,
+                 timeout=60, connect_timeout=CONNECT_TIMEOUT):
+        '''
+            :param client_id: Identifier for fair scheduling in the daemon.
+                              Process ID is used by default.
+            :param timeout: Timeout of translation requests (sec).
+            :param connect_timeout: Timeout to get the status first (sec).
+            :raise: `OSError` or `http.client.HTTPException` when the daemon
+                    is not running.
+        '''
+        self._url = f'http://{host}:{port}'
+        self._client_id = client_id or f'{socket.gethostname()}-{os.getpid()}'
+        probe = HttpConnectionPool(max_connections=1, timeout=connect_timeout)
+        try:
+            self._status = self._get_status(probe)
+        finally:
+            probe.close()
+        self._conn_pool = HttpConnectionPool(max_connections=4,
+                                             timeout=timeout)
+
+    def get_status(self):
+        ''' Get status of the daemon '''
+        return self._get_status(self._conn_pool)
+
+    def _get_status(self, conn_pool):
+        body = conn_pool.request('GET', f'{self._url}/status')
+        return json.loads(body.decode('utf-8'))
+
+    def get_backend_mode(self):
+        return self._status['backend_mode']
+
+    def is_headless(self):
+        return self._status['headless']
+
+    def get_pool_size(self):
+        return self._status['pool_size']
+
+    def exit(self):
+        # Close connections (the daemon keeps running)
+        self._conn_pool.close()
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        return self.translate_many(src_lang, tgt_lang, [src_text])[0]
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        if not src_texts:
+            return []
+        body = json.dumps({'client': self._client_id, 'src_lang': src_lang,
+                           'tgt_lang': tgt_lang, 'texts': list(src_texts)})
+        headers = {'Content-Type': 'application/json'}
+        try:
+            res_body = self._conn_pool.request('POST',
+                                               f'{self._url}/translate',
+                                               body.encode('utf-8'), headers)
+        except (OSError, http.client.HTTPException) as e:
+            logger.warn(f'Failed to translate via daemon ({e})')
+            return [''] * len(src_texts)
+        return json.loads(res_body.decode('utf-8'))['texts']
+
+
+def connect_daemon(port=DEFAULT_PORT, backend_mode=None, timeout=60):
+    ''' Connect to the running daemon. It takes at most `CONNECT_TIMEOUT`
+        when the daemon is not running.
+        :param backend_mode: Required backend mode (`None` accepts any).
+        :param timeout: Timeout of translation requests (sec).
+        :return: `TranslationClient` or `None` if not running (or different
+                 backend mode).
+    '''
+    try:
+        client = TranslationClient(port, timeout=timeout)
+    except (OSError, http.client.HTTPException):
+        return None
+    if backend_mode is not None and client.get_backend_mode() != backend_mode:
+        client.exit()
+        return None
+    logger.info(f'Connected to translation daemon (port: {port})')
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--backend_mode', default='google',
+                        choices=['google', 'deepl'])
+    parser.add_argument('--pool_size', type=int, default=2,
+                        help='Number of browsers (or HTTP connections)')
+    parser.add_argument('--http', action='store_true',
+                        help='Use plain HTTP engine instead of browser.')
+    parser.add_argument('--lean_profile', action='store_true',
+                        help='Launch browsers without images, fonts and '
+                             'third-party scripts.')
+    parser.add_argument('--max_batch', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.http:
+        from gtranshttp import GTransHttp
+        gtrans = GTransHttp(args.backend_mode, max_connections=args.pool_size)
+    else:
+        from gtransweb import GTransWebPool
+        gtrans = GTransWebPool(args.pool_size, args.backend_mode,
+                               lean_profile=args.lean_profile)
+    daemon = TranslationDaemon(gtrans, args.port, max_batch=args.max_batch)
+    daemon.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+        gtrans.exit()
+
+
+if __name__ == '__main__':
+    main()
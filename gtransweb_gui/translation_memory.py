@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+from difflib import SequenceMatcher
+from threading import Lock
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+
+from backends import is_result_cacheable
+from metrics import METRICS
+from translation_cache import normalize_text
+
+# logging
+from logging import getLogger, NullHandler
+logger = getLogger(__name__)
+logger.addHandler(NullHandler())
+
+MEMORY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'gtransweb-gui',
+                           'translation_memory.sqlite3')
+
+# Words, numbers and identifiers (e.g. `v1.2`, `config.yaml`), or a symbol
+_TOKEN_RE = re.compile(r'\w(?:[\w\-./:@#%+]*\w)?|\S')
+_DIGITS_RE = re.compile(r'\d+')
+_MIX = 0x9E3779B97F4A7C15  # Odd constant to mix bits of hashes
+_MASK64 = (1 << 64) - 1
+
+
+class TranslationMemory:
+    ''' Fuzzy translation memory on SQLite
+        Segments differing only in numbers share a template (text with
+        masked numbers), and other near-duplicate segments are found by
+        MinHash LSH over character n-grams of templates. A hit is served only
+        when the differing tokens are copied verbatim into the stored
+        translation (numbers, IDs, names, ...), so they can be substituted.
+    '''
+
+    def __init__(self, db_path=None, threshold=0.8, ngram=3, n_bands=8,
+                 n_rows=4, max_candidates=10):
+        '''
+            :param db_path: Path of SQLite file. `None` keeps it in memory.
+            :param threshold: Minimum Jaccard similarity of n-gram sets.
+            :param ngram: Length of character n-grams.
+            :param n_bands: Number of LSH bands.
+            :param n_rows: Number of MinHash values in each band.
+            :param max_candidates: Maximum number of candidates to verify.
+        '''
+        self._threshold = threshold
+        self._ngram = ngram
+        self._n_bands = n_bands
+        self._n_rows = n_rows
+        self._max_candidates = max_candidates
+
+        self._lock = Lock()
+        self._db = _open_db(db_path if db_path is not None else ':memory:')
+
+        # Counters
+        self._n_exact_hits = 0
+        self._n_fuzzy_hits = 0
+        self._n_misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get(self, backend_mode, src_lang, tgt_lang, src_text):
+        ''' Get translation of the same or a substitutable segment
+            :return: Translated text or `None`
+        '''
+        start = time.perf_counter()
+        scope = (backend_mode, src_lang, tgt_lang)
+        src_text = normalize_text(src_text)
+        with self._lock:
+            tgt_text, kind = self._get(scope, src_text)
+            if kind == 'exact':
+                self._n_exact_hits += 1
+            elif kind == 'fuzzy':
+                self._n_fuzzy_hits += 1
+            else:
+                self._n_misses += 1
+        METRICS.observe('gtransweb_memory_lookup_seconds',
+                        time.perf_counter() - start)
+        METRICS.inc('gtransweb_memory_lookups_total', result=kind)
+        return tgt_text
+
+    def search(self, backend_mode, src_lang, tgt_lang, src_text):
+        ''' Find near-duplicate segments
+            :return: List of (similarity, src_text, tgt_text) in descending
+                     order of similarity, above the threshold.
+        '''
+        scope = (backend_mode, src_lang, tgt_lang)
+        with self._lock:
+            return self._search(scope, normalize_text(src_text))
+
+    def put(self, backend_mode, src_lang, tgt_lang, src_text, tgt_text):
+        ''' Store a translation '''
+        with self._lock:
+            self._put((backend_mode, src_lang, tgt_lang), src_text, tgt_text)
+            self._db.commit()
+
+    def import_file(self, path):
+        ''' Import JSON Lines file of `export_file()`
+            :return: Number of imported segments
+        '''
+        n_segments = 0
+        with open(path, encoding='utf-8') as f, self._lock:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._put((entry['backend_mode'], entry['src_lang'],
+                           entry['tgt_lang']), entry['src_text'],
+                          entry['tgt_text'])
+                n_segments += 1
+            self._db.commit()
+        logger.info(f'Imported {n_segments} segments from {path}')
+        return n_segments
+
+    def export_file(self, path):
+        ''' Export all segments as JSON Lines file. Each line is an object of
+            `backend_mode`, `src_lang`, `tgt_lang`, `src_text` and
+            `tgt_text`.
+            :return: Number of exported segments
+        '''
+        n_segments = 0
+        with open(path, 'w', encoding='utf-8') as f, self._lock:
+            rows = self._db.execute('SELECT backend_mode, src_lang, '
+                                    'tgt_lang, src_text, tgt_text FROM '
+                                    'segments ORDER BY id')
+            for row in rows:
+                entry = dict(zip(('backend_mode', 'src_lang', 'tgt_lang',
+                                  'src_text', 'tgt_text'), row))
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                n_segments += 1
+        return n_segments
+
+    def get_stats(self):
+        ''' Get hit/miss counters and size '''
+        with self._lock:
+            n_segments = self._db.execute(
+                    'SELECT COUNT(*) FROM segments').fetchone()[0]
+            n_lookups = self._n_exact_hits + self._n_fuzzy_hits + \
+                self._n_misses
+            return {
+                'n_exact_hits': self._n_exact_hits,
+                'n_fuzzy_hits': self._n_fuzzy_hits,
+                'n_misses': self._n_misses,
+                'hit_rate': (self._n_exact_hits + self._n_fuzzy_hits) /
+                max(n_lookups, 1),
+                'n_segments': n_segments,
+            }
+
+    def _get(self, scope, src_text):
+        ''' Lookup without lock. Return (tgt_text, 'exact'|'fuzzy'|'miss'). '''
+        if not src_text:
+            return None, 'miss'
+        row = self._db.execute('SELECT tgt_text FROM segments WHERE key = ?',
+                               (_make_key(scope, src_text),)).fetchone()
+        if row is not None:
+            return row[0], 'exact'
+        # Segments of the same template, then near-duplicates
+        rows = self._db.execute('SELECT src_text, tgt_text FROM segments '
+                                'WHERE template = ? ORDER BY id DESC LIMIT ?',
+                                (_make_key(scope, _mask(src_text)),
+                                 self._max_candidates)).fetchall()
+        for cand_src, cand_tgt in rows:
+            tgt_text = substitute(cand_src, cand_tgt, src_text)
+            if tgt_text is not None:
+                return tgt_text, 'fuzzy'
+        for _, cand_src, cand_tgt in self._search(scope, src_text):
+            tgt_text = substitute(cand_src, cand_tgt, src_text)
+            if tgt_text is not None:
+                return tgt_text, 'fuzzy'
+        return None, 'miss'
+
+    def _search(self, scope, src_text):
+        if not src_text:
+            return []
+        shingles = self._get_shingles(src_text)
+        # Segments sharing more bands first
+        n_shared = Counter()
+        for band in self._get_bands(scope, shingles):
+            n_shared.update(seg_id for seg_id, in self._db.execute(
+                    'SELECT seg_id FROM bands WHERE band = ? LIMIT ?',
+                    (band, self._max_candidates)))
+        seg_ids = [seg_id for seg_id, _ in
+                   n_shared.most_common(self._max_candidates)]
+        if not seg_ids:
+            return []
+        rows = self._db.execute(
+                'SELECT src_text, tgt_text FROM segments WHERE id IN '
+                f'({",".join("?" * len(seg_ids))})', seg_ids).fetchall()
+        results = []
+        for cand_src, cand_tgt in rows:
+            cand_shingles = self._get_shingles(cand_src)
+            similarity = len(shingles & cand_shingles) / \
+                len(shingles | cand_shingles)
+            if similarity >= self._threshold:
+                results.append((similarity, cand_src, cand_tgt))
+        results.sort(key=lambda r: -r[0])
+        return results
+
+    def _put(self, scope, src_text, tgt_text):
+        src_text = normalize_text(src_text)
+        if not src_text or not tgt_text:
+            return
+        key = _make_key(scope, src_text)
+        cursor = self._db.execute('UPDATE segments SET tgt_text = ?, '
+                                  'created = ? WHERE key = ?',
+                                  (tgt_text, time.time(), key))
+        if cursor.rowcount > 0:
+            return
+        template = _make_key(scope, _mask(src_text))
+        known = self._db.execute('SELECT 1 FROM segments WHERE template = ? '
+                                 'LIMIT 1', (template,)).fetchone()
+        cursor = self._db.execute(
+                'INSERT INTO segments (key, template, backend_mode, src_lang, '
+                'tgt_lang, src_text, tgt_text, created) VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, template, *scope, src_text, tgt_text, time.time()))
+        if known is not None:
+            return  # Indexed by the template already
+        seg_id = cursor.lastrowid
+        bands = self._get_bands(scope, self._get_shingles(src_text))
+        self._db.executemany('INSERT OR IGNORE INTO bands (band, seg_id) '
+                             'VALUES (?, ?)', [(b, seg_id) for b in bands])
+
+    def _get_shingles(self, text):
+        ''' Set of character n-grams of the template '''
+        text = _mask(text)
+        n = self._ngram
+        if len(text) <= n:
+            return {text}
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _get_signature(self, shingles):
+        ''' MinHash signature by one permutation hashing
+            A hash of each n-gram is put into one of bins, and the minimum in
+            each bin is taken. Empty bins borrow the next non-empty one
+            (rotation densification).
+        '''
+        n_bins = self._n_bands * self._n_rows
+        bins = [None] * n_bins
+        for shingle in shingles:
+            h = (zlib.crc32(shingle.encode('utf-8')) * _MIX) & _MASK64
+            idx, value = h % n_bins, h // n_bins
+            if bins[idx] is None or value < bins[idx]:
+                bins[idx] = value
+        signature = list(bins)
+        for idx in range(n_bins):
+            dist = 1
+            while signature[idx] is None:
+                value = bins[(idx + dist) % n_bins]
+                if value is not None:
+                    signature[idx] = value + dist * _MASK64
+                dist += 1
+        return signature
+
+    def _get_bands(self, scope, shingles):
+        ''' LSH keys of MinHash signature '''
+        signature = self._get_signature(shingles)
+        bands = []
+        for i in range(self._n_bands):
+            rows = signature[i * self._n_rows:(i + 1) * self._n_rows]
+            raw = repr((scope, i, rows)).encode('utf-8')
+            digest = hashlib.blake2b(raw, digest_size=8).digest()
+            bands.append(int.from_bytes(digest, 'little', signed=True))
+        return bands
+
+
+class GTransWebMemory:
+    ''' Translation engine through the translation memory
+        Results of the engine are stored, and substitutable segments are
+        served without sending.
+
+        >>> gtrans = GTransWebMemory(GTransWeb(), TranslationMemory())
+    '''
+
+    def __init__(self, gtrans, memory, lookup=True):
+        '''
+            :param lookup: When `False`, all texts are sent and the memory is
+                           only fed with the results.
+        '''
+        self._gtrans = gtrans
+        self._memory = memory
+        self._lookup = lookup
+
+    def get_backend_mode(self):
+        return self._gtrans.get_backend_mode()
+
+    def is_headless(self):
+        return self._gtrans.is_headless()
+
+    def get_pool_size(self):
+        return getattr(self._gtrans, 'get_pool_size', lambda: 1)()
+
+    def exit(self):
+        self._gtrans.exit()
+
+    def is_last_result_cacheable(self):
+        return is_result_cacheable(self._gtrans)
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None,
+                  partial_callback=None):
+        if not src_text:
+            return ''
+        backend_mode = self._gtrans.get_backend_mode()
+        if self._lookup:
+            tgt_text = self._memory.get(backend_mode, src_lang, tgt_lang,
+                                        src_text)
+            if tgt_text is not None:
+                return tgt_text
+        kwargs = dict()
+        if cancel_event is not None:
+            kwargs['cancel_event'] = cancel_event
+        if partial_callback is not None:
+            kwargs['partial_callback'] = partial_callback
+        tgt_text = self._gtrans.translate(src_lang, tgt_lang, src_text,
+                                          **kwargs)
+        # Empty result means failure
+        if tgt_text and self.is_last_result_cacheable():
+            self._memory.put(backend_mode, src_lang, tgt_lang, src_text,
+                             tgt_text)
+        return tgt_text
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        ''' Translate multiple texts, sending only ones not in the memory '''
+        backend_mode = self._gtrans.get_backend_mode()
+        tgt_texts = [None if src_text else '' for src_text in src_texts]
+        if self._lookup:
+            tgt_texts = [self._memory.get(backend_mode, src_lang, tgt_lang,
+                                          src_text) if src_text else ''
+                         for src_text in src_texts]
+        missing = [i for i, t in enumerate(tgt_texts) if t is None]
+        if missing:
+            results = self._gtrans.translate_many(
+                    src_lang, tgt_lang, [src_texts[i] for i in missing])
+            cacheable = self.is_last_result_cacheable()
+            for i, tgt_text in zip(missing, results):
+                tgt_texts[i] = tgt_text
+                if tgt_text and cacheable:
+                    self._memory.put(backend_mode, src_lang, tgt_lang,
+                                     src_texts[i], tgt_text)
+        return tgt_texts
+
+
+def substitute(src_text, tgt_text, new_src_text):
+    ''' Translate `new_src_text` by replacing differing tokens of `src_text`
+        in `tgt_text`. Each replaced token must appear in `tgt_text` as many
+        times as in `src_text`.
+        :return: Translated text or `None` if not substitutable
+    '''
+    old_tokens = _TOKEN_RE.findall(src_text)
+    new_tokens = _TOKEN_RE.findall(new_src_text)
+    if old_tokens == new_tokens:
+        return tgt_text  # Only whitespaces differ
+
+    # One-to-one replacements of tokens
+    mapping = dict()
+    n_replaced = Counter()
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        if tag != 'replace' or i2 - i1 != j2 - j1:
+            return None
+        for old, new in zip(old_tokens[i1:i2], new_tokens[j1:j2]):
+            if mapping.setdefault(old, new) != new:
+                return None
+            n_replaced[old] += 1
+    old_counts = Counter(old_tokens)
+    if any(old_counts[old] != n for old, n in n_replaced.items()):
+        return None  # Replaced only partially
+
+    # Tokens must be copied verbatim into the translation
+    pattern = re.compile('|'.join(
+            rf'(?<![0-9A-Za-z]){re.escape(old)}(?![0-9A-Za-z])'
+            for old in sorted(mapping, key=len, reverse=True)))
+    found = Counter(pattern.findall(tgt_text))
+    if found != n_replaced:
+        return None
+    return pattern.sub(lambda m: mapping[m.group(0)], tgt_text)
+
+
+def _mask(text):
+    ''' Template of text, in which numbers are masked '''
+    return _DIGITS_RE.sub('0', text.lower())
+
+
+def _make_key(scope, src_text):
+    raw = '\0'.join((*scope, src_text))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _open_db(db_path):
+    ''' Open (or create) SQLite file for the memory '''
+    logger.debug(f'Open translation memory ({db_path})')
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    db = sqlite3.connect(db_path, check_same_thread=False)
+    db.execute('PRAGMA journal_mode = WAL')
+    db.execute('CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, '
+               'key TEXT UNIQUE, template TEXT, backend_mode TEXT, '
+               'src_lang TEXT, tgt_lang TEXT, src_text TEXT, tgt_text TEXT, '
+               'created REAL)')
+    db.execute('CREATE TABLE IF NOT EXISTS bands (band INTEGER, '
+               'seg_id INTEGER, PRIMARY KEY (band, seg_id)) WITHOUT ROWID')
+    db.execute('CREATE INDEX IF NOT EXISTS segments_template ON segments '
+               '(template)')
+    db.commit()
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Import or export translation memory')
+    parser.add_argument('--db', default=MEMORY_PATH)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--import_file', help='JSON Lines file to import')
+    group.add_argument('--export_file', help='JSON Lines file to export')
+    args = parser.parse_args()
+
+    memory = TranslationMemory(db_path=args.db)
+    if args.import_file:
+        n_segments = memory.import_file(args.import_file)
+    else:
+        n_segments = memory.export_file(args.export_file)
+    memory.close()
+    print(f'{n_segments} segments')
+
+
+if __name__ == '__main__':
+    main()
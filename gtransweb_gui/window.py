@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from PyQt5 import QtCore, QtWidgets
+from PyQt5 import QtCore, QtGui, QtWidgets
 
 # logging
 from logging import getLogger, NullHandler
@@ -15,13 +15,25 @@ LANGUAGES = {
 }
 LANGUAGES_INV = {v: k for k, v in LANGUAGES.items()}
 
+# Text longer than this (characters) is rendered without line wrapping and
+# undo history, and is set in chunks of `CHUNK_SIZE` through the event loop
+LARGE_TEXT_SIZE = 100000
+CHUNK_SIZE = 65536
+# Maximum number of undo steps of the source text box (older steps are
+# dropped)
+MAX_UNDO_STEPS = 100
+
 
 class Window(QtWidgets.QMainWindow):
     def __init__(self, trans_func, clip_func, backend_func, headless_func,
-                 clip_modes, backend_modes):
+                 clip_modes, backend_modes, src_changed_func=None,
+                 cancel_func=None):
         logger.debug('New window is created')
         super(Window, self).__init__()
         self._trans_func = trans_func
+        self._src_changed_func = src_changed_func
+        self._cancel_func = cancel_func
+        self._busy = False  # Translation is in progress
         self._clip_func = clip_func
         self._backend_func = backend_func
         self._headless_func = headless_func
@@ -33,10 +45,15 @@ class Window(QtWidgets.QMainWindow):
         # Create GUI parts and layout
         self._gui_parts = GuiParts(self, clip_modes, backend_modes)
         self._gui_layout = GuiLayout(self._gui_parts)
+        # Text setters (setting by program does not emit `textChanged`)
+        self._src_renderer = TextBoxRenderer(self._gui_parts.src_box,
+                                             MAX_UNDO_STEPS)
+        self._tgt_renderer = TextBoxRenderer(self._gui_parts.tgt_box)
         # Connect event functions
-        self._gui_parts.set_connections(self._trans_func, self.swap_langs,
+        self._gui_parts.set_connections(self._on_trans_btn, self.swap_langs,
                                         self._clip_func, self._backend_func,
-                                        self._headless_func)
+                                        self._headless_func,
+                                        self._src_changed_func)
 
         # GUI configuration
         self._qsettings = QtCore.QSettings('gtransweb-gui', 'window')
@@ -45,6 +62,7 @@ class Window(QtWidgets.QMainWindow):
         self._load_langs(self._qsettings)
         self._load_clip_mode(self._qsettings)
         self._load_overwrite(self._qsettings)
+        self._load_live(self._qsettings)
         self._load_backend_mode(self._qsettings)
         self._load_headless(self._qsettings)
         self._gui_layout.load_splitter_state(self._qsettings)
@@ -81,15 +99,49 @@ class Window(QtWidgets.QMainWindow):
 
     def get_src_text(self):
         ''' Get text from source text box '''
-        return self._gui_parts.src_box.toPlainText()
+        return self._src_renderer.get_text()
 
     def set_src_text(self, text):
-        ''' Set text to source text box '''
-        self._gui_parts.src_box.setHtml(text)
+        ''' Set plain text to source text box '''
+        self._src_renderer.set_text(text)
 
     def set_tgt_text(self, text):
-        ''' Set text to target text box '''
-        self._gui_parts.tgt_box.setHtml(text)
+        ''' Set plain text to target text box '''
+        self._tgt_renderer.set_text(text)
+
+    def get_tgt_text(self):
+        ''' Get text from target text box '''
+        return self._tgt_renderer.get_text()
+
+    def append_tgt_text(self, text):
+        ''' Append plain text to target text box '''
+        self._tgt_renderer.append_text(text)
+
+    def splice_tgt_text(self, start, end, text):
+        ''' Replace characters of target text box in [start, end) by text
+            Scroll position is kept.
+        '''
+        self._tgt_renderer.splice_text(start, end, text)
+
+    def set_status(self, text):
+        ''' Set text to status bar '''
+        self.statusBar().showMessage(text)
+
+    def is_busy(self):
+        ''' Whether translation is in progress '''
+        return self._busy
+
+    def set_busy(self, busy):
+        ''' Show in-progress state. While busy, translate button cancels. '''
+        self._busy = bool(busy)
+        if self._busy and self._gui_parts.progress_bar is None:
+            # Hidden until busy, so created at first
+            self.statusBar().addPermanentWidget(
+                    self._gui_parts.create_progress_bar(self))
+        if self._gui_parts.progress_bar is not None:
+            self._gui_parts.progress_bar.setVisible(self._busy)
+        self._gui_parts.trans_btn.setText('Cancel' if self._busy and
+                                          self._cancel_func else 'Translate')
 
     def swap_langs(self):
         ''' Swap source and target languages '''
@@ -113,6 +165,14 @@ class Window(QtWidgets.QMainWindow):
         ''' Set overwriting mode to checkbox '''
         self._gui_parts.overwrite_box.setChecked(bool(checked))
 
+    def get_live(self):
+        ''' Get live translation mode from checkbox '''
+        return bool(self._gui_parts.live_box.isChecked())
+
+    def set_live(self, checked):
+        ''' Set live translation mode to checkbox '''
+        self._gui_parts.live_box.setChecked(bool(checked))
+
     def get_backend_mode(self):
         ''' Get backend mode from combo '''
         return self._gui_parts.backend_box.currentText()
@@ -140,6 +200,7 @@ class Window(QtWidgets.QMainWindow):
         self._save_langs(self._qsettings)
         self._save_clip_mode(self._qsettings)
         self._save_overwrite(self._qsettings)
+        self._save_live(self._qsettings)
         self._save_backend_mode(self._qsettings)
         self._save_headless(self._qsettings)
         self._gui_layout.save_splitter_state(self._qsettings)
@@ -148,12 +209,21 @@ class Window(QtWidgets.QMainWindow):
         ''' Overridden method to handle key inputs '''
         key = event.key()
         if key == QtCore.Qt.Key_Return:
-            self._trans_func()
+            if event.modifiers() & QtCore.Qt.ShiftModifier:
+                self._trans_func(use_cache=False)  # Bypass cache
+            else:
+                self._trans_func()
         elif key == QtCore.Qt.Key_T:
             self.swap_langs()
         else:
             super(Window, self).keyPressEvent(event)
 
+    def _on_trans_btn(self):
+        if self._busy and callable(self._cancel_func):
+            self._cancel_func()
+        else:
+            self._trans_func()
+
     # -------------------------------------------------------------------------
     # ----------------------------- Loader / Saver ----------------------------
     def _load_geometry(self, qsettings):
@@ -193,6 +263,16 @@ class Window(QtWidgets.QMainWindow):
     def _save_overwrite(self, qsettings):
         qsettings.setValue('overwrite', self.get_overwrite())
 
+    def _load_live(self, qsettings):
+        mode = qsettings.value('live')
+        if mode is not None:
+            self.set_live(mode == 'true')
+        else:
+            self.set_live(False)  # Set default
+
+    def _save_live(self, qsettings):
+        qsettings.setValue('live', self.get_live())
+
     def _load_backend_mode(self, qsettings):
         mode = qsettings.value('backend_mode')
         if mode is None:
@@ -218,14 +298,18 @@ class GuiParts:
     def __init__(self, parent, clip_modes, backend_modes):
         # Create Gui widget parts
         # Splitter
-        self.tgt_box = QtWidgets.QTextEdit(parent)
-        self.src_box = QtWidgets.QTextEdit(parent)
+        self.tgt_box = QtWidgets.QPlainTextEdit(parent)
+        self.src_box = QtWidgets.QPlainTextEdit(parent)
 
         # 1st row
         self.src_lang_box = QtWidgets.QComboBox(parent)
         self.tgt_lang_box = QtWidgets.QComboBox(parent)
         self.swap_btn = QtWidgets.QPushButton('<-->', parent)
         self.trans_btn = QtWidgets.QPushButton('Translate', parent)
+        self.live_box = QtWidgets.QCheckBox('Live', parent)
+
+        # Status bar (created by `create_progress_bar()` when needed)
+        self.progress_bar = None
 
         # 2nd row
         self.clip_box = QtWidgets.QComboBox(parent)
@@ -239,19 +323,19 @@ class GuiParts:
         self._set_styles(clip_modes, backend_modes)
 
     def set_connections(self, trans_func, swap_langs, clip_func,
-                        backend_func, headless_func):
+                        backend_func, headless_func, src_changed_func=None):
         # Connect functions
         self.trans_btn.clicked.connect(lambda: trans_func())
         self.swap_btn.clicked.connect(lambda: swap_langs())
         self.clip_box.currentTextChanged.connect(clip_func)
         self.backend_box.currentTextChanged.connect(backend_func)
         self.headless_box.clicked.connect(headless_func)
+        if src_changed_func is not None:
+            self.src_box.textChanged.connect(src_changed_func)
 
     def _set_styles(self, clip_modes, backend_modes):
         # Set GUI styles
         self.tgt_box.setReadOnly(True)
-        self.tgt_box.setAcceptRichText(True)
-        self.src_box.setAcceptRichText(True)
 
         self.src_lang_box.setFixedWidth(90)
         self.tgt_lang_box.setFixedWidth(90)
@@ -265,6 +349,15 @@ class GuiParts:
         self.backend_box.addItems(backend_modes)
         self.backend_box.setFixedWidth(80)
 
+    def create_progress_bar(self, parent):
+        # Busy indicator
+        self.progress_bar = QtWidgets.QProgressBar(parent)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setMaximumWidth(80)
+        self.progress_bar.setMaximumHeight(12)
+        self.progress_bar.hide()
+        return self.progress_bar
+
 
 class GuiLayout:
     def __init__(self, gui_parts):
@@ -281,6 +374,7 @@ class GuiLayout:
         self._row1_layout.addWidget(gui_parts.swap_btn)
         self._row1_layout.addWidget(gui_parts.tgt_lang_box)
         self._row1_layout.addWidget(gui_parts.trans_btn)
+        self._row1_layout.addWidget(gui_parts.live_box)
         self._row1_layout.setContentsMargins(0, 0, 0, 0)
         # Warp with a widget
         self._row1_widget = QtWidgets.QWidget()
@@ -328,3 +422,281 @@ class GuiLayout:
 
     def save_splitter_state(self, qsettings):
         qsettings.setValue('splitter_state', self._splitter.saveState())
+
+
+class TextBoxRenderer:
+    ''' Plain text setter of QPlainTextEdit for large texts
+        Large text is inserted chunk by chunk from the event loop not to
+        stall GUI, and rendered without line wrapping (only visible blocks
+        are laid out). Signals of the text box are blocked while setting.
+    '''
+
+    def __init__(self, text_box, max_undo_steps=None):
+        '''
+            :param max_undo_steps: Maximum number of undo steps of user edits
+                                   (older steps are dropped). `None`
+                                   disables undo.
+        '''
+        self._text_box = text_box
+        self._chunks = []  # Pending chunks
+        self._generation = 0  # Incremented by `set_text()`
+        self._large = False
+        # Undo history of user edits. QTextDocument can not drop only old
+        # steps, so its own history is disabled.
+        self._undo_stack = None
+        self._text = None  # Text before the next user edit
+        if max_undo_steps is not None:
+            self._undo_stack = QtWidgets.QUndoStack(text_box)
+            self._undo_stack.setUndoLimit(max_undo_steps)
+            self._undo_filter = _UndoKeyFilter(self._undo_stack, text_box)
+            text_box.installEventFilter(self._undo_filter)
+            text_box.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+            text_box.customContextMenuRequested.connect(
+                    self._show_context_menu)
+            text_box.textChanged.connect(self._on_user_edit)
+        text_box.setUndoRedoEnabled(False)
+        self._set_large(False)
+
+    def get_undo_stack(self):
+        ''' QUndoStack of user edits (`None` when undo is disabled) '''
+        return self._undo_stack
+
+    def is_pending(self):
+        ''' Whether chunks are waiting to be inserted '''
+        return bool(self._chunks)
+
+    def get_text(self):
+        ''' Get all text including pending chunks '''
+        return self._text_box.toPlainText() + ''.join(self._chunks)
+
+    def set_text(self, text):
+        ''' Replace all text '''
+        self._generation += 1
+        self._chunks = _split_chunks(text)
+        self._set_large(len(text) > LARGE_TEXT_SIZE)
+        self._text_box.blockSignals(True)
+        self._text_box.setPlainText(self._chunks.pop(0) if self._chunks
+                                    else '')
+        self._text_box.blockSignals(False)
+        if self._undo_stack is not None:
+            self._undo_stack.clear()  # As `setPlainText()`
+        self._sync_text()
+        self._schedule()
+
+    def append_text(self, text):
+        ''' Append text to the end (after pending chunks) '''
+        if not self._chunks and len(text) <= CHUNK_SIZE:
+            self._insert_at_end(text)
+            return
+        if self._text_box.document().characterCount() + len(text) > \
+                LARGE_TEXT_SIZE:
+            self._set_large(True)
+        scheduled = bool(self._chunks)
+        self._chunks.extend(_split_chunks(text))
+        if not scheduled:
+            self._schedule()
+
+    def splice_text(self, start, end, text):
+        ''' Replace characters in [start, end) by text '''
+        if self._chunks:
+            # Not rendered yet. Replace all.
+            full = self.get_text()
+            self.set_text(full[:start] + text + full[end:])
+            return
+        # Positions of QTextCursor are in UTF-16 code units
+        full = self._text_box.toPlainText()
+        cursor = self._text_box.textCursor()
+        cursor.setPosition(_utf16_len(full[:start]))
+        cursor.setPosition(_utf16_len(full[:end]),
+                           QtGui.QTextCursor.KeepAnchor)
+        self._text_box.blockSignals(True)
+        cursor.insertText(text)
+        self._text_box.blockSignals(False)
+        self._sync_text()
+
+    def _set_large(self, large):
+        ''' Switch rendering mode for large text '''
+        self._large = large
+        self._text_box.setLineWrapMode(
+                QtWidgets.QPlainTextEdit.NoWrap if large else
+                QtWidgets.QPlainTextEdit.WidgetWidth)
+        if large and self._undo_stack is not None:
+            self._undo_stack.clear()
+        self._sync_text()
+
+    def _sync_text(self):
+        ''' Keep text to find ranges of user edits (while undo is enabled) '''
+        if self._undo_stack is None or self._large:
+            self._text = None
+        else:
+            self._text = self._text_box.toPlainText()
+
+    def _on_user_edit(self):
+        ''' Record a user edit as an undo step (`textChanged` is blocked
+            while setting text by program)
+        '''
+        if self._text is None:
+            return  # Large text
+        text = self._text_box.toPlainText()
+        start, old_end, new_end = _find_changed_range(self._text, text)
+        if old_end == start and new_end == start:
+            return  # Format only
+        self._undo_stack.push(_EditCommand(
+                self, start, self._text[start:old_end], text[start:new_end]))
+        self._text = text
+
+    def _replace_by_undo(self, start, old, new):
+        ''' Replace `old` at `start` by `new` (to undo or redo an edit) '''
+        cursor = self._text_box.textCursor()
+        cursor.setPosition(_utf16_len(self._text[:start]))
+        cursor.setPosition(_utf16_len(self._text[:start + len(old)]),
+                           QtGui.QTextCursor.KeepAnchor)
+        self._text_box.blockSignals(True)
+        cursor.insertText(new)
+        self._text_box.blockSignals(False)
+        self._text_box.setTextCursor(cursor)
+        self._text = self._text[:start] + new + self._text[start + len(old):]
+
+    def _show_context_menu(self, pos):
+        ''' Standard context menu with undo actions of the undo stack '''
+        menu = self._text_box.createStandardContextMenu()
+        for action in menu.actions():
+            if action.objectName() in ('edit-undo', 'edit-redo'):
+                menu.removeAction(action)
+        first = menu.actions()[0] if menu.actions() else None
+        menu.insertActions(first, [
+                self._undo_stack.createUndoAction(menu, 'Undo'),
+                self._undo_stack.createRedoAction(menu, 'Redo')])
+        menu.exec_(self._text_box.mapToGlobal(pos))
+        menu.deleteLater()
+
+    def _schedule(self):
+        if self._chunks:
+            generation = self._generation
+            QtCore.QTimer.singleShot(0, lambda: self._insert_next(generation))
+
+    def _insert_next(self, generation):
+        if generation != self._generation or not self._chunks:
+            return  # Replaced by newer text
+        self._insert_at_end(self._chunks.pop(0))
+        self._schedule()
+
+    def _insert_at_end(self, text):
+        cursor = QtGui.QTextCursor(self._text_box.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        self._text_box.blockSignals(True)
+        cursor.insertText(text)
+        self._text_box.blockSignals(False)
+        self._sync_text()
+
+
+class _EditCommand(QtWidgets.QUndoCommand):
+    ''' Undo step of a user edit (replacement of `old` at `start` by `new`)
+        Consecutive typing or deleting is merged into one step.
+    '''
+
+    def __init__(self, renderer, start, old, new):
+        super().__init__()
+        self._renderer = renderer
+        self._start = start
+        self._old = old
+        self._new = new
+        self._done = True  # Already applied by the user
+        # Typing or deleting a character (not a paste or a new line)
+        self._single = len(old) <= 1 and len(new) <= 1 and '\n' not in new
+
+    def id(self):
+        return 1
+
+    def mergeWith(self, other):
+        if not self._single or not other._single:
+            return False
+        if not self._old and not other._old and \
+                other._start == self._start + len(self._new):
+            self._new += other._new  # Typing
+            return True
+        if not self._new and not other._new:
+            if other._start + len(other._old) == self._start:
+                self._start = other._start  # Backspace
+                self._old = other._old + self._old
+                return True
+            if other._start == self._start:
+                self._old += other._old  # Delete
+                return True
+        return False
+
+    def undo(self):
+        self._renderer._replace_by_undo(self._start, self._new, self._old)
+
+    def redo(self):
+        if self._done:
+            self._done = False  # Pushed
+            return
+        self._renderer._replace_by_undo(self._start, self._old, self._new)
+
+
+class _UndoKeyFilter(QtCore.QObject):
+    ''' Pass undo and redo keys of a text box to the undo stack '''
+
+    def __init__(self, undo_stack, parent):
+        super().__init__(parent)
+        self._undo_stack = undo_stack
+
+    def eventFilter(self, obj, event):
+        if event.type() in (QtCore.QEvent.KeyPress,
+                            QtCore.QEvent.ShortcutOverride):
+            if event.matches(QtGui.QKeySequence.Undo):
+                action = self._undo_stack.undo
+            elif event.matches(QtGui.QKeySequence.Redo):
+                action = self._undo_stack.redo
+            else:
+                return False
+            if event.type() == QtCore.QEvent.KeyPress:
+                action()
+            event.accept()
+            return True
+        return False
+
+
+def _find_changed_range(old, new):
+    ''' Find the changed range by the common prefix and suffix
+        :return: Tuple of (start, old end, new end) indices
+    '''
+    n_min = min(len(old), len(new))
+    # Binary search with slice comparisons (fast for long text)
+    lo, hi = 0, n_min
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    start = lo
+    lo, hi = 0, n_min - start
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return start, len(old) - lo, len(new) - lo
+
+
+def _utf16_len(text):
+    ''' Length of text in UTF-16 code units '''
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _split_chunks(text):
+    ''' Split text into chunks of about `CHUNK_SIZE` at line ends '''
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + CHUNK_SIZE
+        if end < len(text):
+            newline = text.rfind('\n', start, end)
+            if newline > start:
+                end = newline + 1
+        chunks.append(text[start:end])
+        start = end
+    return chunks
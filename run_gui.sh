@@ -1,2 +1,2 @@
 #!/bin/bash
-python3 gtransweb_gui/gtransweb_gui.py -c copy
+python3 gtransweb_gui/gtransweb_gui.py -c copy "$@"
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import time
+
+from PyQt5 import QtCore
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from callable_buffer import CallableBuffer, CancelEvent
+from metrics import METRICS
+
+
+def process_events(duration):
+    ''' Run Qt event loop for a while (sec) '''
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        QtCore.QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+class CallableBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QtCore.QCoreApplication.instance() or \
+            QtCore.QCoreApplication([sys.argv[0]])
+        self.calls = []
+
+    def callback(self, text, cancel_event=None):
+        self.calls.append((time.perf_counter(), text, cancel_event))
+
+    def burst(self, buf, n, interval=0.01):
+        ''' Call n times in a burst and return time of the last call '''
+        for i in range(n):
+            buf(self.callback, str(i))
+            last_time = time.perf_counter()
+            process_events(interval)
+        return last_time
+
+    def test_adaptive(self):
+        buf = CallableBuffer()
+        buf.set_buftime(0.3)
+        # Not learned yet: fixed buffering time from the first call
+        start = time.perf_counter()
+        self.burst(buf, 3)
+        process_events(0.4)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0][1], '2')  # Newest one
+        self.assertGreater(self.calls[0][0] - start, 0.25)
+
+        # Learned: fired soon after the burst is settled
+        self.burst(buf, 5)
+        process_events(0.4)
+        self.calls = []
+        last_time = self.burst(buf, 5)
+        process_events(0.4)
+        self.assertEqual([text for _, text, _ in self.calls], ['4'])
+        self.assertLess(self.calls[0][0] - last_time, 0.15)
+        self.assertLess(buf.get_settle_time(), 0.15)
+        hist = METRICS.get_histogram('gtransweb_debounce_saved_seconds')
+        self.assertGreater(hist.sum, 0)
+
+    def test_cancel(self):
+        buf = CallableBuffer(cancellable=True)
+        buf.set_buftime(0.05)
+        buf(self.callback, 'a')
+        process_events(0.1)
+        cancel_event = self.calls[0][2]
+        self.assertFalse(cancel_event.is_set())
+        # Next call cancels the previous one
+        buf(self.callback, 'b')
+        self.assertTrue(cancel_event.is_set())
+        self.assertEqual(cancel_event.get_reason(), 'debounce')
+
+    def test_cancel_event(self):
+        cancel_event = CancelEvent()
+        self.assertIsNone(cancel_event.get_reason())
+        cancel_event.cancel('user')
+        cancel_event.cancel('superseded')
+        # The first reason is kept
+        self.assertTrue(cancel_event.is_set())
+        self.assertEqual(cancel_event.get_reason(), 'user')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import random
+import subprocess
+import sys
+import time
+import unittest
+from queue import Queue
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from cli import (build_parser, iter_segments, read_lines, run_stream,
+                 translate_stream)
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..', 'gtransweb_gui')
+
+
+class UpperGTrans:
+    ''' Fake translation engine '''
+
+    def __init__(self):
+        self.queries = []
+
+    def translate(self, src_lang, tgt_lang, src_text):
+        self.queries.append((src_lang, tgt_lang, src_text))
+        return f'{tgt_lang}:{src_text.upper()}'
+
+
+def make_line_queue(text):
+    line_queue = Queue()
+    read_lines(io.StringIO(text), line_queue)
+    return line_queue
+
+
+class CliTest(unittest.TestCase):
+
+    def test_iter_segments(self):
+        text = 'a\nb\n\n\nc\r\nd'
+        segments = list(iter_segments(make_line_queue(text)))
+        self.assertEqual(segments, [('a', '\n'), ('b', '\n'), ('', '\n'),
+                                    ('', '\n'), ('c', '\r\n'), ('d', '')])
+        segments = list(iter_segments(make_line_queue(text), paragraph=True))
+        self.assertEqual(segments, [('a\nb', '\n'), ('', '\n'), ('', '\n'),
+                                    ('c\r\nd', '')])
+        self.assertEqual(''.join(t + s for t, s in segments), text)
+
+    def test_iter_segments_idle_flush(self):
+        line_queue = Queue()
+        line_queue.put('a\n')
+        segments = iter_segments(line_queue, paragraph=True, buf_time=0.01)
+        # Flushed without blank line nor EOF
+        self.assertEqual(next(segments), ('a', '\n'))
+        line_queue.put(None)
+        self.assertEqual(list(segments), [])
+
+    def test_translate_stream_order(self):
+        def translate(text):
+            time.sleep(random.random() * 0.01)
+            return text.upper()
+
+        segments = [(f'text {i}', '\n') for i in range(30)] + [(' ', '\n')]
+        results = list(translate_stream(translate, iter(segments),
+                                        read_ahead=4, n_workers=4))
+        self.assertEqual(results, [(t.upper(), s) for t, s in segments])
+
+    def test_run_stream(self):
+        gtrans = UpperGTrans()
+        stdout = io.StringIO()
+        args = build_parser().parse_args(['-s', 'en', '-t', 'ja', '-d',
+                                          '-m', 'fr'])
+        run_stream(args, io.StringIO('hello\n\nworld\n'), stdout, gtrans)
+        self.assertEqual(stdout.getvalue(), 'ja:FR:HELLO\n\nja:FR:WORLD\n')
+        self.assertEqual(gtrans.queries[:2], [('en', 'fr', 'hello'),
+                                              ('fr', 'ja', 'fr:HELLO')])
+
+    def test_no_qt_import(self):
+        code = ('import sys; import cli, gtransweb, translation_daemon; '
+                'print("PyQt5" in sys.modules)')
+        out = subprocess.check_output([sys.executable, '-c', code],
+                                      cwd=PACKAGE_DIR)
+        self.assertEqual(out.decode().strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,9 @@ import sys
 
 from PyQt5 import QtWidgets
 
-from gtransweb import log_initializer
-from gtransweb_gui.clipboard import Clipboard, ClipboardHandler
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+import log_initializer
+from clipboard import Clipboard, ClipboardHandler
 
 # logging (root)
 from logging import getLogger, DEBUG
@@ -16,7 +17,8 @@ logger = getLogger(__name__)
 class ClipboardTest(unittest.TestCase):
 
     def setUp(self):
-        self.app = QtWidgets.QApplication([sys.argv[0]])
+        self.app = QtWidgets.QApplication.instance() or \
+            QtWidgets.QApplication([sys.argv[0]])
 
     def test_clipboard_mode(self):
         clipboard = Clipboard(self.app)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import unittest
+import sys
+import time
+
+from PyQt5 import QtCore
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from clipboard import ClipboardHandler, normalize_clip_text
+
+
+class FakeClipboard:
+    ''' Clipboard without system clipboard '''
+
+    def __init__(self):
+        self.text = ''
+        self.handler = None
+        self.mode_str = 'copy'
+
+    def get_mode(self):
+        return 'copy'
+
+    def get_mode_str(self):
+        return self.mode_str
+
+    def get_text(self):
+        return self.text
+
+    def set_text(self, text):
+        self.text = text
+        self.handler('copy')
+
+    def connect(self, handler):
+        self.handler = handler
+
+    def copy(self, text):
+        self.text = text
+        self.handler('copy')
+
+
+def process_events(duration):
+    ''' Run Qt event loop for a while (sec) '''
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        QtCore.QCoreApplication.processEvents()
+        time.sleep(0.001)
+
+
+class ClipboardHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = QtCore.QCoreApplication.instance() or \
+            QtCore.QCoreApplication([sys.argv[0]])
+        self.clipboard = FakeClipboard()
+        self.texts = []
+
+    def create_handler(self, **kwargs):
+        handler = ClipboardHandler(self.clipboard, **kwargs)
+        handler.set_callback(self.texts.append)
+        return handler
+
+    def test_normalize(self):
+        self.assertEqual(normalize_clip_text(' This is an exam-\r\nple\n'
+                                             'of PDF.\n\n'),
+                         'This is an example of PDF.')
+        self.assertEqual(normalize_clip_text('日本\n語の 文'), '日本語の文')
+
+    def test_dedup(self):
+        handler = self.create_handler(max_rate=None)
+        self.clipboard.copy('This is a pen.')
+        self.clipboard.copy('This is\na pen. ')  # Same after normalization
+        self.clipboard.copy('This is an apple.')
+        self.clipboard.copy('This is a pen.')  # Not the last one
+        self.assertEqual(self.texts, ['This is a pen.', 'This is an apple.',
+                                      'This is a pen.'])
+        self.assertEqual(handler.get_stats(), {'duplicate': 1})
+
+        # Translated text overwritten by program is skipped
+        handler.overwrite_clip('これはペンです。')
+        self.assertEqual(len(self.texts), 3)
+
+    def test_gates(self):
+        handler = self.create_handler(max_chars=100, max_rate=None)
+        with self.assertLogs('clipboard', 'WARNING'):
+            for text in [' \n\t', 'x' * 101, '123-456 789', 'OK 1']:
+                self.clipboard.copy(text)
+        self.assertEqual(self.texts, ['OK 1'])
+        self.assertEqual(handler.get_stats(), {'empty': 1, 'too_long': 1,
+                                               'charclass': 1})
+        # Digits are content
+        for text in ['2024-01-01 12:00:00 E1234 timeout', 'ID 12345678',
+                     '-- == **']:
+            self.clipboard.copy(text)
+        self.assertEqual(self.texts[1:], ['2024-01-01 12:00:00 E1234 timeout',
+                                          'ID 12345678'])
+
+    def test_max_chars(self):
+        # Large texts (up to the large text mode of the window) are accepted
+        self.create_handler(max_rate=None)
+        self.clipboard.copy('word ' * 10000)
+        self.assertEqual(len(self.texts), 1)
+
+    def test_rate(self):
+        handler = self.create_handler(max_rate=10)
+        for i in range(5):
+            self.clipboard.copy(f'Text {i}')
+        # Newest one is deferred
+        self.assertEqual(self.texts, ['Text 0'])
+        process_events(0.2)
+        self.assertEqual(self.texts, ['Text 0', 'Text 4'])
+        self.assertEqual(handler.get_stats(), {'rate': 3})
+
+    def test_rate_select(self):
+        # Not capped in select mode (selection buffer coalesces changes)
+        self.clipboard.mode_str = 'select'
+        handler = self.create_handler(max_rate=10)
+        for i in range(5):
+            self.clipboard.copy(f'Text {i}')
+        self.assertEqual(len(self.texts), 5)
+        self.assertEqual(handler.get_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
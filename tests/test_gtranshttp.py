@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import unittest
+import json
+import urllib.parse as urllib_parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from backends import GoogleBackend
+from gtranshttp import GTransHttp
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    ''' Stand-in of Google translation API which answers upper case text '''
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        form = urllib_parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+        query = urllib_parse.parse_qs(urllib_parse.urlsplit(self.path).query)
+        if query['sl'][0] != 'en' or query['tl'][0] != 'ja':
+            self.send_error(400)
+            return
+        src_text = form['q'][0]
+        tgt_text = src_text.upper()
+        body = json.dumps([[[tgt_text, src_text, None, None, 1]], None,
+                           query['sl'][0]]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GTransHttpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        port = self.server.server_address[1]
+        self.backend = GoogleBackend(
+                http_url=f'http://127.0.0.1:{port}/translate_a/single')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_translate(self):
+        gtrans = GTransHttp(self.backend, max_connections=2)
+        self.assertEqual(gtrans.get_backend_mode(), 'google')
+
+        self.assertEqual(gtrans.translate('en', 'ja', 'This is a pen'),
+                         'THIS IS A PEN')
+        self.assertEqual(gtrans.translate('en', 'ja', 'これ & あれ'),
+                         'これ & あれ')
+        self.assertEqual(gtrans.translate('en', 'ja', ''), '')
+
+        # Connection is kept alive
+        self.assertEqual(gtrans._conn_pool.get_stats(),
+                         {'n_requests': 2, 'n_connects': 1})
+        gtrans.exit()
+
+    def test_translate_many(self):
+        gtrans = GTransHttp(self.backend)
+        tgt_texts = gtrans.translate_many('en', 'ja', ['a', 'b', '', 'a'])
+        self.assertEqual(tgt_texts, ['A', 'B', '', 'A'])
+        # Packed into one request
+        self.assertEqual(gtrans._conn_pool.get_stats()['n_requests'], 1)
+        self.assertEqual(gtrans.translate('fr', 'ja', 'a'), '')  # Error
+        gtrans.exit()
+
+    def test_unsupported_backend(self):
+        with self.assertRaises(ValueError):
+            GTransHttp('deepl')
+
+
+if __name__ == '__main__':
+    unittest.main()
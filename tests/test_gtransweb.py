@@ -1,17 +1,23 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
 import unittest
 
-from threading import Event
+from threading import Event, Thread
 
-from gtransweb import log_initializer
-from gtransweb import GTransWeb, GTransWebAsync
-from gtransweb.gtransweb import _create_browser, _create_any_browser
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+import log_initializer
+from gtransweb import GTransWeb, GTransWebAsync, GTransWebPool
+from gtransweb import _create_browser, _create_any_browser
 
 # logging (root)
 from logging import getLogger, DEBUG
 log_initializer.set_root_level(DEBUG)
 logger = getLogger(__name__)
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+from fake_site import start_fake_site, make_local_backend  # noqa: E402
+
 
 class GTransWebTest(unittest.TestCase):
 
@@ -35,6 +41,12 @@ class GTransWebTest(unittest.TestCase):
         # self.assertIsNotNone(browser)
         # browser.quit()
 
+    def test_create_browser_lean_profile(self):
+        for mode in ['chrome', 'firefox']:
+            browser = _create_browser(mode, headless=True, lean_profile=True)
+            self.assertIsNotNone(browser)
+            browser.quit()
+
     def test_create_any_browser(self):
         browser = _create_any_browser(['chrome', 'firefox'], headless=True)
         self.assertIsNotNone(browser)
@@ -64,7 +76,7 @@ class GTransWebTest(unittest.TestCase):
         self.async_cnt = 0
         self.async_finish = Event()
 
-        def callback(tgt_text):
+        def callback(tgt_text, request_id):
             if self.async_cnt == 0:
                 self.assertEqual(tgt_text, 'これはペンです')
             elif self.async_cnt == 1:
@@ -90,12 +102,12 @@ class GTransWebTest(unittest.TestCase):
         self.async_cnt = 0
         self.async_finish = Event()
 
-        def callback(tgt_text):
-            if self.async_cnt == 0:
-                self.assertEqual(tgt_text, 'これはペンです')
-            elif self.async_cnt == 1:
+        def callback(tgt_text, request_id):
+            if gtrans_async.is_latest(request_id):
                 self.assertEqual(tgt_text.lower(), 'this is an apple')
                 self.async_finish.set()
+            else:
+                self.assertEqual(tgt_text, 'これはペンです')
             self.async_cnt += 1
 
         gtrans_async.set_callback(callback)
@@ -108,5 +120,75 @@ class GTransWebTest(unittest.TestCase):
         self.async_finish.wait()
 
 
+class GTransWebFakeSiteTest(unittest.TestCase):
+    ''' Tests against the local fake site of benchmarks (no network needed)
+        The fake site "translates" by upper-casing.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, base_url = start_fake_site(render_delay=10)
+        cls.backend = make_local_backend('google', base_url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_gtransweb_full_profile(self):
+        gtrans = GTransWeb(self.backend, headless=True, lean_profile=False)
+        tgt_text = gtrans.translate('en', 'ja', 'This is a pen')
+        self.assertEqual(tgt_text, 'THIS IS A PEN')
+        gtrans.exit()
+
+    def test_gtransweb_lean_profile(self):
+        gtrans = GTransWeb(self.backend, headless=True, lean_profile=True)
+        tgt_text = gtrans.translate('en', 'ja', 'This is a pen')
+        self.assertEqual(tgt_text, 'THIS IS A PEN')
+        gtrans.exit()
+
+    def test_gtransweb_in_place(self):
+        gtrans = GTransWeb(self.backend, headless=True, in_place=True)
+
+        tgt_text = gtrans.translate('en', 'ja', 'This is a pen')
+        self.assertEqual(tgt_text, 'THIS IS A PEN')
+        tgt_text = gtrans.translate('en', 'ja', 'This is an apple')  # Reuse
+        self.assertEqual(tgt_text, 'THIS IS AN APPLE')
+        tgt_text = gtrans.translate('ja', 'en', 'これはペンです')
+        self.assertEqual(tgt_text, 'これはペンです')
+        gtrans.exit()
+
+    def test_gtransweb_translate_many(self):
+        gtrans = GTransWeb(self.backend, headless=True)
+
+        src_texts = ['This is a pen', '', 'This is an apple', 'This is a pen']
+        tgt_texts = gtrans.translate_many('en', 'ja', src_texts)
+        self.assertEqual(tgt_texts, ['THIS IS A PEN', '', 'THIS IS AN APPLE',
+                                     'THIS IS A PEN'])
+        gtrans.exit()
+
+    def test_gtransweb_pool(self):
+        gtrans_pool = GTransWebPool(pool_size=2, backend_mode=self.backend,
+                                    headless=True)
+        results = [None, None]
+
+        def run(idx, src_text):
+            results[idx] = gtrans_pool.translate('en', 'ja', src_text)
+
+        threads = [Thread(target=run, args=(0, 'This is a pen')),
+                   Thread(target=run, args=(1, 'This is an apple'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['THIS IS A PEN', 'THIS IS AN APPLE'])
+
+        stats = gtrans_pool.get_stats()
+        self.assertEqual(stats['pool_size'], 2)
+        self.assertEqual(stats['n_checkouts'], 2)
+        self.assertEqual(stats['n_busy'], 0)
+        gtrans_pool.exit()
+
+
 if __name__ == '__main__':
     unittest.main()
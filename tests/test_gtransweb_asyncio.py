@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import unittest
+import asyncio
+import time
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from backends import TranslationCancelled
+from gtransweb_asyncio import GTransWebAsyncio
+
+
+class FakeGTransWeb:
+    def __init__(self):
+        self.n_cancelled = 0
+
+    def get_backend_mode(self):
+        return 'google'
+
+    def get_pool_size(self):
+        return 4
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        latency = 10 if src_text == 'slow' else 0.05
+        if cancel_event.wait(latency):
+            self.n_cancelled += 1
+            raise TranslationCancelled()
+        return f'{tgt_lang}:{src_text}'
+
+    def exit(self):
+        pass
+
+
+class GTransWebAsyncioTest(unittest.TestCase):
+
+    def test_translate(self):
+        client = GTransWebAsyncio(FakeGTransWeb())
+
+        async def run():
+            texts = [str(i) for i in range(8)]
+            return await asyncio.gather(*[client.translate('en', 'ja', t)
+                                          for t in texts])
+
+        start = time.perf_counter()
+        results = asyncio.new_event_loop().run_until_complete(run())
+        self.assertEqual(results, [f'ja:{i}' for i in range(8)])
+        self.assertLess(time.perf_counter() - start, 0.05 * 8)  # Parallel
+        client.exit()
+
+    def test_cancel(self):
+        gtrans = FakeGTransWeb()
+        client = GTransWebAsyncio(gtrans, max_workers=1)
+
+        async def run():
+            task = asyncio.ensure_future(client.translate('en', 'ja', 'slow'))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # Next request is not blocked by the cancelled one
+            return await asyncio.wait_for(client.translate('en', 'ja', 'a'),
+                                          timeout=1)
+
+        loop = asyncio.new_event_loop()
+        self.assertEqual(loop.run_until_complete(run()), 'ja:a')
+        self.assertEqual(gtrans.n_cancelled, 1)
+        client.exit()
+
+
+if __name__ == '__main__':
+    unittest.main()
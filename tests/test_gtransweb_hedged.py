@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import unittest
+import time
+from threading import Event
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from backends import TranslationCancelled
+from gtransweb_hedged import GTransWebHedged, create_hedged
+from translation_cache import TranslationCache
+
+
+class FakeGTransWeb:
+    ''' Fake engine with configurable latency '''
+
+    def __init__(self, backend_mode, latency=0.01, spike=False):
+        self.backend_mode = backend_mode
+        self.latency = latency
+        self.spike = spike  # Stall on 'spike' text
+        self.n_requests = 0
+        self.n_cancelled = 0
+
+    def get_backend_mode(self):
+        return self.backend_mode
+
+    def is_headless(self):
+        return True
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        self.n_requests += 1
+        latency = self.latency
+        if self.spike and src_text == 'spike':
+            latency = 10
+        if cancel_event.wait(latency):
+            self.n_cancelled += 1
+            raise TranslationCancelled()
+        if src_text == 'fail':
+            return ''
+        return f'{self.backend_mode}:{src_text}'
+
+    def exit(self):
+        pass
+
+
+class GTransWebHedgedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = FakeGTransWeb('google', spike=True)
+        self.secondary = FakeGTransWeb('deepl', latency=0.02)
+        self.gtrans = GTransWebHedged(self.primary, self.secondary,
+                                      min_samples=5)
+
+    def tearDown(self):
+        self.gtrans.exit()
+
+    def test_no_hedge(self):
+        # Requests far faster than the observed latencies are not hedged
+        self.primary.latency = 0.05
+        for i in range(5):
+            self.gtrans.translate('en', 'ja', str(i))
+        self.primary.latency = 0.001
+        for i in range(5):
+            self.assertEqual(self.gtrans.translate('en', 'ja', str(i)),
+                             f'google:{i}')
+        self.assertEqual(self.secondary.n_requests, 0)
+        self.assertLess(self.gtrans.get_hedge_delay(), 0.1)
+
+    def test_hedge_spike(self):
+        for i in range(5):
+            self.gtrans.translate('en', 'ja', str(i))
+        start = time.perf_counter()
+        self.assertEqual(self.gtrans.translate('en', 'ja', 'spike'),
+                         'deepl:spike')
+        self.assertLess(time.perf_counter() - start, 1.0)
+        # Loser is cancelled
+        time.sleep(0.05)
+        self.assertEqual(self.primary.n_cancelled, 1)
+        stats = self.gtrans.get_stats()
+        self.assertEqual(stats['n_hedged'], 1)
+        self.assertEqual(stats['n_secondary_wins'], 1)
+
+    def test_hedge_latencies(self):
+        # Cancelled primaries are not sampled as latencies
+        for i in range(5):
+            self.gtrans.translate('en', 'ja', str(i))
+        self.gtrans.translate('en', 'ja', 'spike')
+        time.sleep(0.05)
+        self.assertEqual(self.primary.n_cancelled, 1)
+        self.assertEqual(len(self.gtrans._latencies), 5)
+        self.assertLess(self.gtrans.get_hedge_delay(), 0.1)
+
+    def test_secondary_not_cached(self):
+        cache = TranslationCache()
+        for i in range(5):
+            cache.translate(self.gtrans, 'en', 'ja', str(i))
+        self.assertTrue(self.gtrans.is_last_result_cacheable())
+        self.assertEqual(cache.get('google', 'en', 'ja', '0'), 'google:0')
+        self.assertEqual(cache.translate(self.gtrans, 'en', 'ja', 'spike'),
+                         'deepl:spike')
+        self.assertFalse(self.gtrans.is_last_result_cacheable())
+        self.assertIsNone(cache.get('google', 'en', 'ja', 'spike'))
+        # Reset by the next request
+        cache.translate(self.gtrans, 'en', 'ja', 'a')
+        self.assertTrue(self.gtrans.is_last_result_cacheable())
+
+    def test_hedge_failure(self):
+        # Empty result of the primary is not a good result
+        self.assertEqual(self.gtrans.translate('en', 'ja', 'fail'), '')
+        self.assertEqual(self.secondary.n_requests, 1)
+
+    def test_cancel(self):
+        cancel_event = Event()
+        cancel_event.set()
+        with self.assertRaises(TranslationCancelled):
+            self.gtrans.translate('en', 'ja', 'spike', cancel_event)
+
+    def test_create_hedged(self):
+        gtrans = create_hedged(FakeGTransWeb, 'deepl', ['google', 'deepl'])
+        self.assertEqual(gtrans.get_backend_mode(), 'deepl')
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), 'deepl:a')
+        gtrans.exit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import unittest
+import time
+from queue import Empty
+
+from selenium.common.exceptions import WebDriverException
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+import gtransweb
+from gtransweb import GTransWeb, GTransWebPool
+
+
+class FakeBrowser:
+    ''' Browser stand-in which only counts calls '''
+    n_created = 0
+    broken_get = False
+
+    def __init__(self):
+        FakeBrowser.n_created += 1
+        self.id = FakeBrowser.n_created
+        self.quitted = False
+
+    def get(self, url):
+        time.sleep(0.01)
+        if self.broken_get:
+            raise WebDriverException('Failed to load')
+
+    def quit(self):
+        self.quitted = True
+
+
+class FakeGTransWeb(GTransWeb):
+    ''' GTransWeb whose translation returns the ID of the used browser '''
+    broken_browsers = set()
+
+    def _translate(self, src_lang, tgt_lang, src_text):
+        if self._browser.id in self.broken_browsers:
+            raise WebDriverException('Broken')
+        return str(self._browser.id)
+
+
+class GTransWebRecycleTest(unittest.TestCase):
+
+    def setUp(self):
+        self._create_any_browser = gtransweb._create_any_browser
+        gtransweb._create_any_browser = lambda *args: FakeBrowser()
+        FakeBrowser.n_created = 0
+        FakeBrowser.broken_get = False
+        FakeGTransWeb.broken_browsers = set()
+
+    def tearDown(self):
+        gtransweb._create_any_browser = self._create_any_browser
+
+    def wait_prepared(self, gtrans):
+        while gtrans._next_browser is None:
+            time.sleep(0.01)
+
+    def test_max_requests(self):
+        gtrans = FakeGTransWeb(max_requests=2)
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '1')
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '1')
+        # Replacement is prepared in background and used from next one
+        self.wait_prepared(gtrans)
+        old_browser = gtrans._browser
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '2')
+        time.sleep(0.05)
+        self.assertTrue(old_browser.quitted)
+        gtrans.exit()
+        self.assertTrue(gtrans._browser.quitted)
+
+    def test_max_age(self):
+        gtrans = FakeGTransWeb(max_age=0.05)
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '1')
+        time.sleep(0.06)
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '1')
+        self.wait_prepared(gtrans)
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '2')
+        gtrans.exit()
+
+    def test_bounded_retry(self):
+        gtrans = FakeGTransWeb(max_retries=2)
+        FakeGTransWeb.broken_browsers = {1}
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '2')
+        # Give up instead of restarting forever
+        FakeGTransWeb.broken_browsers = {2, 3, 4, 5}
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '')
+        self.assertEqual(FakeBrowser.n_created, 4)
+        gtrans.exit()
+
+    def test_no_leak(self):
+        browsers = []
+        gtransweb._create_any_browser = \
+            lambda *args: browsers.append(FakeBrowser()) or browsers[-1]
+        gtrans = FakeGTransWeb(max_retries=2)
+        # Browser failed to load top page is closed
+        FakeGTransWeb.broken_browsers = {1}
+        FakeBrowser.broken_get = True
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '')
+        self.assertEqual(len(browsers), 5)
+        self.assertTrue(all(b.quitted for b in browsers))
+        # No browser is launched after exit
+        FakeBrowser.broken_get = False
+        gtrans.exit()
+        self.assertEqual(gtrans.translate('en', 'ja', 'a'), '')
+        self.assertEqual(len(browsers), 5)
+
+    def test_pool_launch_failure(self):
+        # No browser: fail instead of hanging on translation
+        gtransweb._create_any_browser = lambda *args: None
+        with self.assertRaises(WebDriverException):
+            GTransWebPool(2)
+
+        # Some browsers: the pool shrinks
+        browsers = [None, FakeBrowser()]
+        gtransweb._create_any_browser = lambda *args: browsers.pop()
+        pool = GTransWebPool(2)
+        self.assertEqual(pool.get_pool_size(), 1)
+        with pool.checkout():
+            with self.assertRaises(Empty):
+                with pool.checkout(timeout=0.01):
+                    pass
+        pool.exit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import unittest
+import time
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+import gtransweb
+from backends import Backend
+from gtransweb import GTransWeb
+
+
+class FakeBrowser:
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+class FakeElement:
+    ''' Result element whose text grows word by word '''
+
+    def __init__(self, text, interval=0.05):
+        self._words = text.split(' ')
+        self._interval = interval
+        self._start = time.monotonic()
+
+    @property
+    def text(self):
+        n_words = int((time.monotonic() - self._start) / self._interval) + 1
+        return ' '.join(self._words[:n_words])
+
+
+class FakeBackend(Backend):
+    name = 'fake'
+    max_text_length = 20
+
+
+class FakeGTransWeb(GTransWeb):
+    ''' GTransWeb whose result grows in a fake element '''
+
+    def _translate(self, src_lang, tgt_lang, src_text):
+        result_elem = FakeElement(src_text.upper())
+        return self._wait_stable(result_elem, result_elem.text)
+
+
+class GTransWebStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self._create_any_browser = gtransweb._create_any_browser
+        gtransweb._create_any_browser = lambda *args: FakeBrowser()
+        self.gtrans = FakeGTransWeb(FakeBackend())
+
+    def tearDown(self):
+        gtransweb._create_any_browser = self._create_any_browser
+
+    def test_stream(self):
+        partials = []
+        tgt_text = self.gtrans.translate('en', 'ja', 'a b c d',
+                                         partial_callback=partials.append)
+        self.assertEqual(tgt_text, 'A B C D')
+        # Growing partial texts until stable
+        self.assertEqual(partials[0], 'A')
+        self.assertEqual(partials[-1], 'A B C D')
+        self.assertGreater(len(partials), 2)
+        for prev, text in zip(partials, partials[1:]):
+            self.assertTrue(text.startswith(prev))
+
+    def test_stream_chunks(self):
+        partials = []
+        src_text = 'This is a pen.\n\nThat is an apple.'
+        tgt_text = self.gtrans.translate('en', 'ja', src_text,
+                                         partial_callback=partials.append)
+        self.assertEqual(tgt_text, src_text.upper())
+        # Translated chunks are kept in partial texts
+        self.assertIn('THIS IS A PEN.\n\nTHAT', partials)
+        self.assertEqual(partials[-1], tgt_text)
+
+    def test_no_stream(self):
+        # The first extracted text is returned without waiting
+        self.assertEqual(self.gtrans.translate('en', 'ja', 'a b c'), 'A')
+
+
+if __name__ == '__main__':
+    unittest.main()
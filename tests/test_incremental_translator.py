@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import unittest
+from threading import Event
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from backends import TranslationCancelled
+from incremental_translator import (IncrementalTranslator,
+                                    find_changed_range, join_text)
+from translation_cache import TranslationCache
+
+
+class FakeGTransWeb:
+    ''' Fake engine recording sent texts '''
+
+    def __init__(self):
+        self.sent = []
+
+    def get_backend_mode(self):
+        return 'google'
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None,
+                  partial_callback=None):
+        self.sent.append(src_text)
+        if partial_callback is not None:
+            partial_callback(src_text.upper())
+        return src_text.upper()
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        self.sent.extend(src_texts)
+        return [text.upper() for text in src_texts]
+
+
+class IncrementalTranslatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gtrans = FakeGTransWeb()
+        self.cache = TranslationCache()
+        self.translator = IncrementalTranslator(self.cache)
+
+    def translate(self, src_text, use_cache=True, cancel_event=None):
+        return self.translator.translate(self.gtrans, 'en', 'ja', src_text,
+                                         use_cache, cancel_event)
+
+    def test_translate(self):
+        segments = self.translate('A pen. An apple.\n\nA pen.')
+        self.assertEqual(join_text(segments), 'A PEN. AN APPLE.\n\nA PEN.')
+        # Duplicated sentence is sent once
+        self.assertEqual(self.gtrans.sent, ['A pen.', 'An apple.'])
+
+        # Only the edited sentence is sent
+        self.gtrans.sent = []
+        segments = self.translate('A pen. An orange.\n\nA pen.')
+        self.assertEqual(join_text(segments), 'A PEN. AN ORANGE.\n\nA PEN.')
+        self.assertEqual(self.gtrans.sent, ['An orange.'])
+        self.assertEqual(self.translator.get_n_sent(), 1)
+
+        # Nothing is sent for known sentences
+        self.gtrans.sent = []
+        self.translate('An apple. A pen.')
+        self.assertEqual(self.gtrans.sent, [])
+
+        # All are sent without cache
+        self.translate('A pen. An apple.', use_cache=False)
+        self.assertEqual(self.gtrans.sent, ['A pen.', 'An apple.'])
+
+    def stream(self, src_text):
+        partials = []
+        segments = self.translator.translate(self.gtrans, 'en', 'ja',
+                                             src_text,
+                                             partial_callback=partials.append)
+        return join_text(segments), partials
+
+    def test_stream(self):
+        self.translator = IncrementalTranslator(self.cache,
+                                                stream_min_length=0)
+        self.translate('An apple.')
+        tgt_text, partials = self.stream('A pen. An apple. A dog. A cat.')
+        self.assertEqual(tgt_text, 'A PEN. AN APPLE. A DOG. A CAT.')
+        # Runs of changed sentences are sent in order with markers
+        self.assertEqual(self.gtrans.sent[1:],
+                         ['A pen.', '[0]\nA dog.\n\n[1]\nA cat.'])
+        self.assertEqual(partials, ['A PEN.',
+                                    'A PEN. AN APPLE. A DOG. A CAT.'])
+
+    def test_stream_edit(self):
+        self.translator = IncrementalTranslator(self.cache,
+                                                stream_min_length=0)
+        self.stream('A pen. An apple. A dog.')
+        # Sentences of the streamed run are memoized one by one
+        self.gtrans.sent = []
+        tgt_text, partials = self.stream('A pen. An orange. A dog.')
+        self.assertEqual(tgt_text, 'A PEN. AN ORANGE. A DOG.')
+        self.assertEqual(self.gtrans.sent, ['An orange.'])
+        # Single sentence is streamed too
+        self.assertEqual(partials, ['A PEN. AN ORANGE.'])
+
+    def test_stream_lost(self):
+        self.translator = IncrementalTranslator(self.cache,
+                                                stream_min_length=0)
+        translate = self.gtrans.translate
+
+        def merge(src_lang, tgt_lang, src_text, **kwargs):
+            if src_text.startswith('[0]'):
+                self.gtrans.sent.append(src_text)
+                return 'A PEN AND AN APPLE.'  # Markers are lost
+            return translate(src_lang, tgt_lang, src_text, **kwargs)
+
+        self.gtrans.translate = merge
+        tgt_text, _ = self.stream('A pen. An apple.')
+        # Lost segments are sent one by one
+        self.assertEqual(tgt_text, 'A PEN. AN APPLE.')
+        self.assertEqual(self.gtrans.sent[1:], ['A pen.', 'An apple.'])
+        self.assertEqual(self.cache.get('google', 'en', 'ja', 'An apple.'),
+                         'AN APPLE.')
+
+    def test_stream_short(self):
+        # Short text is not streamed
+        tgt_text, partials = self.stream('A pen. An apple.')
+        self.assertEqual(tgt_text, 'A PEN. AN APPLE.')
+        self.assertEqual(partials, [])
+        self.assertEqual(self.gtrans.sent, ['A pen.', 'An apple.'])
+
+    def test_cancel(self):
+        cancel_event = Event()
+        cancel_event.set()
+        with self.assertRaises(TranslationCancelled):
+            self.translate('A pen. An apple.', cancel_event=cancel_event)
+        # Cancelled results are not memoized
+        self.assertIsNone(self.cache.get('google', 'en', 'ja', 'A pen.'))
+
+    def test_find_changed_range(self):
+        old = [('A', ' '), ('B', ' '), ('C', '')]
+        self.assertEqual(find_changed_range(old, old), (3, 3, 3))
+        self.assertEqual(find_changed_range(old, [('A', ' '), ('X', ' '),
+                                                  ('C', '')]), (1, 2, 2))
+        self.assertEqual(find_changed_range(old, [('A', ' '), ('C', '')]),
+                         (1, 2, 1))
+        self.assertEqual(find_changed_range(old, old + [('D', '')]),
+                         (3, 3, 4))
+        self.assertEqual(find_changed_range([('A', '')], [('A', ''),
+                                                          ('A', '')]),
+                         (1, 1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
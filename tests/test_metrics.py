@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+import urllib.request
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from metrics import MetricsRegistry, start_metrics_server
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_histogram(self):
+        metrics = MetricsRegistry()
+        for value in [0.002, 0.02, 0.02, 0.3]:
+            metrics.observe('stage_seconds', value, stage='navigate')
+        hist = metrics.get_histogram('stage_seconds', stage='navigate')
+        self.assertEqual(hist.count, 4)
+        self.assertAlmostEqual(hist.sum, 0.342)
+        self.assertEqual(hist.quantile(0.5), 0.025)
+        self.assertEqual(hist.quantile(1.0), 0.5)
+        self.assertIsNone(metrics.get_histogram('stage_seconds'))
+
+        with metrics.timer('stage_seconds', stage='extract'):
+            pass
+        hist = metrics.get_histogram('stage_seconds', stage='extract')
+        self.assertEqual(hist.count, 1)
+
+    def test_counter(self):
+        metrics = MetricsRegistry()
+        metrics.inc('restarts_total', backend='google')
+        metrics.inc('restarts_total', 2, backend='google')
+        self.assertEqual(metrics.get_counter('restarts_total',
+                                             backend='google'), 3)
+        self.assertEqual(metrics.get_counter('restarts_total',
+                                             backend='deepl'), 0)
+        metrics.reset()
+        self.assertEqual(metrics.get_counter('restarts_total',
+                                             backend='google'), 0)
+
+    def test_export(self):
+        metrics = MetricsRegistry()
+        metrics.observe('stage_seconds', 0.02, stage='navigate')
+        metrics.inc('timeouts_total', backend='google')
+
+        snapshot = json.loads(json.dumps(metrics.snapshot()))
+        hist = snapshot['histograms'][0]
+        self.assertEqual(hist['labels'], {'stage': 'navigate'})
+        self.assertEqual(hist['count'], 1)
+        self.assertEqual(hist['p50'], 0.025)
+        self.assertEqual(snapshot['counters'][0]['value'], 1)
+
+        text = metrics.to_prometheus()
+        self.assertIn('stage_seconds_bucket{stage="navigate",le="0.01"} 0',
+                      text)
+        self.assertIn('stage_seconds_bucket{stage="navigate",le="+Inf"} 1',
+                      text)
+        self.assertIn('stage_seconds_count{stage="navigate"} 1', text)
+        self.assertIn('timeouts_total{backend="google"} 1', text)
+
+        # Label values are escaped
+        metrics.inc('errors_total', reason='a "b"\\c\nd')
+        self.assertIn('errors_total{reason="a \\"b\\"\\\\c\\nd"} 1',
+                      metrics.to_prometheus())
+
+    def test_server(self):
+        metrics = MetricsRegistry()
+        metrics.inc('restarts_total')
+        server = start_metrics_server(0, metrics)
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}'
+            with urllib.request.urlopen(url + '/metrics') as res:
+                self.assertIn('restarts_total 1', res.read().decode())
+            with urllib.request.urlopen(url + '/metrics.json') as res:
+                snapshot = json.loads(res.read().decode())
+                self.assertEqual(snapshot['counters'][0]['value'], 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from request_scheduler import RequestScheduler
+
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def test_latest_wins(self):
+        scheduler = RequestScheduler(queue_size=1)
+        id1 = scheduler.put(('en', 'ja', 'a'))
+        request = scheduler.get()
+        self.assertEqual(request.query, ('en', 'ja', 'a'))
+
+        # Queued requests are superseded by newer ones
+        scheduler.put(('en', 'ja', 'b'))
+        id3 = scheduler.put(('en', 'ja', 'c'))
+        self.assertEqual(scheduler.task_done(request), id1)
+        self.assertFalse(scheduler.is_latest(id1))
+
+        request = scheduler.get()
+        self.assertEqual(request.query, ('en', 'ja', 'c'))
+        self.assertEqual(scheduler.task_done(request), id3)
+        self.assertTrue(scheduler.is_latest(id3))
+        self.assertIsNone(scheduler.get(timeout=0.01))
+
+        stats = scheduler.get_stats()
+        self.assertEqual(stats['n_requests'], 3)
+        self.assertEqual(stats['n_dropped'], 1)
+
+    def test_coalesce(self):
+        scheduler = RequestScheduler(queue_size=0)  # Infinite
+        scheduler.put(('en', 'ja', 'a'))
+        scheduler.put(('en', 'ja', 'b'))
+        running = scheduler.get()
+
+        id3 = scheduler.put(('en', 'ja', 'b'))  # Coalesced with queued one
+        id4 = scheduler.put(('en', 'ja', 'a'))  # Coalesced with running one
+        self.assertEqual(scheduler.task_done(running), id4)
+        request = scheduler.get()
+        self.assertEqual(request.query, ('en', 'ja', 'b'))
+        self.assertEqual(scheduler.task_done(request), id3)
+        self.assertEqual(scheduler.get_stats()['n_coalesced'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
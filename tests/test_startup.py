@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from startup_profile import ImportProfiler, format_report
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..', 'gtransweb_gui')
+# Upper bound of time to window (sec) with offscreen Qt
+TIME_TO_WINDOW_BUDGET = 2.0
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        # Selenium and HTTP servers are imported when they are used
+        code = ('import sys; import gtransweb_gui, gtransweb; '
+                'print(sorted(m for m in ["selenium.webdriver", '
+                '"http.server", "translation_daemon"] if m in sys.modules))')
+        out = subprocess.check_output([sys.executable, '-c', code],
+                                      cwd=PACKAGE_DIR)
+        self.assertEqual(out.decode().strip(), '[]')
+
+    def test_import_profiler(self):
+        profiler = ImportProfiler()
+        profiler.start()
+        import xml.dom.minidom  # noqa: F401 (not imported by other tests)
+        profiler.stop()
+        times = profiler.get_times()
+        self.assertIn('xml.dom.minidom', times)
+        self_time, total_time = times['xml.dom.minidom']
+        self.assertLessEqual(self_time, total_time)
+
+        report = format_report(times, {'qt_app': 0.01, 'window': 0.03}, 0.1)
+        self.assertIn('xml', report)
+        self.assertRegex(report, r'window +20\.0')
+        self.assertRegex(report, r'time to window +100\.0')
+
+    def test_time_to_window(self):
+        # Imports are timed by every entry point
+        for command in [['-m', 'gtransweb_gui'],
+                        [os.path.join('gtransweb_gui', 'cli.py')],
+                        [os.path.join('gtransweb_gui', 'gtransweb_gui.py')]]:
+            with self.subTest(command=command):
+                report = self._profile_startup(command)
+                match = re.search(r'imports +([0-9.]+)', report)
+                self.assertGreater(float(match.group(1)), 0, report)
+                match = re.search(r'time to window +([0-9.]+)', report)
+                self.assertIsNotNone(match, report)
+                self.assertLess(float(match.group(1)) / 1000,
+                                TIME_TO_WINDOW_BUDGET, report)
+
+    def _profile_startup(self, command):
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env['HOME'] = tmp_dir  # Settings and caches
+            env['XDG_CONFIG_HOME'] = tmp_dir
+            result = subprocess.run(
+                    [sys.executable] + command + ['--profile-startup'],
+                    cwd=os.path.join(PACKAGE_DIR, '..'), env=env,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    timeout=60)
+        report = result.stderr.decode()
+        self.assertEqual(result.returncode, 0, report)
+        return report
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from text_segments import (pack_segments, join_segments, split_segments,
+                           split_sentences, split_chunks, split_text)
+
+
+class TextSegmentsTest(unittest.TestCase):
+
+    def test_pack_segments(self):
+        texts = ['aaa', 'bbb', 'ccc', 'x' * 100, '[0]\nconflict']
+        batches = pack_segments(texts, 30)
+        self.assertEqual(batches, [['x' * 100], ['[0]\nconflict'],
+                                   ['aaa', 'bbb', 'ccc']])
+        for batch in batches:
+            if len(batch) > 1:
+                self.assertLessEqual(len(join_segments(batch)), 30)
+
+    def test_split_segments(self):
+        packed = join_segments(['This is a pen', 'Line 1\nLine 2'])
+        self.assertEqual(split_segments(packed, 2),
+                         {0: 'This is a pen', 1: 'Line 1\nLine 2'})
+
+        # Reordered and full-width markers
+        translated = '［1］\n行1\n行2\n\n［0］\nこれはペンです'
+        self.assertEqual(split_segments(translated, 2),
+                         {0: 'これはペンです', 1: '行1\n行2'})
+
+        # Merged segments
+        translated = '[0]\nこれはペンです 行1 行2'
+        self.assertEqual(split_segments(translated, 2),
+                         {0: 'これはペンです 行1 行2'})
+
+    def test_split_sentences(self):
+        self.assertEqual(split_sentences('A pen. An apple!\nこれ。あれ'),
+                         [('A pen.', ' '), ('An apple!', '\n'),
+                          ('これ。', ''), ('あれ', '')])
+
+    def test_split_chunks(self):
+        text = ('This is a pen. This is an apple.\n\n'
+                'これはペンです。これはリンゴです。\n\n' + 'x' * 50)
+        for max_length in [10, 20, 40, 1000]:
+            chunks = split_chunks(text, max_length)
+            # Restorable
+            self.assertEqual(''.join(c + s for c, s in chunks), text)
+            for chunk, _ in chunks:
+                self.assertLessEqual(len(chunk), max_length)
+
+        self.assertEqual(split_chunks(text, 40)[:2],
+                         [('This is a pen. This is an apple.', '\n\n'),
+                          ('これはペンです。これはリンゴです。', '\n\n')])
+
+    def test_split_text(self):
+        text = 'A pen. An apple.\n\nこれ。あれ\n'
+        self.assertEqual(split_text(text),
+                         [('A pen.', ' '), ('An apple.', '\n\n'),
+                          ('これ。', ''), ('あれ', '\n')])
+        self.assertEqual(split_text(text, 'paragraph'),
+                         [('A pen. An apple.', '\n\n'), ('これ。あれ', '\n')])
+        for granularity in ['sentence', 'paragraph']:
+            segments = split_text(text, granularity)
+            self.assertEqual(''.join(s + p for s, p in segments), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import tempfile
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from translation_cache import TranslationCache
+
+
+class FakeGTransWeb:
+    def __init__(self):
+        self.n_calls = 0
+
+    def get_backend_mode(self):
+        return 'google'
+
+    def translate(self, src_lang, tgt_lang, src_text):
+        self.n_calls += 1
+        return f'{tgt_lang}:{src_text}'
+
+
+class TranslationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_memory_tier(self):
+        cache = TranslationCache(max_entries=2)
+        gtrans = FakeGTransWeb()
+
+        self.assertEqual(cache.translate(gtrans, 'en', 'ja', 'a'), 'ja:a')
+        self.assertEqual(cache.translate(gtrans, 'en', 'ja', ' a\r\n'),
+                         'ja:a')  # Normalized
+        self.assertEqual(gtrans.n_calls, 1)
+
+        # Evict by LRU
+        cache.translate(gtrans, 'en', 'ja', 'b')
+        cache.translate(gtrans, 'en', 'ja', 'c')
+        self.assertIsNone(cache.get('google', 'en', 'ja', 'a'))
+        self.assertEqual(cache.get('google', 'en', 'ja', 'c'), 'ja:c')
+
+        # Bypass
+        cache.translate(gtrans, 'en', 'ja', 'c', use_cache=False)
+        self.assertEqual(gtrans.n_calls, 4)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['n_mem_hits'], 2)
+        self.assertEqual(stats['n_evictions'], 1)
+
+    def test_disk_tier(self):
+        cache = TranslationCache(db_path=self.db_path)
+        cache.put('deepl', 'en', 'ja', 'pen', 'ペン')
+        cache.close()
+
+        # Survives restart
+        cache = TranslationCache(db_path=self.db_path)
+        self.assertEqual(cache.get('deepl', 'en', 'ja', 'pen'), 'ペン')
+        self.assertIsNone(cache.get('google', 'en', 'ja', 'pen'))
+        self.assertEqual(cache.get_stats()['n_db_hits'], 1)
+
+        cache.invalidate('deepl', 'en', 'ja', 'pen')
+        self.assertIsNone(cache.get('deepl', 'en', 'ja', 'pen'))
+        cache.close()
+
+    def test_ttl_and_size(self):
+        cache = TranslationCache(db_path=self.db_path, max_db_entries=2,
+                                 ttl=0)
+        cache.put('google', 'en', 'ja', 'a', 'A')
+        self.assertIsNone(cache.get('google', 'en', 'ja', 'a'))
+
+        cache = TranslationCache(max_entries=1, db_path=self.db_path,
+                                 max_db_entries=2, ttl=None,
+                                 db_evict_interval=1)
+        for text in ['a', 'b', 'c']:
+            cache.put('google', 'en', 'ja', text, text.upper())
+        self.assertEqual(cache.get_stats()['n_db_entries'], 2)
+        self.assertEqual(cache.get('google', 'en', 'ja', 'b'), 'B')
+        cache.close()
+
+    def test_evict_interval(self):
+        cache = TranslationCache(db_path=self.db_path, max_db_entries=2,
+                                 ttl=None, db_evict_interval=3)
+        for text in ['a', 'b', 'c', 'd', 'e']:
+            cache.put('google', 'en', 'ja', text, text.upper())
+        # Evicted at the 3rd put only
+        self.assertEqual(cache.get_stats()['n_db_entries'], 4)
+        cache.put('google', 'en', 'ja', 'f', 'F')
+        self.assertEqual(cache.get_stats()['n_db_entries'], 2)
+        self.assertEqual(cache.get('google', 'en', 'ja', 'f'), 'F')
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import unittest
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError \
+    as FutureTimeoutError
+from threading import Lock
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from translation_daemon import (FairQueue, TranslationClient,
+                                TranslationDaemon, connect_daemon,
+                                CONNECT_TIMEOUT)
+
+
+class UpperGTrans:
+    ''' Fake translation engine recording batches '''
+
+    def __init__(self):
+        self.batches = []
+        self._lock = Lock()
+
+    def get_backend_mode(self):
+        return 'google'
+
+    def is_headless(self):
+        return True
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        return self.translate_many(src_lang, tgt_lang, [src_text])[0]
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        with self._lock:
+            self.batches.append(list(src_texts))
+        time.sleep(0.05)
+        return [f'{tgt_lang}:{src_text.upper()}' for src_text in src_texts]
+
+
+class FairQueueTest(unittest.TestCase):
+
+    def test_round_robin(self):
+        queue = FairQueue()
+        for i in range(5):
+            queue.put('a', 'en-ja', f'a{i}')
+        queue.put('b', 'en-ja', 'b0')
+        queue.put('c', 'en-fr', 'c0')
+        queue.put('b', 'en-ja', 'b1')
+
+        # One item from each client in turn with the same key
+        self.assertEqual(queue.get_batch(4), ('en-ja', ['a0', 'b0', 'a1',
+                                                        'b1']))
+        # Served client goes to the end
+        self.assertEqual(queue.get_batch(4), ('en-fr', ['c0']))
+        self.assertEqual(queue.get_batch(4), ('en-ja', ['a2', 'a3', 'a4']))
+        self.assertEqual(len(queue), 0)
+
+        queue.close()
+        self.assertEqual(queue.get_batch(4), (None, []))
+
+
+class TranslationDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gtrans = UpperGTrans()
+        self.daemon = TranslationDaemon(self.gtrans, port=0)
+        self.daemon.start()
+        self.port = self.daemon.get_port()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+
+    def test_client(self):
+        client = connect_daemon(self.port)
+        self.assertIsInstance(client, TranslationClient)
+        self.assertEqual(client.get_backend_mode(), 'google')
+        self.assertTrue(client.is_headless())
+        self.assertEqual(client.translate('en', 'ja', 'hello'), 'ja:HELLO')
+        self.assertEqual(client.translate_many('en', 'fr', ['a', 'b']),
+                         ['fr:A', 'fr:B'])
+        client.exit()
+
+        # Different backend or not running
+        self.assertIsNone(connect_daemon(self.port, backend_mode='deepl'))
+        self.daemon.shutdown()
+        self.assertIsNone(connect_daemon(self.port))
+
+    def test_batching(self):
+        clients = [TranslationClient(self.port, client_id=f'client{i}')
+                   for i in range(8)]
+        with ThreadPoolExecutor(len(clients)) as executor:
+            results = list(executor.map(
+                    lambda c: c.translate('en', 'ja', c._client_id), clients))
+        self.assertEqual(results, [f'ja:CLIENT{i}' for i in range(8)])
+        # Requests queued during translation are batched
+        self.assertLess(len(self.gtrans.batches), 8)
+        self.assertEqual(self.daemon.get_stats()['n_texts'], 8)
+
+    def test_timeout(self):
+        daemon = TranslationDaemon(self.gtrans, port=0, max_batch=1,
+                                   timeout=0.08)
+        daemon.start()
+        start = time.perf_counter()
+        with self.assertRaises(FutureTimeoutError):
+            daemon.translate_many('client', 'en', 'ja', ['a', 'b', 'c'])
+        # Waits for the timeout once, not for each text
+        self.assertLess(time.perf_counter() - start, 0.3)
+        time.sleep(0.2)
+        daemon.shutdown()
+        # Texts left in the queue are not translated
+        self.assertEqual(self.gtrans.batches[0], ['a'])
+        self.assertNotIn(['c'], self.gtrans.batches)
+        self.assertEqual(daemon.get_stats()['n_timeouts'], 1)
+
+    def test_connect_timeout(self):
+        # Not responding server
+        with socket.socket() as server:
+            server.bind(('127.0.0.1', 0))
+            server.listen()
+            start = time.perf_counter()
+            self.assertIsNone(connect_daemon(server.getsockname()[1]))
+            self.assertLess(time.perf_counter() - start,
+                            CONNECT_TIMEOUT + 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import tempfile
+
+import gtransweb_gui  # noqa: F401 (puts the package modules on sys.path)
+from translation_memory import (TranslationMemory, GTransWebMemory,
+                                substitute)
+
+
+class FakeGTransWeb:
+    ''' Fake engine recording sent texts '''
+
+    def __init__(self):
+        self.sent = []
+
+    def get_backend_mode(self):
+        return 'google'
+
+    def translate(self, src_lang, tgt_lang, src_text, cancel_event=None):
+        self.sent.append(src_text)
+        return f'[{tgt_lang}] {src_text}'
+
+    def translate_many(self, src_lang, tgt_lang, src_texts):
+        return [self.translate(src_lang, tgt_lang, t) for t in src_texts]
+
+
+class TranslationMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = TranslationMemory()
+        self.memory.put('google', 'en', 'ja',
+                        'Failed to open config.yaml at line 12.',
+                        '12行目でconfig.yamlを開けませんでした。')
+        self.memory.put('google', 'en', 'ja', 'I like apples.',
+                        '私はリンゴが好きです。')
+
+    def tearDown(self):
+        self.memory.close()
+
+    def get(self, src_text, backend_mode='google'):
+        return self.memory.get(backend_mode, 'en', 'ja', src_text)
+
+    def test_exact(self):
+        self.assertEqual(self.get(' I like apples.\n'),
+                         '私はリンゴが好きです。')
+        self.assertIsNone(self.get('I like apples.', 'deepl'))
+
+    def test_substitute(self):
+        # Numbers and verbatim tokens are substituted
+        self.assertEqual(self.get('Failed to open config.yaml at line 345.'),
+                         '345行目でconfig.yamlを開けませんでした。')
+        self.assertEqual(self.get('Failed to open config.yml at line 12.'),
+                         '12行目でconfig.ymlを開けませんでした。')
+        # Translated words are not
+        self.assertIsNone(self.get('I like oranges.'))
+        stats = self.memory.get_stats()
+        self.assertEqual(stats['n_fuzzy_hits'], 2)
+        self.assertEqual(stats['n_misses'], 1)
+
+    def test_search(self):
+        results = self.memory.search('google', 'en', 'ja',
+                                     'Failed to open config.yaml at line 9!')
+        self.assertEqual(len(results), 1)
+        self.assertGreater(results[0][0], 0.8)
+        self.assertEqual(results[0][1],
+                         'Failed to open config.yaml at line 12.')
+
+    def test_substitute_func(self):
+        self.assertEqual(substitute('Retry 3 of 5', '5回中3回目', 'Retry 4 of 5'),
+                         '5回中4回目')
+        # Ambiguous or partially replaced tokens
+        self.assertIsNone(substitute('Retry 3 of 3', '3回中3回目',
+                                     'Retry 2 of 3'))
+        self.assertIsNone(substitute('a 1', 'A 1 1', 'a 2'))
+        # Inserted token
+        self.assertIsNone(substitute('Retry 3', '3回目', 'Retry 3 now'))
+
+    def test_import_export(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'memory.jsonl')
+            self.assertEqual(self.memory.export_file(path), 2)
+            memory = TranslationMemory(os.path.join(tmp_dir, 'tm.sqlite3'))
+            self.assertEqual(memory.import_file(path), 2)
+            self.assertEqual(memory.get('google', 'en', 'ja',
+                                        'I like apples.'),
+                             '私はリンゴが好きです。')
+            memory.close()
+
+    def test_engine(self):
+        engine = FakeGTransWeb()
+        gtrans = GTransWebMemory(engine, self.memory)
+        self.assertEqual(gtrans.translate('en', 'ja', 'Build 1 done'),
+                         '[ja] Build 1 done')
+        self.assertEqual(gtrans.translate_many('en', 'ja', ['Build 2 done',
+                                                            'Hi', '']),
+                         ['[ja] Build 2 done', '[ja] Hi', ''])
+        self.assertEqual(engine.sent, ['Build 1 done', 'Hi'])
+        # Without lookup, the memory is only fed
+        gtrans = GTransWebMemory(engine, self.memory, lookup=False)
+        gtrans.translate('en', 'ja', 'Build 3 done')
+        self.assertEqual(engine.sent[-1], 'Build 3 done')
+
+
+if __name__ == '__main__':
+    unittest.main()
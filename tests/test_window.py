@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import sys
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt5 import QtCore, QtTest, QtWidgets  # noqa: E402
+
+import gtransweb_gui  # noqa: E402,F401 (puts the package modules on sys.path)
+from window import (TextBoxRenderer, CHUNK_SIZE,  # noqa: E402
+                    LARGE_TEXT_SIZE, _find_changed_range, _split_chunks)
+
+# Created at import (before any QCoreApplication of other tests)
+app = QtWidgets.QApplication.instance() or \
+    QtWidgets.QApplication([sys.argv[0]])
+
+
+def process_pending(renderer):
+    while renderer.is_pending():
+        app.processEvents()
+
+
+class TextBoxRendererTest(unittest.TestCase):
+
+    def setUp(self):
+        self.text_box = QtWidgets.QPlainTextEdit()
+        self.n_changed = 0
+        self.text_box.textChanged.connect(self._on_changed)
+
+    def _on_changed(self):
+        self.n_changed += 1
+
+    def test_split_chunks(self):
+        text = ''.join(f'line {i}\n' for i in range(30000))
+        chunks = _split_chunks(text)
+        self.assertEqual(''.join(chunks), text)
+        self.assertTrue(all(len(c) <= CHUNK_SIZE for c in chunks))
+        self.assertTrue(all(c.endswith('\n') for c in chunks))
+        self.assertEqual(_split_chunks(''), [])
+
+    def test_small(self):
+        renderer = TextBoxRenderer(self.text_box)
+        renderer.set_text('<b>Hello</b>')  # Not HTML
+        self.assertFalse(renderer.is_pending())
+        renderer.append_text(' world')
+        renderer.splice_text(0, 3, '<i>')
+        self.assertEqual(renderer.get_text(), '<i>Hello</b> world')
+        self.assertEqual(self.text_box.lineWrapMode(),
+                         QtWidgets.QPlainTextEdit.WidgetWidth)
+        self.assertEqual(self.n_changed, 0)  # Signals are blocked
+
+    def test_splice_non_bmp(self):
+        # Offsets are in characters, not UTF-16 code units
+        renderer = TextBoxRenderer(self.text_box)
+        renderer.set_text('😀 A. B. C.')
+        renderer.splice_text(5, 7, 'XX.')
+        self.assertEqual(renderer.get_text(), '😀 A. XX. C.')
+        renderer.splice_text(0, 1, '𠀋')
+        self.assertEqual(renderer.get_text(), '𠀋 A. XX. C.')
+
+    def test_large(self):
+        renderer = TextBoxRenderer(self.text_box)
+        text = 'x' * 99 + '\n'
+        text *= LARGE_TEXT_SIZE * 3 // len(text)
+        renderer.set_text(text)
+        self.assertTrue(renderer.is_pending())
+        self.assertEqual(renderer.get_text(), text)
+        # Edits before rendered
+        renderer.append_text('end')
+        renderer.splice_text(0, 1, 'y')
+        process_pending(renderer)
+        self.assertEqual(self.text_box.toPlainText(), 'y' + text[1:] + 'end')
+        self.assertEqual(self.text_box.lineWrapMode(),
+                         QtWidgets.QPlainTextEdit.NoWrap)
+
+        # Replaced before rendered
+        renderer.set_text(text)
+        renderer.set_text('small')
+        process_pending(renderer)
+        app.processEvents()
+        self.assertEqual(self.text_box.toPlainText(), 'small')
+        self.assertEqual(self.n_changed, 0)
+
+    def test_undo(self):
+        renderer = TextBoxRenderer(self.text_box, max_undo_steps=3)
+        renderer.set_text('a')
+        undo_stack = renderer.get_undo_stack()
+        for i in range(5):
+            self.text_box.appendPlainText(str(i))
+        # Only the latest steps are kept
+        self.assertEqual(undo_stack.count(), 3)
+        while undo_stack.canUndo():
+            undo_stack.undo()
+        self.assertEqual(self.text_box.toPlainText(), 'a\n0\n1')
+        undo_stack.redo()
+        self.assertEqual(self.text_box.toPlainText(), 'a\n0\n1\n2')
+
+        # Typing is merged into one step, and undone by the key
+        QtTest.QTest.keyClicks(self.text_box, 'xyz')
+        self.assertEqual(self.text_box.toPlainText(), 'a\n0\n1\n2xyz')
+        QtTest.QTest.keyClick(self.text_box, QtCore.Qt.Key_Z,
+                              QtCore.Qt.ControlModifier)
+        self.assertEqual(self.text_box.toPlainText(), 'a\n0\n1\n2')
+        # Text set by program is not undone
+        renderer.set_text('b')
+        self.assertFalse(undo_stack.canUndo())
+
+        renderer.set_text('x' * (LARGE_TEXT_SIZE + 1))
+        self.text_box.appendPlainText('y')
+        self.assertFalse(undo_stack.canUndo())
+        # Undo is disabled without maximum steps
+        text_box = QtWidgets.QPlainTextEdit()
+        TextBoxRenderer(text_box)
+        self.assertFalse(text_box.isUndoRedoEnabled())
+
+    def test_find_changed_range(self):
+        self.assertEqual(_find_changed_range('abc', 'abc'), (3, 3, 3))
+        self.assertEqual(_find_changed_range('abc', 'aXc'), (1, 2, 2))
+        self.assertEqual(_find_changed_range('abc', 'ac'), (1, 2, 1))
+        self.assertEqual(_find_changed_range('aa', 'aaa'), (2, 2, 3))
+        self.assertEqual(_find_changed_range('', 'ab'), (0, 0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()